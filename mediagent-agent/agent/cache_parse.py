@@ -0,0 +1,134 @@
+"""
+MediAgent - Caché de respuestas de llm_parse
+
+Las respuestas ambiguas ("la de miraflores porfa", "la primera") se repiten
+mucho entre pacientes. La clave es el texto del paciente normalizado (sin
+tildes, mayúsculas ni puntuación) más un hash de las opciones mostradas, así
+la misma frase ante las mismas opciones nunca llega dos veces a la API.
+
+  - LRU en memoria con TTL y tamaño máximo (MEDIAGENT_PARSE_CACHE_MAX / _TTL)
+  - Opcional en disco (SQLite) compartido entre procesos y reinicios:
+    MEDIAGENT_PARSE_CACHE_PATH=data/parse_cache.db
+  - Contadores hits / misses / expirados / desalojados en stats()
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+MAX_ENTRADAS = int(os.getenv("MEDIAGENT_PARSE_CACHE_MAX", "5000"))
+TTL_SEGUNDOS = float(os.getenv("MEDIAGENT_PARSE_CACHE_TTL", str(7 * 24 * 3600)))
+RUTA_DISCO = os.getenv("MEDIAGENT_PARSE_CACHE_PATH", "")
+
+
+def normalizar(texto: str) -> str:
+    """'  La de MIRAFLORES, porfa!! ' -> 'la de miraflores porfa'."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(re.findall(r"[a-z0-9:]+", texto))
+
+
+def clave(texto_usuario: str, opciones: str) -> str:
+    """Clave de caché: texto normalizado + hash de las opciones."""
+    hash_opciones = hashlib.sha1(opciones.encode("utf-8")).hexdigest()[:16]
+    return f"{hash_opciones}|{normalizar(texto_usuario)}"
+
+
+class CacheParse:
+    """LRU con TTL, opcionalmente respaldado por una tabla SQLite."""
+
+    def __init__(self, max_entradas: int = MAX_ENTRADAS, ttl: float = TTL_SEGUNDOS, ruta_disco: str = RUTA_DISCO):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.ruta_disco = ruta_disco
+        self._lru = OrderedDict()  # clave -> (respuesta, expira_en)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.expirados = 0
+        self.desalojados = 0
+        if ruta_disco:
+            self._db().execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache ("
+                " clave TEXT PRIMARY KEY, respuesta TEXT NOT NULL, expira_en REAL NOT NULL)"
+            )
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.ruta_disco, isolation_level=None, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, k: str) -> Optional[str]:
+        ahora = time.time()
+        with self._lock:
+            entrada = self._lru.get(k)
+            if entrada is not None:
+                if entrada[1] > ahora:
+                    self._lru.move_to_end(k)
+                    self.hits += 1
+                    return entrada[0]
+                del self._lru[k]
+                self.expirados += 1
+
+        if self.ruta_disco:
+            row = self._db().execute(
+                "SELECT respuesta, expira_en FROM parse_cache WHERE clave = ?", (k,)
+            ).fetchone()
+            if row and row[1] > ahora:
+                with self._lock:
+                    self.hits += 1
+                    self._guardar_lru(k, row[0], row[1])
+                return row[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, k: str, respuesta: str):
+        expira_en = time.time() + self.ttl
+        with self._lock:
+            self._guardar_lru(k, respuesta, expira_en)
+        if self.ruta_disco:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO parse_cache (clave, respuesta, expira_en) VALUES (?, ?, ?)",
+                (k, respuesta, expira_en),
+            )
+            # Poda del disco: vencidos y, si excede el tamaño, los más próximos a vencer
+            db.execute("DELETE FROM parse_cache WHERE expira_en <= ?", (time.time(),))
+            db.execute(
+                "DELETE FROM parse_cache WHERE clave IN (SELECT clave FROM parse_cache "
+                "ORDER BY expira_en DESC LIMIT -1 OFFSET ?)",
+                (self.max_entradas,),
+            )
+
+    def _guardar_lru(self, k: str, respuesta: str, expira_en: float):
+        self._lru[k] = (respuesta, expira_en)
+        self._lru.move_to_end(k)
+        while len(self._lru) > self.max_entradas:
+            self._lru.popitem(last=False)
+            self.desalojados += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirados": self.expirados,
+                "desalojados": self.desalojados,
+                "entradas": len(self._lru),
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+# Singleton de proceso
+cache_parse = CacheParse()
@@ -0,0 +1,157 @@
+"""
+MediAgent - Checkpointer SQLite con poda
+
+Se activa con MEDIAGENT_CHECKPOINTER=sqlite (el default sigue siendo
+MemorySaver, ver agent/graph.py). Los checkpoints sobreviven reinicios y:
+
+  - Máximo MEDIAGENT_CHECKPOINT_MAX_POR_HILO checkpoints por conversación;
+    los más antiguos se borran al guardar uno nuevo (el grafo solo necesita
+    el último para reanudar).
+  - Las conversaciones terminadas (etapa en state.ETAPAS_FINALES: cita_agendada,
+    cancelado, sin_sedes o sin_doctores) se borran por completo MEDIAGENT_CHECKPOINT_TTL segundos después.
+
+Así el tamaño de la base depende de las conversaciones activas, no del uptime.
+"""
+import asyncio
+import os
+import sqlite3
+import time
+
+import aiosqlite
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from agent.repositorio import DATA_DIR
+from agent.state import ETAPAS_FINALES
+
+RUTA = os.getenv("MEDIAGENT_CHECKPOINT_PATH", os.path.join(DATA_DIR, "checkpoints.db"))
+TTL_TERMINADOS = float(os.getenv("MEDIAGENT_CHECKPOINT_TTL", str(24 * 3600)))
+MAX_POR_HILO = int(os.getenv("MEDIAGENT_CHECKPOINT_MAX_POR_HILO", "20"))
+INTERVALO_PODA = 60.0  # segundos entre barridos de conversaciones vencidas
+
+_SQL_TABLA_TERMINADOS = """
+CREATE TABLE IF NOT EXISTS hilos_terminados (
+    thread_id TEXT PRIMARY KEY,
+    terminado_en REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_hilos_terminados_en ON hilos_terminados(terminado_en);
+"""
+
+_SQL_RECORTAR = [
+    """DELETE FROM writes WHERE thread_id = :t AND checkpoint_ns = :ns AND checkpoint_id < (
+         SELECT MIN(checkpoint_id) FROM (SELECT checkpoint_id FROM checkpoints
+           WHERE thread_id = :t AND checkpoint_ns = :ns ORDER BY checkpoint_id DESC LIMIT :max))""",
+    """DELETE FROM checkpoints WHERE thread_id = :t AND checkpoint_ns = :ns AND checkpoint_id < (
+         SELECT MIN(checkpoint_id) FROM (SELECT checkpoint_id FROM checkpoints
+           WHERE thread_id = :t AND checkpoint_ns = :ns ORDER BY checkpoint_id DESC LIMIT :max))""",
+]
+_SQL_MARCAR_TERMINADO = "INSERT OR IGNORE INTO hilos_terminados (thread_id, terminado_en) VALUES (:t, :ahora)"
+_SQL_DESMARCAR_TERMINADO = "DELETE FROM hilos_terminados WHERE thread_id = :t"
+_SQL_PODAR = [
+    "DELETE FROM writes WHERE thread_id IN (SELECT thread_id FROM hilos_terminados WHERE terminado_en < :limite)",
+    "DELETE FROM checkpoints WHERE thread_id IN (SELECT thread_id FROM hilos_terminados WHERE terminado_en < :limite)",
+    "DELETE FROM hilos_terminados WHERE terminado_en < :limite",
+]
+
+
+class _Poda:
+    """Sentencias de poda comunes a la versión síncrona y la async."""
+
+    max_por_hilo = MAX_POR_HILO
+    ttl_terminados = TTL_TERMINADOS
+    _ultima_poda = 0.0
+
+    def _sentencias_put(self, config: dict, checkpoint: dict) -> list:
+        thread_id = str(config["configurable"]["thread_id"])
+        ns = config["configurable"].get("checkpoint_ns", "")
+        params = {"t": thread_id, "ns": ns, "max": self.max_por_hilo, "ahora": time.time()}
+        sentencias = [(sql, params) for sql in _SQL_RECORTAR]
+        if ns == "":
+            etapa = (checkpoint.get("channel_values") or {}).get("etapa")
+            sql = _SQL_MARCAR_TERMINADO if etapa in ETAPAS_FINALES else _SQL_DESMARCAR_TERMINADO
+            sentencias.append((sql, params))
+        if params["ahora"] - self._ultima_poda >= INTERVALO_PODA:
+            self._ultima_poda = params["ahora"]
+            sentencias += self._sentencias_podar(params["ahora"])
+        return sentencias
+
+    def _sentencias_podar(self, ahora: float) -> list:
+        params = {"limite": ahora - self.ttl_terminados}
+        return [(sql, params) for sql in _SQL_PODAR]
+
+
+class SqliteSaverPodado(_Poda, SqliteSaver):
+    """SqliteSaver con recorte por conversación y TTL de conversaciones terminadas."""
+
+    def setup(self):
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.executescript(_SQL_TABLA_TERMINADOS)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        nuevo = super().put(config, checkpoint, metadata, new_versions)
+        with self.cursor() as cur:
+            for sql, params in self._sentencias_put(config, checkpoint):
+                cur.execute(sql, params)
+        return nuevo
+
+    def podar(self, ahora: float = None):
+        """Borra ya las conversaciones terminadas hace más de ttl_terminados."""
+        with self.cursor() as cur:
+            for sql, params in self._sentencias_podar(ahora or time.time()):
+                cur.execute(sql, params)
+
+
+class AsyncSqliteSaverPodado(_Poda, AsyncSqliteSaver):
+    """Versión async (grafo de build_graph(asincrono=True))."""
+
+    def __init__(self, conn, **kwargs):
+        # AsyncSqliteSaver fija el event loop al construirse; build_graph puede
+        # llamarse antes de que exista, así que se fija en setup().
+        try:
+            super().__init__(conn, **kwargs)
+        except RuntimeError:
+            self.loop = None
+            self.is_setup = False
+
+    async def setup(self):
+        if self.is_setup:
+            return
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        await super().setup()
+        async with self.lock:
+            await self.conn.executescript(_SQL_TABLA_TERMINADOS)
+            await self.conn.commit()
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        nuevo = await super().aput(config, checkpoint, metadata, new_versions)
+        async with self.lock:
+            for sql, params in self._sentencias_put(config, checkpoint):
+                await self.conn.execute(sql, params)
+            await self.conn.commit()
+        return nuevo
+
+    async def apodar(self, ahora: float = None):
+        """Borra ya las conversaciones terminadas hace más de ttl_terminados."""
+        await self.setup()
+        async with self.lock:
+            for sql, params in self._sentencias_podar(ahora or time.time()):
+                await self.conn.execute(sql, params)
+            await self.conn.commit()
+
+    async def acerrar(self):
+        """Cierra la conexión (apagado ordenado del servidor)."""
+        await self.conn.close()
+
+
+def crear_checkpointer(asincrono: bool = False):
+    """Checkpointer SQLite (síncrono o async según el grafo)."""
+    if asincrono:
+        conn = aiosqlite.connect(RUTA)
+        # El hilo de aiosqlite no es daemon: si nadie llama a acerrar() el
+        # proceso no terminaría (en versiones < 0.20 la conexión es el hilo)
+        getattr(conn, "_thread", conn).daemon = True
+        return AsyncSqliteSaverPodado(conn)
+    return SqliteSaverPodado(sqlite3.connect(RUTA, check_same_thread=False))
@@ -0,0 +1,317 @@
+"""
+MediAgent - Bandeja de salida de correos (outbox)
+
+nodo_agendar ya no espera a Resend: encola el correo en una tabla SQLite
+(durable, sobrevive reinicios) y responde al paciente de inmediato. Un hilo
+en segundo plano toma los pendientes en lotes (Resend Batch, hasta
+MEDIAGENT_OUTBOX_LOTE por llamada) y reintenta con backoff exponencial.
+Si una llamada de lote falla, ese lote se envía correo por correo: una
+dirección inválida no arrastra al resto a los reintentos. Si Resend acepta
+el lote pero devuelve menos ids que correos, no se reenvía (serían
+duplicados): quedan enviados sin proveedor_id.
+
+Estados: pendiente → enviando → enviado
+                              ↘ pendiente (reintento) … → fallido (tras MEDIAGENT_OUTBOX_MAX_INTENTOS)
+
+Varios procesos pueden compartir la misma base: cada lote se reclama con
+BEGIN IMMEDIATE y un lease; si el proceso muere a mitad del envío, el lote
+vuelve a estar disponible cuando vence el lease.
+
+    estado_correo("cita-1a2b3c4d")  →  {"estado": "enviado", "intentos": 1, ...}
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import resend
+
+from agent.email_service import armar_correo_confirmacion, enviar_lote
+from agent.repositorio import DATA_DIR
+
+RUTA = os.getenv("MEDIAGENT_OUTBOX_PATH", os.path.join(DATA_DIR, "outbox.db"))
+TAMANO_LOTE = min(100, int(os.getenv("MEDIAGENT_OUTBOX_LOTE", "50")))  # Resend Batch acepta hasta 100
+MAX_INTENTOS = int(os.getenv("MEDIAGENT_OUTBOX_MAX_INTENTOS", "8"))
+BACKOFF_BASE = float(os.getenv("MEDIAGENT_OUTBOX_BACKOFF", "2"))  # segundos; se duplica en cada intento
+BACKOFF_MAX = 15 * 60.0
+LEASE = 120.0          # segundos que un lote "enviando" queda reservado para un proceso
+INTERVALO = 1.0        # espera máxima entre barridos cuando no hay avisos
+# 0: no arrancar el hilo en este proceso (p. ej. si corre scripts/enviar_outbox.py aparte)
+WORKER_EN_PROCESO = os.getenv("MEDIAGENT_OUTBOX_WORKER", "1") == "1"
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cita_id TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    destinatario TEXT NOT NULL,
+    remitente TEXT NOT NULL,
+    asunto TEXT NOT NULL,
+    html TEXT NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    proximo_intento REAL NOT NULL,
+    ultimo_error TEXT,
+    proveedor_id TEXT,
+    creado_en REAL NOT NULL,
+    actualizado_en REAL NOT NULL,
+    UNIQUE (cita_id, tipo)
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_estado_proximo ON outbox(estado, proximo_intento);
+"""
+
+_local = threading.local()
+_aviso = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = sqlite3.connect(RUTA, isolation_level=None, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+    return conn
+
+
+# ══════════════════════════════════════════════
+# Encolar y consultar
+# ══════════════════════════════════════════════
+
+def encolar(cita_id: str, tipo: str, params: dict) -> bool:
+    """
+    Agrega un correo (params de Resend) a la bandeja. Idempotente por
+    (cita_id, tipo): si el nodo se re-ejecuta no se duplica el envío.
+    Retorna True si quedó encolado ahora.
+    """
+    ahora = time.time()
+    cur = _conn().execute(
+        "INSERT OR IGNORE INTO outbox (cita_id, tipo, destinatario, remitente, asunto, html, "
+        "proximo_intento, creado_en, actualizado_en) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (cita_id, tipo, params["to"][0], params["from"], params["subject"], params["html"], ahora, ahora, ahora),
+    )
+    if WORKER_EN_PROCESO:
+        iniciar_worker()
+    _aviso.set()
+    return cur.rowcount == 1
+
+
+def encolar_lote(correos, por_transaccion: int = 500) -> int:
+    """
+    Encola un iterable de (cita_id, tipo, params) consumiéndolo de a
+    `por_transaccion` (memoria acotada para trabajos masivos). Idempotente
+    igual que encolar(). Retorna cuántos quedaron encolados ahora.
+    """
+    conn = _conn()
+    total = 0
+    pendientes = []
+
+    def _volcar():
+        ahora = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            antes = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO outbox (cita_id, tipo, destinatario, remitente, asunto, html, "
+                "proximo_intento, creado_en, actualizado_en) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (cita_id, tipo, p["to"][0], p["from"], p["subject"], p["html"], ahora, ahora, ahora)
+                    for cita_id, tipo, p in pendientes
+                ],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        pendientes.clear()
+        return conn.total_changes - antes
+
+    for correo in correos:
+        pendientes.append(correo)
+        if len(pendientes) >= por_transaccion:
+            total += _volcar()
+    if pendientes:
+        total += _volcar()
+    _aviso.set()
+    return total
+
+
+def encolar_confirmacion(
+    paciente: dict,
+    doctor: dict,
+    sede: dict,
+    horario: dict,
+    especialidad: str,
+    fecha_fmt: str,
+    cita_id: str,
+) -> dict:
+    """
+    Encola el correo de confirmación (mismos argumentos que
+    email_service.enviar_correo_confirmacion).
+
+    Returns:
+        dict con 'success': bool y 'message': str
+    """
+    if not resend.api_key:
+        return {"success": False, "message": "RESEND_API_KEY no configurada en .env"}
+    if not paciente.get("correo"):
+        return {"success": False, "message": "El paciente no tiene correo registrado"}
+
+    params = armar_correo_confirmacion(paciente, doctor, sede, horario, especialidad, fecha_fmt, cita_id)
+    encolar(cita_id, "confirmacion", params)
+    return {"success": True, "message": f"Correo encolado para {paciente['correo']}"}
+
+
+def estado_correo(cita_id: str, tipo: str = "confirmacion") -> Optional[dict]:
+    """Estado de entrega del correo de una cita, o None si no se encoló."""
+    row = _conn().execute(
+        "SELECT estado, intentos, ultimo_error, proveedor_id, creado_en, actualizado_en "
+        "FROM outbox WHERE cita_id = ? AND tipo = ?",
+        (cita_id, tipo),
+    ).fetchone()
+    return dict(row) if row else None
+
+
+# ══════════════════════════════════════════════
+# Envío
+# ══════════════════════════════════════════════
+
+def _reclamar_lote(ahora: float) -> list:
+    """Marca como 'enviando' hasta TAMANO_LOTE correos vencidos y los retorna."""
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        filas = conn.execute(
+            "SELECT * FROM outbox WHERE estado IN ('pendiente', 'enviando') AND proximo_intento <= ? "
+            "ORDER BY proximo_intento LIMIT ?",
+            (ahora, TAMANO_LOTE),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE outbox SET estado = 'enviando', proximo_intento = ?, actualizado_en = ? WHERE id = ?",
+            [(ahora + LEASE, ahora, f["id"]) for f in filas],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return [dict(f) for f in filas]
+
+
+def _backoff(intentos: int) -> float:
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (intentos - 1))
+
+
+def _marcar_enviados(conn: sqlite3.Connection, enviados: list):
+    """enviados: [(fila, id de Resend)]."""
+    conn.executemany(
+        "UPDATE outbox SET estado = 'enviado', intentos = intentos + 1, proveedor_id = ?, "
+        "ultimo_error = NULL, actualizado_en = ? WHERE id = ?",
+        [(pid, time.time(), f["id"]) for f, pid in enviados],
+    )
+
+
+def _marcar_fallidos(conn: sqlite3.Connection, fallidos: list, ahora: float):
+    """fallidos: [(fila, error)]. Reintento con backoff, o 'fallido' al agotar los intentos."""
+    conn.executemany(
+        "UPDATE outbox SET estado = ?, intentos = ?, proximo_intento = ?, ultimo_error = ?, "
+        "actualizado_en = ? WHERE id = ?",
+        [
+            (
+                "fallido" if f["intentos"] + 1 >= MAX_INTENTOS else "pendiente",
+                f["intentos"] + 1,
+                ahora + _backoff(f["intentos"] + 1),
+                error,
+                time.time(),
+                f["id"],
+            )
+            for f, error in fallidos
+        ],
+    )
+
+
+def _error(e: Exception) -> str:
+    return f"{type(e).__name__}: {e}"
+
+
+def procesar_lote(ahora: float = None) -> int:
+    """Envía un lote de pendientes. Retorna cuántos correos se intentaron."""
+    ahora = ahora or time.time()
+    filas = _reclamar_lote(ahora)
+    if not filas:
+        return 0
+
+    lote = [
+        {"from": f["remitente"], "to": [f["destinatario"]], "subject": f["asunto"], "html": f["html"]}
+        for f in filas
+    ]
+    conn = _conn()
+    try:
+        ids = enviar_lote(lote)
+    except Exception as e:
+        if len(filas) == 1:
+            logger.warning("Fallo el envío del correo %s: %s", filas[0]["id"], _error(e))
+            _marcar_fallidos(conn, [(filas[0], _error(e))], ahora)
+            return 1
+        # Un destinatario inválido no debe arrastrar al resto del lote: uno por uno
+        logger.warning("Fallo el lote de %d correos (%s); se envían por separado", len(filas), _error(e))
+        enviados, fallidos = [], []
+        for f, params in zip(filas, lote):
+            try:
+                enviados.append((f, (enviar_lote([params]) or [None])[0]))
+            except Exception as e_uno:
+                fallidos.append((f, _error(e_uno)))
+        _marcar_enviados(conn, enviados)
+        _marcar_fallidos(conn, fallidos, ahora)
+        return len(filas)
+
+    if len(ids) != len(filas):
+        # Resend aceptó el lote: reenviarlo duplicaría los correos. Quedan
+        # como enviados, sin id del proveedor (no se sabe cuál es de cuál)
+        logger.warning("Resend devolvió %d ids para %d correos", len(ids), len(filas))
+        ids = [None] * len(filas)
+    _marcar_enviados(conn, list(zip(filas, ids)))
+    return len(filas)
+
+
+def vaciar(concurrencia: int = 1) -> int:
+    """
+    Procesa lotes hasta que no quede nada vencido. Retorna los correos intentados.
+    concurrencia: lotes en vuelo a la vez (cada hilo reclama los suyos).
+    """
+    if concurrencia > 1:
+        with ThreadPoolExecutor(concurrencia, thread_name_prefix="mediagent-outbox") as ex:
+            return sum(ex.map(lambda _: vaciar(), range(concurrencia)))
+    total = 0
+    while True:
+        n = procesar_lote()
+        if not n:
+            return total
+        total += n
+
+
+def _bucle():
+    while True:
+        _aviso.wait(INTERVALO)
+        _aviso.clear()
+        try:
+            vaciar()
+        except Exception:
+            logger.exception("Error procesando la bandeja de correos")
+
+
+def iniciar_worker():
+    """Arranca (una vez por proceso) el hilo que vacía la bandeja."""
+    global _worker
+    if _worker is not None:
+        return
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_bucle, name="mediagent-outbox", daemon=True)
+            _worker.start()
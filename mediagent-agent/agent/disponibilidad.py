@@ -0,0 +1,89 @@
+"""
+MediAgent - Mapa de disponibilidad precalculado
+
+Conteo de horarios disponibles por (sede_id, especialidad_id, fecha) y la
+última fecha con alguno. Con esto, "¿esta sede tiene disponibilidad para
+esta especialidad desde hoy?" es una comparación de fechas, sin recorrer
+doctores ni horarios.
+
+El repositorio lo mantiene al día de forma incremental en cada cambio de
+estado de un horario (ver RepositorioJSON._cambiar_estado).
+"""
+
+# Franjas horarias estándar (8am - 6pm); agent/generador_horarios.py arma los turnos con ellas
+FRANJAS = [
+    ("08:00", "09:00"),
+    ("09:00", "10:00"),
+    ("10:00", "11:00"),
+    ("11:00", "12:00"),
+    ("12:00", "13:00"),
+    ("14:00", "15:00"),
+    ("15:00", "16:00"),
+    ("16:00", "17:00"),
+    ("17:00", "18:00"),
+]
+
+
+class MapaDisponibilidad:
+    """Acumulados por sede+especialidad: disponibles por fecha y última fecha."""
+
+    def __init__(self, horarios: dict, doctores: dict):
+        # Tablas de origen (el repositorio las compara para saber si está vigente)
+        self.horarios = horarios
+        self.doctores = doctores
+        self.por_sede_esp = {}  # (sede_id, especialidad_id) -> {fecha: disponibles}
+        self.ultima_fecha = {}  # (sede_id, especialidad_id) -> fecha más lejana con disponibles
+        self._sede_esp = {d["id"]: (d["sede_id"], d["especialidad_id"]) for d in doctores["filas"]}
+        if "columnar" in horarios:
+            self._cargar_columnar(horarios["columnar"])
+            return
+        for h in horarios["filas"]:
+            if h["estado"] == "disponible":
+                self.actualizar(h, True)
+
+    def _cargar_columnar(self, tabla):
+        """Mismo resultado que el bucle de __init__, agregando con NumPy (horarios.bin)."""
+        import numpy as np
+
+        filas = np.flatnonzero(tabla.estado == tabla.estados.index("disponible"))
+        doctor, dia = tabla.doctor[filas].astype(np.int64), tabla.dia[filas].astype(np.int64)
+        fechas = tabla.fechas
+
+        # Acumulados por sede+especialidad y fecha (doctores sin sede+esp no cuentan)
+        grupos = {}
+        grupo_doc = np.array(
+            [grupos.setdefault(self._sede_esp[d], len(grupos)) if d in self._sede_esp else -1 for d in tabla.doctores],
+            dtype=np.int64,
+        )
+        grupo = grupo_doc[doctor]
+        unicas, conteos = np.unique((grupo * 65536 + dia)[grupo >= 0], return_counts=True)
+        grupos = list(grupos)
+        for k, n in zip(unicas.tolist(), conteos.tolist()):
+            self.por_sede_esp.setdefault(grupos[k >> 16], {})[fechas[k & 0xFFFF]] = n
+        for sede_esp, por_fecha in self.por_sede_esp.items():
+            self.ultima_fecha[sede_esp] = max(por_fecha)
+
+    def actualizar(self, horario: dict, disponible: bool):
+        """Refleja el cambio de estado de un horario en los acumulados."""
+        sede_esp = self._sede_esp.get(horario["doctor_id"])
+        if sede_esp is None:
+            return
+        fecha = horario["fecha"]
+        fechas = self.por_sede_esp.setdefault(sede_esp, {})
+        n = fechas.get(fecha, 0) + (1 if disponible else -1)
+        if n > 0:
+            fechas[fecha] = n
+            if fecha > self.ultima_fecha.get(sede_esp, ""):
+                self.ultima_fecha[sede_esp] = fecha
+            return
+        fechas.pop(fecha, None)
+        # Solo se recalcula cuando se agota justo la última fecha
+        if self.ultima_fecha.get(sede_esp) == fecha:
+            if fechas:
+                self.ultima_fecha[sede_esp] = max(fechas)
+            else:
+                self.ultima_fecha.pop(sede_esp, None)
+
+    def hay_disponibilidad(self, sede_id: str, especialidad_id: str, desde: str) -> bool:
+        """True si algún doctor de la sede+especialidad tiene horarios desde la fecha."""
+        return self.ultima_fecha.get((sede_id, especialidad_id), "") >= desde
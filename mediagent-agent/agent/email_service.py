@@ -7,25 +7,42 @@ Configuración mínima: solo necesitas RESEND_API_KEY en tu .env
 Si no tienes dominio verificado, usa:
   EMAIL_FROM=onboarding@resend.dev  (solo envía al correo de tu cuenta Resend)
 """
+import functools
 import os
 import resend
 
+from agent import metricas
+from agent.plantilla_html import Plantilla
+
 # ── Configuración ──
 resend.api_key = os.getenv("RESEND_API_KEY", "")
 EMAIL_FROM = os.getenv("EMAIL_FROM", "MediAgent <onboarding@resend.dev>")
 
 
-def _build_confirmation_html(
-    paciente: dict,
-    doctor: dict,
-    sede: dict,
-    horario: dict,
-    especialidad: str,
-    fecha_fmt: str,
-    cita_id: str,
-) -> str:
-    """Genera el HTML del correo de confirmación de cita."""
-    return f"""
+@metricas.span("correo", "resend")
+def _enviar_resend(params: dict) -> dict:
+    """Llamada a la API de Resend (separada para medir solo la red)."""
+    return resend.Emails.send(params)
+
+
+@metricas.span("correo", "resend_batch")
+def enviar_lote(lote: list) -> list:
+    """
+    Envía varios correos en una sola llamada (Resend Batch, máx. 100).
+    Todo o nada: si falla, lanza la excepción y no se envió ninguno.
+    Returns: ids de Resend en el mismo orden que `lote`.
+    """
+    if len(lote) == 1:
+        return [_enviar_resend(lote[0])["id"]]
+    respuesta = resend.Batch.send(lote)
+    return [e["id"] for e in respuesta["data"]]
+
+
+# ══════════════════════════════════════════════
+# Plantillas (compiladas una vez al importar)
+# ══════════════════════════════════════════════
+
+_HTML_CONFIRMACION = """
     <!DOCTYPE html>
     <html lang="es">
     <head>
@@ -59,7 +76,7 @@ def _build_confirmation_html(
                         <tr>
                             <td style="padding: 8px 40px 24px; text-align:center;">
                                 <p style="font-size:18px; color:#333; margin:0;">
-                                    ¡Hola <strong>{paciente['nombres']}</strong>! Tu cita ha sido agendada exitosamente.
+                                    ¡Hola <strong>{nombre_paciente}</strong>! Tu cita ha sido agendada exitosamente.
                                 </p>
                             </td>
                         </tr>
@@ -79,22 +96,7 @@ def _build_confirmation_html(
                                     
                                     <tr><td style="padding:0 24px;"><hr style="border:none; border-top:1px solid #E9ECEF; margin:0;"></td></tr>
                                     
-                                    <!-- Doctor -->
-                                    <tr>
-                                        <td style="padding: 12px 24px;">
-                                            <table cellpadding="0" cellspacing="0">
-                                                <tr>
-                                                    <td style="vertical-align:top; padding-right:12px; font-size:20px;">👨‍⚕️</td>
-                                                    <td>
-                                                        <p style="margin:0; font-size:12px; color:#6C757D;">Doctor</p>
-                                                        <p style="margin:2px 0 0; font-size:16px; color:#333; font-weight:600;">Dr(a). {doctor['nombres']} {doctor['apellidos']}</p>
-                                                    </td>
-                                                </tr>
-                                            </table>
-                                        </td>
-                                    </tr>
-                                    
-                                    <!-- Especialidad -->
+{bloque_doctor}                                    <!-- Especialidad -->
                                     <tr>
                                         <td style="padding: 12px 24px;">
                                             <table cellpadding="0" cellspacing="0">
@@ -118,30 +120,14 @@ def _build_confirmation_html(
                                                     <td>
                                                         <p style="margin:0; font-size:12px; color:#6C757D;">Fecha y hora</p>
                                                         <p style="margin:2px 0 0; font-size:16px; color:#333; font-weight:600;">{fecha_fmt}</p>
-                                                        <p style="margin:2px 0 0; font-size:16px; color:#0077B6; font-weight:700;">{horario['hora_inicio']} - {horario['hora_fin']}</p>
-                                                    </td>
-                                                </tr>
-                                            </table>
-                                        </td>
-                                    </tr>
-                                    
-                                    <!-- Sede -->
-                                    <tr>
-                                        <td style="padding: 12px 24px 20px;">
-                                            <table cellpadding="0" cellspacing="0">
-                                                <tr>
-                                                    <td style="vertical-align:top; padding-right:12px; font-size:20px;">🏥</td>
-                                                    <td>
-                                                        <p style="margin:0; font-size:12px; color:#6C757D;">Sede</p>
-                                                        <p style="margin:2px 0 0; font-size:16px; color:#333; font-weight:600;">{sede['nombre']}</p>
-                                                        <p style="margin:2px 0 0; font-size:14px; color:#6C757D;">📍 {sede['direccion']}</p>
+                                                        <p style="margin:2px 0 0; font-size:16px; color:#0077B6; font-weight:700;">{hora_inicio} - {hora_fin}</p>
                                                     </td>
                                                 </tr>
                                             </table>
                                         </td>
                                     </tr>
                                     
-                                </table>
+{bloque_sede}                                </table>
                             </td>
                         </tr>
                         
@@ -178,6 +164,166 @@ def _build_confirmation_html(
     </html>
     """
 
+_HTML_DOCTOR = """                                    <!-- Doctor -->
+                                    <tr>
+                                        <td style="padding: 12px 24px;">
+                                            <table cellpadding="0" cellspacing="0">
+                                                <tr>
+                                                    <td style="vertical-align:top; padding-right:12px; font-size:20px;">👨‍⚕️</td>
+                                                    <td>
+                                                        <p style="margin:0; font-size:12px; color:#6C757D;">Doctor</p>
+                                                        <p style="margin:2px 0 0; font-size:16px; color:#333; font-weight:600;">Dr(a). {nombres} {apellidos}</p>
+                                                    </td>
+                                                </tr>
+                                            </table>
+                                        </td>
+                                    </tr>
+                                    
+"""
+
+_HTML_SEDE = """                                    <!-- Sede -->
+                                    <tr>
+                                        <td style="padding: 12px 24px 20px;">
+                                            <table cellpadding="0" cellspacing="0">
+                                                <tr>
+                                                    <td style="vertical-align:top; padding-right:12px; font-size:20px;">🏥</td>
+                                                    <td>
+                                                        <p style="margin:0; font-size:12px; color:#6C757D;">Sede</p>
+                                                        <p style="margin:2px 0 0; font-size:16px; color:#333; font-weight:600;">{nombre}</p>
+                                                        <p style="margin:2px 0 0; font-size:14px; color:#6C757D;">📍 {direccion}</p>
+                                                    </td>
+                                                </tr>
+                                            </table>
+                                        </td>
+                                    </tr>
+                                    
+"""
+
+
+
+def _variante(html: str, reemplazos: dict) -> str:
+    """Misma maqueta con otros textos; falla al importar si un texto ya no existe."""
+    for viejo, nuevo in reemplazos.items():
+        if viejo not in html:
+            raise ValueError(f"Texto de plantilla no encontrado: {viejo!r}")
+        html = html.replace(viejo, nuevo)
+    return html
+
+
+# Recordatorio del día anterior: la misma tarjeta de la cita con otro encabezado
+_HTML_RECORDATORIO = _variante(_HTML_CONFIRMACION, {
+    "✅ Cita Confirmada": "⏰ Tu cita es mañana",
+    "Tu cita ha sido agendada exitosamente.": "Te recordamos tu cita médica de mañana.",
+})
+
+_PLANTILLA_CONFIRMACION = Plantilla(_HTML_CONFIRMACION)
+_PLANTILLA_RECORDATORIO = Plantilla(_HTML_RECORDATORIO)
+_PLANTILLA_DOCTOR = Plantilla(_HTML_DOCTOR)
+_PLANTILLA_SEDE = Plantilla(_HTML_SEDE)
+
+
+# Los bloques de doctor y sede se repiten entre correos: se renderizan una vez
+# por doctor/sede y luego solo se pegan
+@functools.lru_cache(maxsize=4096)
+def _fragmento_doctor(nombres: str, apellidos: str) -> str:
+    return _PLANTILLA_DOCTOR.render({"nombres": nombres, "apellidos": apellidos})
+
+
+@functools.lru_cache(maxsize=1024)
+def _fragmento_sede(nombre: str, direccion: str) -> str:
+    return _PLANTILLA_SEDE.render({"nombre": nombre, "direccion": direccion})
+
+
+def _valores_confirmacion(
+    paciente: dict,
+    doctor: dict,
+    sede: dict,
+    horario: dict,
+    especialidad: str,
+    fecha_fmt: str,
+    cita_id: str,
+) -> dict:
+    return {
+        "nombre_paciente": paciente["nombres"],
+        "cita_id": cita_id,
+        "bloque_doctor": _fragmento_doctor(doctor["nombres"], doctor["apellidos"]),
+        "especialidad": especialidad,
+        "fecha_fmt": fecha_fmt,
+        "hora_inicio": horario["hora_inicio"],
+        "hora_fin": horario["hora_fin"],
+        "bloque_sede": _fragmento_sede(sede["nombre"], sede["direccion"]),
+    }
+
+
+def _build_confirmation_html(
+    paciente: dict,
+    doctor: dict,
+    sede: dict,
+    horario: dict,
+    especialidad: str,
+    fecha_fmt: str,
+    cita_id: str,
+) -> str:
+    """Genera el HTML del correo de confirmación de cita."""
+    return _PLANTILLA_CONFIRMACION.render(
+        _valores_confirmacion(paciente, doctor, sede, horario, especialidad, fecha_fmt, cita_id)
+    )
+
+
+def renderizar_confirmaciones(filas):
+    """
+    HTML de muchos correos de confirmación (generador, para envíos masivos).
+    filas: iterable de dicts con las claves paciente, doctor, sede, horario,
+    especialidad, fecha_fmt y cita_id.
+    """
+    return _PLANTILLA_CONFIRMACION.render_lote(_valores_confirmacion(**f) for f in filas)
+
+
+def armar_correo_recordatorio(
+    paciente: dict,
+    doctor: dict,
+    sede: dict,
+    horario: dict,
+    especialidad: str,
+    fecha_fmt: str,
+    cita_id: str,
+) -> dict:
+    """Params de Resend del recordatorio del día anterior (mismos datos que la confirmación)."""
+    return {
+        "from": EMAIL_FROM,
+        "to": [paciente["correo"]],
+        "subject": f"⏰ Recordatorio: tu cita de {especialidad} es mañana | {fecha_fmt}",
+        "html": _PLANTILLA_RECORDATORIO.render(
+            _valores_confirmacion(paciente, doctor, sede, horario, especialidad, fecha_fmt, cita_id)
+        ),
+    }
+
+
+def armar_correo_confirmacion(
+    paciente: dict,
+    doctor: dict,
+    sede: dict,
+    horario: dict,
+    especialidad: str,
+    fecha_fmt: str,
+    cita_id: str,
+) -> dict:
+    """Params de Resend (from, to, subject, html) del correo de confirmación."""
+    return {
+        "from": EMAIL_FROM,
+        "to": [paciente["correo"]],
+        "subject": f"✅ Cita Confirmada — {especialidad} | {fecha_fmt}",
+        "html": _build_confirmation_html(
+            paciente=paciente,
+            doctor=doctor,
+            sede=sede,
+            horario=horario,
+            especialidad=especialidad,
+            fecha_fmt=fecha_fmt,
+            cita_id=cita_id,
+        ),
+    }
+
 
 def enviar_correo_confirmacion(
     paciente: dict,
@@ -208,27 +354,13 @@ def enviar_correo_confirmacion(
             "message": "El paciente no tiene correo registrado",
         }
 
-    # Construir HTML
-    html_content = _build_confirmation_html(
-        paciente=paciente,
-        doctor=doctor,
-        sede=sede,
-        horario=horario,
-        especialidad=especialidad,
-        fecha_fmt=fecha_fmt,
-        cita_id=cita_id,
-    )
-
     # Enviar con Resend
     try:
-        params: resend.Emails.SendParams = {
-            "from": EMAIL_FROM,
-            "to": [destinatario],
-            "subject": f"✅ Cita Confirmada — {especialidad} | {fecha_fmt}",
-            "html": html_content,
-        }
+        params: resend.Emails.SendParams = armar_correo_confirmacion(
+            paciente, doctor, sede, horario, especialidad, fecha_fmt, cita_id
+        )
 
-        email = resend.Emails.send(params)
+        email = _enviar_resend(params)
 
         return {
             "success": True,
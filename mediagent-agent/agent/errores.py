@@ -0,0 +1,11 @@
+"""
+MediAgent - Errores de dominio compartidos por los backends de datos
+"""
+
+
+class HorarioNoDisponible(Exception):
+    """El horario ya no está disponible (otro paciente lo reservó primero)."""
+
+    def __init__(self, horario_id: str):
+        super().__init__(f"El horario {horario_id} ya no está disponible")
+        self.horario_id = horario_id
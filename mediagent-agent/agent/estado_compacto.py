@@ -0,0 +1,128 @@
+"""
+MediAgent - Estado compacto (MEDIAGENT_ESTADO_COMPACTO=1)
+
+Cada checkpoint guarda una copia del estado, y lo que más pesa son las
+entidades completas: paciente, sedes, doctores con todos sus horarios...
+En modo compacto el estado guarda solo ids (y el "total" del listado
+paginado, que es el cursor para "ver más"):
+
+    paciente           "pac-001"
+    sedes_disponibles  ["sede-001", "sede-004"]
+    sede_elegida       "sede-001"
+    doctores_horarios  [{"doctor": "doc-001", "horarios": ["hor-00001", ...], "total": 27}]
+    doctor_elegido     "doc-001"
+    horario_elegido    "hor-00001"
+
+nodes._como_sync/_como_async rehidratan el estado antes de cada nodo
+(rehidratar) y compactan lo que el nodo devuelve (compactar), así que los
+nodos siguen viendo dicts. La rehidratación usa las funciones de tools.py
+(cualquiera de los dos backends) en cada lectura: son búsquedas por id con
+índice, y así un horario borrado o un dato editado se ve enseguida.
+"""
+import functools
+import os
+
+from agent.tools import get_doctor_by_id, get_horario_by_id, get_paciente_by_id, get_sede_by_id
+
+HABILITADO = os.getenv("MEDIAGENT_ESTADO_COMPACTO", "0") == "1"
+
+# Campos públicos con los que tools.get_doctores_con_horarios arma el listado
+_CAMPOS_DOCTOR = ("id", "nombres", "apellidos", "numero_colegiatura")
+_CAMPOS_HORARIO = ("id", "fecha", "hora_inicio", "hora_fin")
+
+
+# ══════════════════════════════════════════════
+# Búsquedas (id → dict)
+# ══════════════════════════════════════════════
+
+def _buscar(tipo: str, id_: str):
+    if tipo == "paciente":
+        return get_paciente_by_id(id_)
+    if tipo == "sede":
+        return get_sede_by_id(id_)
+    if tipo == "doctor":
+        d = get_doctor_by_id(id_)
+        return {k: d[k] for k in _CAMPOS_DOCTOR} if d else None
+    h = get_horario_by_id(id_)
+    return {k: h[k] for k in _CAMPOS_HORARIO} if h else None
+
+
+def _entidad(tipo: str, valor):
+    """id → dict nuevo desde tools; un dict (estado aún no compactado) pasa tal cual."""
+    if not isinstance(valor, str):
+        return valor
+    return _buscar(tipo, valor)
+
+
+def _id(valor):
+    return valor["id"] if isinstance(valor, dict) else valor
+
+
+# ══════════════════════════════════════════════
+# Compactar / rehidratar
+# ══════════════════════════════════════════════
+
+def _listado_a_ids(doctores_hrs: list) -> list:
+    compacto = []
+    for dh in doctores_hrs:
+        entrada = {"doctor": _id(dh["doctor"]), "horarios": [_id(h) for h in dh["horarios"]]}
+        if "total" in dh:
+            entrada["total"] = dh["total"]
+        compacto.append(entrada)
+    return compacto
+
+
+def _listado_de_ids(compacto: list) -> list:
+    doctores_hrs = []
+    for entrada in compacto:
+        dh = dict(entrada)
+        dh["doctor"] = _entidad("doctor", entrada["doctor"])
+        # Un horario borrado entretanto (ventana_horarios) simplemente ya no se ofrece
+        dh["horarios"] = [h for h in (_entidad("horario", x) for x in entrada["horarios"]) if h]
+        doctores_hrs.append(dh)
+    return doctores_hrs
+
+
+# clave del estado → (a ids, desde ids)
+_CLAVES = {
+    "paciente": (_id, functools.partial(_entidad, "paciente")),
+    "sedes_disponibles": (
+        lambda sedes: [_id(s) for s in sedes],
+        lambda ids: [_entidad("sede", s) for s in ids],
+    ),
+    "sede_elegida": (_id, functools.partial(_entidad, "sede")),
+    "doctores_horarios": (_listado_a_ids, _listado_de_ids),
+    "doctor_elegido": (_id, functools.partial(_entidad, "doctor")),
+    "horario_elegido": (_id, functools.partial(_entidad, "horario")),
+}
+
+
+def compactar(update: dict, state: dict) -> dict:
+    """
+    Versión con ids de lo que devolvió un nodo. Las claves que el nodo no
+    tocó pero siguen completas en `state` (p. ej. el paciente de la entrada
+    inicial) también se compactan en esta misma escritura.
+    """
+    if not isinstance(update, dict):
+        return update
+    salida = dict(update)
+    for clave, (a_ids, _) in _CLAVES.items():
+        if clave in salida:
+            valor = salida[clave]
+        elif state.get(clave) is not None:
+            valor = state[clave]
+        else:
+            continue
+        compacto = a_ids(valor) if valor is not None else None
+        if clave in salida or compacto != valor:
+            salida[clave] = compacto
+    return salida
+
+
+def rehidratar(state: dict) -> dict:
+    """Copia de `state` con las entidades completas que esperan los nodos."""
+    completo = dict(state)
+    for clave, (_, de_ids) in _CLAVES.items():
+        if completo.get(clave) is not None:
+            completo[clave] = de_ids(completo[clave])
+    return completo
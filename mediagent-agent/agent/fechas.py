@@ -0,0 +1,30 @@
+"""
+MediAgent - Fechas en español
+
+Módulo liviano (sin LangGraph ni LLMs) compartido por los nodos del grafo,
+los correos y los trabajos por lotes como agent/recordatorios.py.
+
+Cada listado formatea la misma fecha una vez por horario: se memoiza, y
+nodes._calcular_semanas precalienta el horizonte que puede mostrarse (esta
+semana, la próxima y el margen de ventana_horarios) al empezar cada día.
+"""
+import functools
+from datetime import date, timedelta
+
+DIAS = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo")
+MESES = ("", "enero", "febrero", "marzo", "abril", "mayo", "junio",
+         "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre")
+HORIZONTE = 31  # días desde hoy que se precalientan
+
+
+@functools.lru_cache(maxsize=2048)
+def formatear_fecha(fecha_str: str) -> str:
+    """Convierte '2026-02-24' a 'Lunes 24 de febrero'."""
+    d = date.fromisoformat(fecha_str)
+    return f"{DIAS[d.weekday()]} {d.day} de {MESES[d.month]}"
+
+
+def precalentar(desde: date, dias: int = HORIZONTE):
+    """Deja en la caché de formatear_fecha las fechas [desde, desde + dias)."""
+    for i in range(dias):
+        formatear_fecha((desde + timedelta(days=i)).isoformat())
@@ -0,0 +1,142 @@
+"""
+MediAgent - Generador vectorizado de horarios (NumPy)
+
+Arma de una sola vez la grilla doctor × día × franja como una máscara
+booleana, en lugar de tres for anidados con un random.random() por slot:
+
+    mascara[doc, dia, franja] = el turno del doctor incluye esa franja ese día de la semana
+
+np.nonzero(mascara) da los slots en el mismo orden que los antiguos bucles
+(doctor, luego fecha, luego hora) y un único rng.random(n) decide los
+ocupados. El resultado es columnar (arreglos NumPy); a_filas() lo convierte
+a los dicts de horarios.json y escribir_json() lo guarda una fila por línea.
+
+Turnos: cada doctor puede tener "turno" en doctores.json (ver TURNOS);
+sin ese campo se usa el turno por defecto. Misma semilla → mismos horarios.
+
+Usado por scripts/regenerar_horarios.py y scripts/agregar_doctores.py.
+"""
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+
+from agent.disponibilidad import FRANJAS
+
+# Turno = franjas (índices de FRANJAS) por día de la semana (0 = lunes … 6 = domingo)
+_MANANA = range(0, 5)
+_TARDE = range(5, len(FRANJAS))
+_TODO = range(len(FRANJAS))
+TURNOS = {
+    "completo": {dia: _TODO for dia in range(6)},                          # lun-sáb 08:00-18:00
+    "manana": {dia: _MANANA for dia in range(6)},                          # lun-sáb 08:00-13:00
+    "tarde": {dia: _TARDE for dia in range(5)},                            # lun-vie 14:00-18:00
+    "semana": {**{dia: _TODO for dia in range(5)}, 5: _MANANA},            # sábado solo mañana
+}
+TURNO_DEFAULT = "completo"
+PROB_OCUPADO = 0.4  # ~60% disponible, 40% ocupado — para hacerlo realista
+SEMILLA = 42
+
+
+def _mascara_turnos(nombres: list) -> np.ndarray:
+    """(len(nombres), 7, len(FRANJAS)) bool: franjas de cada turno por día de la semana."""
+    mascara = np.zeros((len(nombres), 7, len(FRANJAS)), dtype=bool)
+    for i, nombre in enumerate(nombres):
+        for dia, franjas in TURNOS[nombre].items():
+            mascara[i, dia, list(franjas)] = True
+    return mascara
+
+
+def dias_habiles(desde: date, cantidad: int) -> date:
+    """Fecha (exclusiva) en la que se completan `cantidad` días lun-sáb desde `desde`."""
+    d = desde
+    while cantidad > 0:
+        if d.weekday() < 6:
+            cantidad -= 1
+        d += timedelta(days=1)
+    return d
+
+
+def sumar_meses(desde: date, meses: int) -> date:
+    """`desde` + `meses` meses (el día se ajusta al último del mes si no existe)."""
+    total = desde.month - 1 + meses
+    anio, mes = desde.year + total // 12, total % 12 + 1
+    siguiente = date(anio + mes // 12, mes % 12 + 1, 1)
+    return date(anio, mes, min(desde.day, (siguiente - timedelta(days=1)).day))
+
+
+def generar(
+    doctores: list,
+    desde: date,
+    hasta: date,
+    semilla: int = SEMILLA,
+    prob_ocupado: float = PROB_OCUPADO,
+    id_inicial: int = 1,
+    turno_default: str = TURNO_DEFAULT,
+) -> dict:
+    """
+    Horarios de `doctores` para las fechas [desde, hasta).
+
+    Retorna columnas: "num" (int, el N de hor-N), "doctor" (índice en
+    `doctores`), "fecha" (ordinal de date), "franja" (índice en FRANJAS) y
+    "disponible" (bool), más "doctores" (los ids) y "franjas" para traducir
+    índices. horarios_columnar.escribir() acepta este dict directamente.
+    """
+    nombres_turno = sorted(TURNOS)
+    turno_doc = np.array(
+        [nombres_turno.index(d.get("turno", turno_default)) for d in doctores], dtype=np.intp
+    )
+    ordinales = np.arange(desde.toordinal(), hasta.toordinal(), dtype=np.int64)
+    dia_semana = (ordinales - 1) % 7  # date.fromordinal(1) es lunes
+
+    # (doctores, días, franjas): el turno de cada doctor evaluado en cada fecha
+    mascara = _mascara_turnos(nombres_turno)[turno_doc[:, None], dia_semana[None, :]]
+    doc_idx, dia_idx, franja_idx = np.nonzero(mascara)
+
+    rng = np.random.default_rng(semilla)
+    return {
+        "num": np.arange(id_inicial, id_inicial + len(doc_idx), dtype=np.int64),
+        "doctor": doc_idx,
+        "fecha": ordinales[dia_idx],
+        "franja": franja_idx,
+        "disponible": rng.random(len(doc_idx)) >= prob_ocupado,
+        "doctores": [d["id"] for d in doctores],
+        "franjas": FRANJAS,
+    }
+
+
+def a_filas(grilla: dict) -> list:
+    """Columnas de generar() → lista de dicts con el formato de horarios.json."""
+    fechas = {o: date.fromordinal(int(o)).isoformat() for o in np.unique(grilla["fecha"])}
+    doctores = grilla["doctores"]
+    return [
+        {
+            "id": f"hor-{num:05d}",
+            "doctor_id": doctores[doc],
+            "fecha": fechas[fecha],
+            "hora_inicio": FRANJAS[franja][0],
+            "hora_fin": FRANJAS[franja][1],
+            "estado": "disponible" if disp else "ocupado",
+        }
+        for num, doc, fecha, franja, disp in zip(
+            grilla["num"].tolist(),
+            grilla["doctor"].tolist(),
+            grilla["fecha"].tolist(),
+            grilla["franja"].tolist(),
+            grilla["disponible"].tolist(),
+        )
+    ]
+
+
+def escribir_json(ruta: str, filas: list):
+    """
+    Guarda las filas con un objeto por línea: ~3 veces más chico que
+    indent=2 y sigue siendo legible y diffeable. Reemplazo atómico.
+    """
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        f.write(",\n".join(json.dumps(fila, ensure_ascii=False) for fila in filas))
+        f.write("\n]\n")
+    os.replace(tmp, ruta)
@@ -4,21 +4,27 @@ MediAgent - LangGraph state machine
 Define el grafo del agente con nodos y edges.
 Los nodos con interrupt() pausan automáticamente el grafo.
 """
+import os
+
 from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import MemorySaver
 
-from agent.state import AgentState
+from agent.state import AgentState, ETAPAS_FINALES
 from agent.nodes import (
     nodo_clasificar_y_sedes,
     nodo_doctores_horarios,
     nodo_confirmar,
     nodo_agendar,
+    anodo_clasificar_y_sedes,
+    anodo_doctores_horarios,
+    anodo_confirmar,
+    anodo_agendar,
 )
 
 
 def _router_post_sedes(state: AgentState) -> str:
     """Decide a dónde ir después de elegir sede."""
-    if state.get("etapa") == "sin_sedes":
+    if state.get("etapa") in ETAPAS_FINALES:  # sin_sedes
         return END
     return "doctores_horarios"
 
@@ -26,7 +32,7 @@ def _router_post_sedes(state: AgentState) -> str:
 def _router_post_doctores(state: AgentState) -> str:
     """Decide a dónde ir después de elegir doctor+horario."""
     etapa = state.get("etapa")
-    if etapa == "sin_doctores":
+    if etapa in ETAPAS_FINALES:  # sin_doctores
         return END
     if etapa == "sede_elegida":
         # El nodo eligió una sede alternativa, volver a buscar doctores
@@ -36,45 +42,76 @@ def _router_post_doctores(state: AgentState) -> str:
 
 def _router_post_confirmar(state: AgentState) -> str:
     """Decide a dónde ir después de la confirmación."""
-    if state.get("etapa") == "cancelado":
+    if state.get("etapa") in ETAPAS_FINALES:  # cancelado
         return END
     return "agendar"
 
 
-def build_graph():
+def _router_post_agendar(state: AgentState) -> str:
+    """Si el horario fue tomado por otro paciente, volver a confirmar la alternativa."""
+    if state.get("etapa") == "horario_tomado":
+        return "confirmar"
+    return END
+
+
+def build_graph(asincrono: bool = False):
     """
     Construye y retorna el grafo compilado con checkpointing.
+
+    asincrono=True usa los nodos async (ainvoke + tools.py en pool de hilos);
+    ese grafo se ejecuta con ainvoke/astream. El de main.py es el síncrono.
     
     Flujo:
     START → clasificar_y_sedes (HITL: elige sede)
           → doctores_horarios (HITL: elige doctor+horario)  
           → confirmar (HITL: confirma sí/no)
           → agendar → END
+                (horario tomado por otro paciente → confirmar la alternativa)
     """
     builder = StateGraph(AgentState)
     
     # ── Agregar nodos ──
-    builder.add_node("clasificar_y_sedes", nodo_clasificar_y_sedes)
-    builder.add_node("doctores_horarios", nodo_doctores_horarios)
-    builder.add_node("confirmar", nodo_confirmar)
-    builder.add_node("agendar", nodo_agendar)
+    if asincrono:
+        builder.add_node("clasificar_y_sedes", anodo_clasificar_y_sedes)
+        builder.add_node("doctores_horarios", anodo_doctores_horarios)
+        builder.add_node("confirmar", anodo_confirmar)
+        builder.add_node("agendar", anodo_agendar)
+    else:
+        builder.add_node("clasificar_y_sedes", nodo_clasificar_y_sedes)
+        builder.add_node("doctores_horarios", nodo_doctores_horarios)
+        builder.add_node("confirmar", nodo_confirmar)
+        builder.add_node("agendar", nodo_agendar)
     
     # ── Agregar edges ──
     builder.add_edge(START, "clasificar_y_sedes")
     builder.add_conditional_edges("clasificar_y_sedes", _router_post_sedes)
     builder.add_conditional_edges("doctores_horarios", _router_post_doctores)
     builder.add_conditional_edges("confirmar", _router_post_confirmar)
-    builder.add_edge("agendar", END)
+    builder.add_conditional_edges("agendar", _router_post_agendar)
     
     # ── Compilar con checkpointing ──
     # MemorySaver: estado en memoria (para MVP)
-    # Para producción: usar SqliteSaver o PostgresSaver
-    checkpointer = MemorySaver()
+    # MEDIAGENT_CHECKPOINTER=sqlite: SQLite con poda (ver agent/checkpointer.py)
+    if os.getenv("MEDIAGENT_CHECKPOINTER", "memory").lower() == "sqlite":
+        from agent.checkpointer import crear_checkpointer
+        checkpointer = crear_checkpointer(asincrono)
+    else:
+        checkpointer = MemorySaver()
     
     graph = builder.compile(checkpointer=checkpointer)
     
     return graph
 
 
-# Singleton del grafo
-graph = build_graph()
+# Singleton del grafo síncrono (main.py), creado al primer acceso a
+# agent.graph.graph: server.py solo construye el async con build_graph().
+_graph = None
+
+
+def __getattr__(nombre: str):
+    global _graph
+    if nombre != "graph":
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    if _graph is None:
+        _graph = build_graph()
+    return _graph
@@ -0,0 +1,74 @@
+"""
+MediAgent - Política de historial de mensajes
+
+`messages` crece un turno por cada pregunta del nodo de doctores (sedes
+alternativas, próxima semana, solo día, solo doctor, "ver más"...) y todo
+se copia en cada checkpoint. agregar_mensajes() es el reducer del estado:
+hace lo mismo que add_messages y, con MEDIAGENT_HISTORIAL_VENTANA=N > 0,
+conserva completos solo los últimos N mensajes. Los anteriores se condensan
+en un único SystemMessage de resumen (id fijo) al principio del historial:
+
+    Resumen de la conversación anterior:
+    Paciente: hola necesito cita
+    MediAgent: ¡Hola Andres! 👋 Con gusto te ayudo a agendar tu consulta de…
+
+El resumen es local (sin LLM): una línea recortada por mensaje y solo las
+últimas MEDIAGENT_HISTORIAL_RESUMEN_LINEAS, así que el historial tiene un
+tamaño máximo fijo. Los nodos arman sus prompts sin leer `messages`; los
+front ends solo usan el último mensaje del agente, que siempre queda.
+"""
+import os
+
+from langchain_core.messages import SystemMessage
+from langgraph.graph.message import add_messages
+
+# 0 = historial completo (comportamiento original)
+VENTANA = int(os.getenv("MEDIAGENT_HISTORIAL_VENTANA", "0"))
+RESUMEN_LINEAS = int(os.getenv("MEDIAGENT_HISTORIAL_RESUMEN_LINEAS", "20"))
+CARACTERES_POR_LINEA = 120
+
+ID_RESUMEN = "mediagent-resumen-historial"
+_ENCABEZADO = "Resumen de la conversación anterior:"
+_ROLES = {"human": "Paciente", "ai": "MediAgent"}
+
+
+def _texto(mensaje) -> str:
+    """Texto plano de un mensaje (content puede ser str o lista de bloques)."""
+    content = mensaje.content
+    if not isinstance(content, str):
+        content = " ".join(
+            b.get("text", "") if isinstance(b, dict) else str(b)
+            for b in content
+            if not isinstance(b, dict) or b.get("type") == "text"
+        )
+    return " ".join(content.split())
+
+
+def _linea(mensaje) -> str:
+    texto = _texto(mensaje)
+    if len(texto) > CARACTERES_POR_LINEA:
+        texto = texto[:CARACTERES_POR_LINEA - 1] + "…"
+    return f"{_ROLES.get(mensaje.type, mensaje.type)}: {texto}"
+
+
+def _resumen(lineas: list) -> SystemMessage:
+    return SystemMessage(content="\n".join([_ENCABEZADO] + lineas), id=ID_RESUMEN)
+
+
+def recortar(mensajes: list, ventana: int = VENTANA, lineas: int = RESUMEN_LINEAS) -> list:
+    """[resumen] + últimos `ventana` mensajes; el resto pasa al resumen."""
+    previo, cuerpo = [], mensajes
+    if mensajes and mensajes[0].id == ID_RESUMEN:
+        previo, cuerpo = mensajes[0].content.split("\n")[1:], mensajes[1:]
+    if len(cuerpo) <= ventana:
+        return mensajes
+
+    viejos, recientes = cuerpo[:-ventana], cuerpo[-ventana:]
+    resumen = (previo + [_linea(m) for m in viejos])[-lineas:] if lineas > 0 else []
+    return ([_resumen(resumen)] if resumen else []) + recientes
+
+
+def agregar_mensajes(izquierda, derecha) -> list:
+    """Reducer de AgentState.messages: add_messages + ventana con resumen."""
+    mensajes = add_messages(izquierda, derecha)
+    return recortar(mensajes) if VENTANA > 0 else mensajes
@@ -0,0 +1,417 @@
+"""
+MediAgent - Horarios en formato columnar binario (data/horarios.bin)
+
+horarios.json repite las seis claves en cada entrada y en memoria cada
+horario es un dict con seis strings. Aquí cada horario ocupa 14 bytes
+repartidos en columnas:
+
+    num      uint32   N de "hor-N"
+    doctor   uint16   índice en la tabla de ids de doctor (internados)
+    dia      uint16   días desde fecha_base
+    franja   uint8    índice en la tabla de franjas (inicio, fin), ordenada por hora
+    estado   uint8    índice en la tabla de estados
+
+más dos índices también guardados en el archivo: inicio_doctor (las filas
+están ordenadas por doctor, día y franja, así que los horarios de un doctor
+son un rango contiguo) y fila_por_num (hor-N → fila, -1 si no existe).
+
+El archivo se abre con mmap y las columnas son vistas NumPy sobre el mapa
+(sin copiar). El mapa es copy-on-write: los cambios de estado del journal
+se aplican en memoria sin tocar el archivo; guardar() escribe uno nuevo.
+
+Para el resto del código, abrir() entrega los mismos índices que
+repositorio._indexar_horarios ("filas", "por_id", "por_doctor",
+"por_doctor_fecha") con vistas perezosas: cada horario se materializa como
+FilaHorario solo cuando se pide. tools.py usa además "columnar" para
+filtrar los disponibles de un doctor con máscaras vectorizadas.
+
+Se activa con MEDIAGENT_HORARIOS_FORMATO=bin; el archivo se crea con
+scripts/convertir_horarios.py o scripts/regenerar_horarios.py --formato bin.
+"""
+import json
+import mmap
+import os
+import re
+import struct
+from collections.abc import Mapping
+from datetime import date
+
+import numpy as np
+
+MAGIA = b"MAHORCOL"
+VERSION = 1
+ESTADOS = ("disponible", "ocupado")
+CLAVES = ("id", "doctor_id", "fecha", "hora_inicio", "hora_fin", "estado")
+
+# (nombre, dtype) en el orden en que se escriben
+_COLUMNAS = (
+    ("num", np.uint32),
+    ("doctor", np.uint16),
+    ("dia", np.uint16),
+    ("franja", np.uint8),
+    ("estado", np.uint8),
+)
+_ID = re.compile(r"hor-(\d+)$")
+
+
+def _alinear(n: int) -> int:
+    return (n + 7) & ~7
+
+
+# ══════════════════════════════════════════════
+# Escritura
+# ══════════════════════════════════════════════
+
+def desde_filas(filas) -> dict:
+    """Dicts de horarios.json → columnas (mismo formato que generador_horarios.generar)."""
+    doctores, franjas, estados = {}, {}, {e: i for i, e in enumerate(ESTADOS)}
+    num, doctor, fecha, franja, estado = [], [], [], [], []
+    for h in filas:
+        m = _ID.match(h["id"])
+        if not m or f"hor-{int(m.group(1)):05d}" != h["id"]:
+            raise ValueError(f"Id de horario no convertible a formato columnar: {h['id']!r}")
+        num.append(int(m.group(1)))
+        doctor.append(doctores.setdefault(h["doctor_id"], len(doctores)))
+        fecha.append(date.fromisoformat(h["fecha"]).toordinal())
+        franja.append(franjas.setdefault((h["hora_inicio"], h["hora_fin"]), len(franjas)))
+        estado.append(estados.setdefault(h["estado"], len(estados)))
+    return {
+        "num": np.array(num, dtype=np.int64),
+        "doctor": np.array(doctor, dtype=np.intp),
+        "fecha": np.array(fecha, dtype=np.int64),
+        "franja": np.array(franja, dtype=np.intp),
+        "estado": np.array(estado, dtype=np.intp),
+        "doctores": list(doctores),
+        "franjas": list(franjas),
+        "estados": list(estados),
+    }
+
+
+def _empaquetar(columnas: dict) -> bytes:
+    """
+    Contenido completo de un horarios.bin. Acepta la salida de desde_filas()
+    o de generador_horarios.generar() (que trae "disponible" en lugar de
+    "estado"/"estados").
+    """
+    estados = list(columnas.get("estados", ESTADOS))
+    if "estado" in columnas:
+        estado = np.asarray(columnas["estado"])
+    else:
+        estado = np.where(columnas["disponible"], estados.index("disponible"), estados.index("ocupado"))
+    if len(estados) > 256 or len(columnas["doctores"]) > 65535:
+        raise ValueError("Demasiados estados o doctores para el formato columnar")
+
+    # Franjas ordenadas por hora: el índice de franja respeta el orden del día
+    franjas = [tuple(f) for f in columnas["franjas"]]
+    orden_franjas = sorted(range(len(franjas)), key=lambda i: franjas[i])
+    remapeo = np.empty(len(franjas), dtype=np.intp)
+    remapeo[orden_franjas] = np.arange(len(franjas))
+    franja = remapeo[np.asarray(columnas["franja"], dtype=np.intp)]
+
+    fecha = np.asarray(columnas["fecha"], dtype=np.int64)
+    fecha_base = int(fecha.min()) if len(fecha) else date.today().toordinal()
+    dia = fecha - fecha_base
+    if len(dia) and dia.max() > np.iinfo(np.uint16).max:
+        raise ValueError("Rango de fechas demasiado amplio para el formato columnar")
+    doctor = np.asarray(columnas["doctor"], dtype=np.intp)
+    num = np.asarray(columnas["num"], dtype=np.int64)
+
+    orden = np.lexsort((franja, dia, doctor))
+    datos = {
+        "num": num[orden].astype(np.uint32),
+        "doctor": doctor[orden].astype(np.uint16),
+        "dia": dia[orden].astype(np.uint16),
+        "franja": franja[orden].astype(np.uint8),
+        "estado": estado[orden].astype(np.uint8),
+    }
+    n_doctores = len(columnas["doctores"])
+    inicio_doctor = np.searchsorted(datos["doctor"], np.arange(n_doctores + 1)).astype(np.uint32)
+    fila_por_num = np.full(int(num.max()) + 1 if len(num) else 0, -1, dtype=np.int32)
+    fila_por_num[datos["num"]] = np.arange(len(num), dtype=np.int32)
+    if len(num) and (fila_por_num >= 0).sum() != len(num):
+        raise ValueError("Ids de horario duplicados")
+
+    cabecera = {
+        "version": VERSION,
+        "n": len(num),
+        "fecha_base": fecha_base,
+        "doctores": list(columnas["doctores"]),
+        "franjas": [franjas[i] for i in orden_franjas],
+        "estados": estados,
+        "n_nums": len(fila_por_num),
+    }
+    cabecera_bytes = json.dumps(cabecera, ensure_ascii=False).encode("utf-8")
+
+    # Cada columna empieza alineada a 8 bytes (así la lee TablaHorarios)
+    partes = [MAGIA, struct.pack("<I", len(cabecera_bytes)), cabecera_bytes]
+    largo = len(MAGIA) + 4 + len(cabecera_bytes)
+    for arreglo in (*(datos[nombre] for nombre, _ in _COLUMNAS), inicio_doctor, fila_por_num):
+        partes.append(b"\0" * (_alinear(largo) - largo))
+        partes.append(arreglo.tobytes())
+        largo = _alinear(largo) + arreglo.nbytes
+    return b"".join(partes)
+
+
+def escribir(ruta: str, columnas: dict):
+    """Guarda columnas en `ruta` (reemplazo atómico); mismas entradas que _empaquetar()."""
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_empaquetar(columnas))
+    os.replace(tmp, ruta)
+
+
+def _combinar(base: dict, nuevas: dict) -> dict:
+    """Concatena dos juegos de columnas remapeando sus tablas de doctores/franjas/estados."""
+    combinadas = {"num": [base["num"], nuevas["num"]], "fecha": [base["fecha"], nuevas["fecha"]]}
+    for clave, tabla in (("doctor", "doctores"), ("franja", "franjas"), ("estado", "estados")):
+        posicion = {v: i for i, v in enumerate(base[tabla])}
+        remapeo = np.array([posicion.setdefault(v, len(posicion)) for v in nuevas[tabla]], dtype=np.intp)
+        combinadas[clave] = [np.asarray(base[clave], dtype=np.intp), remapeo[nuevas[clave]]]
+        combinadas[tabla] = list(posicion)
+    for clave in ("num", "fecha", "doctor", "franja", "estado"):
+        combinadas[clave] = np.concatenate(combinadas[clave])
+    return combinadas
+
+
+# ══════════════════════════════════════════════
+# Lectura
+# ══════════════════════════════════════════════
+
+class TablaHorarios:
+    """Columnas de horarios.bin como vistas NumPy sobre un mmap copy-on-write."""
+
+    def __init__(self, buf):
+        """buf: mmap del archivo (ver de_archivo) o un bytearray con el mismo contenido."""
+        self._buf = buf
+        if buf[:len(MAGIA)] != MAGIA:
+            raise ValueError("No es un archivo de horarios columnar")
+        (largo,) = struct.unpack_from("<I", buf, len(MAGIA))
+        inicio = len(MAGIA) + 4
+        cabecera = json.loads(bytes(buf[inicio:inicio + largo]))
+        if cabecera["version"] != VERSION:
+            raise ValueError(f"Versión de horarios columnar no soportada: {cabecera['version']}")
+
+        self.n = cabecera["n"]
+        self.fecha_base = cabecera["fecha_base"]
+        self.doctores = cabecera["doctores"]
+        self.franjas = [tuple(f) for f in cabecera["franjas"]]
+        self.estados = cabecera["estados"]
+        self.indice_doctor = {d: i for i, d in enumerate(self.doctores)}
+
+        pos = _alinear(inicio + largo)
+        for nombre, dtype in _COLUMNAS:
+            pos = self._columna(nombre, dtype, self.n, pos)
+        pos = self._columna("inicio_doctor", np.uint32, len(self.doctores) + 1, pos)
+        self._columna("fila_por_num", np.int32, cabecera["n_nums"], pos)
+
+        n_dias = int(self.dia.max()) + 1 if self.n else 0
+        # ISO de cada día desde fecha_base (se indexa con la columna dia)
+        self.fechas = [date.fromordinal(self.fecha_base + d).isoformat() for d in range(n_dias)]
+
+    @classmethod
+    def de_archivo(cls, ruta: str) -> "TablaHorarios":
+        with open(ruta, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY))
+
+    def _columna(self, nombre: str, dtype, cantidad: int, pos: int) -> int:
+        arreglo = np.frombuffer(self._buf, dtype=dtype, count=cantidad, offset=pos)
+        setattr(self, nombre, arreglo)
+        return _alinear(pos + arreglo.nbytes)
+
+    # ── Traducciones ──
+
+    def fecha(self, i: int) -> str:
+        return self.fechas[self.dia[i]]
+
+    def dia_de(self, fecha: str) -> int:
+        return date.fromisoformat(fecha).toordinal() - self.fecha_base
+
+    def fila(self, horario_id: str) -> int:
+        """Fila de un id hor-N, o -1."""
+        m = _ID.match(horario_id)
+        if not m:
+            return -1
+        num = int(m.group(1))
+        return int(self.fila_por_num[num]) if num < len(self.fila_por_num) else -1
+
+    def codigo_estado(self, estado: str) -> int:
+        if estado not in self.estados:
+            if len(self.estados) == 256:
+                raise ValueError("Demasiados estados distintos para el formato columnar")
+            self.estados.append(estado)
+        return self.estados.index(estado)
+
+    def rango_doctor(self, doctor_id: str) -> tuple:
+        d = self.indice_doctor.get(doctor_id)
+        if d is None:
+            return 0, 0
+        return int(self.inicio_doctor[d]), int(self.inicio_doctor[d + 1])
+
+    # ── Consultas vectorizadas ──
+
+    def disponibles(self, doctor_id: str, desde: str, hasta: str = None) -> list:
+        """Horarios disponibles del doctor en [desde, hasta], ya ordenados (solo esas filas se materializan)."""
+        ini, fin = self.rango_doctor(doctor_id)
+        # Los días de un doctor están ordenados: el rango de fechas es una búsqueda binaria
+        dias = self.dia[ini:fin]
+        a = int(np.searchsorted(dias, max(self.dia_de(desde), 0)))
+        b = len(dias) if hasta is None else int(np.searchsorted(dias, self.dia_de(hasta), side="right"))
+        mascara = self.estado[ini + a:ini + b] == self.estados.index("disponible")
+        return [
+            {
+                "id": f"hor-{int(self.num[i]):05d}",
+                "fecha": self.fechas[self.dia[i]],
+                "hora_inicio": self.franjas[self.franja[i]][0],
+                "hora_fin": self.franjas[self.franja[i]][1],
+            }
+            for i in (np.flatnonzero(mascara) + ini + a).tolist()
+        ]
+
+    def columnas(self) -> dict:
+        """Columnas en el formato de escribir() (con los estados actuales en memoria)."""
+        return {
+            "num": self.num,
+            "doctor": self.doctor,
+            "fecha": self.dia.astype(np.int64) + self.fecha_base,
+            "franja": self.franja,
+            "estado": self.estado,
+            "doctores": self.doctores,
+            "franjas": self.franjas,
+            "estados": self.estados,
+        }
+
+    def guardar(self, ruta: str):
+        escribir(ruta, self.columnas())
+
+
+class FilaHorario(Mapping):
+    """Un horario de la tabla visto como dict (solo "estado" es modificable)."""
+
+    __slots__ = ("_t", "_i")
+
+    def __init__(self, tabla: TablaHorarios, i: int):
+        self._t = tabla
+        self._i = i
+
+    def __getitem__(self, clave):
+        t, i = self._t, self._i
+        if clave == "estado":
+            return t.estados[t.estado[i]]
+        if clave == "fecha":
+            return t.fechas[t.dia[i]]
+        if clave == "hora_inicio":
+            return t.franjas[t.franja[i]][0]
+        if clave == "hora_fin":
+            return t.franjas[t.franja[i]][1]
+        if clave == "doctor_id":
+            return t.doctores[t.doctor[i]]
+        if clave == "id":
+            return f"hor-{int(t.num[i]):05d}"
+        raise KeyError(clave)
+
+    def __setitem__(self, clave, valor):
+        if clave != "estado":
+            raise TypeError(f"Campo de horario no modificable en formato columnar: {clave}")
+        self._t.estado[self._i] = self._t.codigo_estado(valor)
+
+    def __iter__(self):
+        return iter(CLAVES)
+
+    def __len__(self):
+        return len(CLAVES)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class _Filas:
+    """Secuencia perezosa de FilaHorario (equivale a indices["filas"])."""
+
+    def __init__(self, tabla: TablaHorarios, ini: int = 0, fin: int = None):
+        self._t, self._ini = tabla, ini
+        self._fin = tabla.n if fin is None else fin
+
+    def __len__(self):
+        return self._fin - self._ini
+
+    def __iter__(self):
+        t = self._t
+        return (FilaHorario(t, i) for i in range(self._ini, self._fin))
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [FilaHorario(self._t, i) for i in range(self._ini, self._fin)[k]]
+        return FilaHorario(self._t, range(self._ini, self._fin)[k])
+
+
+class _PorId:
+    def __init__(self, tabla: TablaHorarios):
+        self._t = tabla
+
+    def get(self, horario_id: str, default=None):
+        i = self._t.fila(horario_id)
+        return FilaHorario(self._t, i) if i >= 0 else default
+
+    def __getitem__(self, horario_id: str):
+        fila = self.get(horario_id)
+        if fila is None:
+            raise KeyError(horario_id)
+        return fila
+
+    def __contains__(self, horario_id: str):
+        return self._t.fila(horario_id) >= 0
+
+
+class _PorDoctor:
+    def __init__(self, tabla: TablaHorarios):
+        self._t = tabla
+
+    def get(self, doctor_id: str, default=None):
+        ini, fin = self._t.rango_doctor(doctor_id)
+        return _Filas(self._t, ini, fin) if fin > ini else default
+
+
+class _PorDoctorFecha:
+    def __init__(self, tabla: TablaHorarios):
+        self._t = tabla
+
+    def get(self, clave: tuple, default=None):
+        doctor_id, fecha = clave
+        ini, fin = self._t.rango_doctor(doctor_id)
+        dia = self._t.dia_de(fecha)
+        dias = self._t.dia[ini:fin]
+        a, b = ini + int(np.searchsorted(dias, dia)), ini + int(np.searchsorted(dias, dia, side="right"))
+        return _Filas(self._t, a, b) if b > a else default
+
+
+def con_cambios(tabla: TablaHorarios, altas: list, bajas) -> dict:
+    """
+    Índices de una tabla nueva (en memoria) = `tabla` sin los ids de `bajas`
+    y con las filas `altas` (dicts de horarios.json). Vectorizado: se usa
+    para los eventos horarios_alta / horarios_baja del journal.
+    """
+    columnas = tabla.columnas()
+    nums_baja = [tabla.num[i] for i in map(tabla.fila, bajas) if i >= 0]
+    if nums_baja:
+        mantener = ~np.isin(tabla.num, nums_baja)
+        columnas = {
+            k: (v[mantener] if isinstance(v, np.ndarray) else v) for k, v in columnas.items()
+        }
+    if altas:
+        columnas = _combinar(columnas, desde_filas(altas))
+    return _indices(TablaHorarios(bytearray(_empaquetar(columnas))))
+
+
+def abrir(ruta: str) -> dict:
+    """Índices de horarios (misma forma que repositorio._indexar_horarios) sobre horarios.bin."""
+    return _indices(TablaHorarios.de_archivo(ruta))
+
+
+def _indices(tabla: TablaHorarios) -> dict:
+    return {
+        "filas": _Filas(tabla),
+        "por_id": _PorId(tabla),
+        "por_doctor": _PorDoctor(tabla),
+        "por_doctor_fecha": _PorDoctorFecha(tabla),
+        "columnar": tabla,
+    }
@@ -0,0 +1,158 @@
+"""
+MediAgent - Métricas de tiempo (spans) y tokens
+
+Con MEDIAGENT_METRICAS=1 se mide cada ejecución de:
+  - nodo    los 4 nodos del grafo (resultado ok / interrupt / error)
+  - tool    cada consulta a tools.py hecha desde los nodos
+  - llm     cada llamada a llm_chat / llm_parse, con tokens de entrada y salida
+  - correo  el envío a Resend
+
+exportar_prometheus() devuelve el formato de texto de Prometheus (histograma
+mediagent_span_seconds y contador mediagent_llm_tokens_total); server.py lo
+sirve en GET /metricas. Con MEDIAGENT_METRICAS_LOG=1 además se emite una línea
+JSON por span en el logger "mediagent.metricas".
+
+Apagado (default) los decoradores devuelven la función original: costo cero.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from langgraph.errors import GraphBubbleUp
+
+HABILITADO = os.getenv("MEDIAGENT_METRICAS", "0") == "1"
+LOG_JSON = os.getenv("MEDIAGENT_METRICAS_LOG", "0") == "1"
+
+# Límites superiores de los buckets, en segundos
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+logger = logging.getLogger("mediagent.metricas")
+
+
+class Registro:
+    """Histogramas por (tipo, nombre, resultado) y tokens por (modelo, dirección)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogramas = {}  # (tipo, nombre, resultado) -> [conteos por bucket..., +Inf, suma]
+        self._tokens = {}       # (modelo, direccion) -> total
+
+    def observar(self, tipo: str, nombre: str, resultado: str, segundos: float):
+        clave = (tipo, nombre, resultado)
+        i = bisect_left(BUCKETS, segundos)
+        with self._lock:
+            h = self._histogramas.get(clave)
+            if h is None:
+                h = self._histogramas[clave] = [0] * (len(BUCKETS) + 1) + [0.0]
+            h[i] += 1
+            h[-1] += segundos
+
+    def sumar_tokens(self, modelo: str, entrada: int, salida: int):
+        with self._lock:
+            for direccion, n in (("input", entrada), ("output", salida)):
+                clave = (modelo, direccion)
+                self._tokens[clave] = self._tokens.get(clave, 0) + n
+
+    def exportar_prometheus(self) -> str:
+        with self._lock:
+            histogramas = {k: list(v) for k, v in self._histogramas.items()}
+            tokens = dict(self._tokens)
+
+        lineas = [
+            "# HELP mediagent_span_seconds Duración de nodos, tools, llamadas al LLM y envío de correo",
+            "# TYPE mediagent_span_seconds histogram",
+        ]
+        for (tipo, nombre, resultado), h in sorted(histogramas.items()):
+            etiquetas = f'tipo="{tipo}",nombre="{nombre}",resultado="{resultado}"'
+            acumulado = 0
+            for limite, n in zip(BUCKETS, h):
+                acumulado += n
+                lineas.append(f'mediagent_span_seconds_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+            acumulado += h[len(BUCKETS)]
+            lineas.append(f'mediagent_span_seconds_bucket{{{etiquetas},le="+Inf"}} {acumulado}')
+            lineas.append(f"mediagent_span_seconds_sum{{{etiquetas}}} {h[-1]:.6f}")
+            lineas.append(f"mediagent_span_seconds_count{{{etiquetas}}} {acumulado}")
+
+        lineas += [
+            "# HELP mediagent_llm_tokens_total Tokens de entrada/salida por modelo",
+            "# TYPE mediagent_llm_tokens_total counter",
+        ]
+        for (modelo, direccion), n in sorted(tokens.items()):
+            lineas.append(f'mediagent_llm_tokens_total{{modelo="{modelo}",direccion="{direccion}"}} {n}')
+        return "\n".join(lineas) + "\n"
+
+
+registro = Registro()
+
+
+def exportar_prometheus() -> str:
+    return registro.exportar_prometheus()
+
+
+def _registrar(tipo: str, nombre: str, resultado: str, segundos: float, valor=None):
+    registro.observar(tipo, nombre, resultado, segundos)
+    evento = None
+    if tipo == "llm" and resultado == "ok":
+        uso = getattr(valor, "usage_metadata", None) or {}
+        entrada, salida = uso.get("input_tokens", 0), uso.get("output_tokens", 0)
+        registro.sumar_tokens(nombre, entrada, salida)
+        evento = {"input_tokens": entrada, "output_tokens": salida}
+    if LOG_JSON:
+        logger.info(json.dumps({
+            "span": tipo, "nombre": nombre, "resultado": resultado,
+            "ms": round(segundos * 1000, 3), **(evento or {}),
+        }, ensure_ascii=False))
+
+
+def _resultado_error(e: BaseException) -> str:
+    # interrupt() se implementa con una excepción: es una pausa, no un error
+    return "interrupt" if isinstance(e, GraphBubbleUp) else "error"
+
+
+def span(tipo: str, nombre=None):
+    """
+    Decorador que mide la función (sync o async) como un span de `tipo`.
+
+    nombre: etiqueta fija, o función que la calcula a partir de los argumentos
+    de la llamada (p. ej. lambda efecto: efecto.fn.__name__). Default: __name__.
+    Con métricas apagadas devuelve la función sin envolver.
+    """
+    def decorador(fn):
+        if not HABILITADO:
+            return fn
+        etiqueta = nombre if nombre is not None else fn.__name__
+
+        def _nombre(args, kwargs) -> str:
+            return etiqueta(*args, **kwargs) if callable(etiqueta) else etiqueta
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def envuelta_async(*args, **kwargs):
+                t0 = time.perf_counter()
+                try:
+                    valor = await fn(*args, **kwargs)
+                except BaseException as e:
+                    _registrar(tipo, _nombre(args, kwargs), _resultado_error(e), time.perf_counter() - t0)
+                    raise
+                _registrar(tipo, _nombre(args, kwargs), "ok", time.perf_counter() - t0, valor)
+                return valor
+            return envuelta_async
+
+        @functools.wraps(fn)
+        def envuelta(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                valor = fn(*args, **kwargs)
+            except BaseException as e:
+                _registrar(tipo, _nombre(args, kwargs), _resultado_error(e), time.perf_counter() - t0)
+                raise
+            _registrar(tipo, _nombre(args, kwargs), "ok", time.perf_counter() - t0, valor)
+            return valor
+        return envuelta
+
+    return decorador
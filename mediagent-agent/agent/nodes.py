@@ -9,10 +9,25 @@ Optimizaciones de velocidad:
   - LLM dual: llm_chat (respuestas) vs llm_parse (parsing de intención, max_tokens=5)
   - get_sedes_cercanas ya filtra sedes con disponibilidad real
   - Flujo robusto: si no hay doctores en la sede elegida, ofrece alternativas
+
+Sync y async con la misma lógica: cada nodo se escribe como un generador que
+hace `yield` de sus efectos (llamadas al LLM con _LLM, consultas a tools.py con
+_Tool) y recibe el resultado. _como_sync los ejecuta con invoke() y llamadas
+directas (grafo de main.py); _como_async con ainvoke() y tools.py en un pool
+de hilos, para que un solo proceso atienda muchas conversaciones a la vez.
+Con MEDIAGENT_ESTADO_COMPACTO=1 esos mismos envoltorios rehidratan el estado
+antes del nodo y guardan solo ids (ver agent/estado_compacto.py).
 """
+import asyncio
+import functools
+import hashlib
+import os
+import re
+from collections import OrderedDict
 from datetime import datetime, date, timedelta
 from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from langgraph.config import get_config
 from langgraph.types import interrupt
 
 from agent.tools import (
@@ -20,21 +35,31 @@ from agent.tools import (
     get_especialidad_nombre,
     get_sedes_cercanas,
     get_doctores_con_horarios,
+    get_mas_horarios,
     get_doctor_by_id,
     get_sede_by_id,
     get_horario_by_id,
     crear_cita,
+    HorarioNoDisponible,
 )
 from agent.state import AgentState
-from agent.email_service import enviar_correo_confirmacion
+from agent.correo_outbox import encolar_confirmacion
+from agent import estado_compacto, metricas, plantillas
+from agent.fechas import formatear_fecha as _format_fecha, precalentar as _precalentar_fechas
+from agent.cache_parse import cache_parse, clave as clave_parse
+from agent.parser_local import UMBRAL_CONFIANZA, parsear_opcion, parsear_si_no
 
 # ── LLMs ──────────────────────────────────────────────────────────────────────
 # llm_chat: genera respuestas conversacionales — Haiku es más que suficiente
-# y entre 3-5x más rápido que Sonnet para estas tareas
+# y entre 3-5x más rápido que Sonnet para estas tareas.
+# El tag permite a los front ends mostrar SOLO sus tokens en streaming
+# (stream_mode="messages"), sin los de llm_parse. Ver agent/streaming.py.
+TAG_RESPUESTA = "mediagent_respuesta"
 llm_chat = ChatAnthropic(
     model="claude-haiku-4-5-20251001",
     temperature=0.3,
     max_tokens=512,
+    tags=[TAG_RESPUESTA],
 )
 
 # llm_parse: solo extrae un número o sí/no — max_tokens mínimo = máxima velocidad
@@ -44,6 +69,15 @@ llm_parse = ChatAnthropic(
     max_tokens=5,
 )
 
+# Modo rápido: los listados de sedes y de doctores/horarios se arman con las
+# plantillas de agent/plantillas.py, sin round-trip a llm_chat
+MODO_RAPIDO = os.getenv("MEDIAGENT_MODO_RAPIDO", "0") == "1"
+
+# Listado paginado: con N > 0 cada doctor muestra sus N horarios más próximos
+# y cuántos le quedan; el resto se pide con "ver más" (get_mas_horarios).
+# Acota el prompt de llm_chat y lo que se guarda en el checkpoint.
+HORARIOS_POR_DOCTOR = int(os.getenv("MEDIAGENT_HORARIOS_POR_DOCTOR", "0")) or None
+
 SYSTEM_PROMPT = """Eres MediAgent, un asistente virtual médico amable y profesional.
 Tu objetivo es ayudar a los pacientes a agendar citas médicas.
 Responde siempre en español. Sé conciso, claro y usa un tono cálido.
@@ -51,13 +85,117 @@ Usa emojis médicos con moderación (🏥 👨‍⚕️ 📅 🕐 ✅) para hace
 NO inventes información. Solo usa los datos que se te proporcionan."""
 
 
-def _format_fecha(fecha_str: str) -> str:
-    """Convierte '2026-02-24' a 'Lunes 24 de febrero'."""
-    dias = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
-    meses = ["", "enero", "febrero", "marzo", "abril", "mayo", "junio",
-             "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"]
-    d = datetime.strptime(fecha_str, "%Y-%m-%d")
-    return f"{dias[d.weekday()]} {d.day} de {meses[d.month]}"
+# ── Efectos y ejecutores sync/async ───────────────────────────────────────────
+
+class _LLM:
+    """Efecto: llamada a un modelo (invoke / ainvoke)."""
+
+    def __init__(self, llm, mensajes: list):
+        self.llm = llm
+        self.mensajes = mensajes
+        self.nombre = "llm_chat" if TAG_RESPUESTA in (llm.tags or []) else "llm_parse"
+
+    @metricas.span("llm", lambda efecto: efecto.nombre)
+    def ejecutar(self):
+        return self.llm.invoke(self.mensajes)
+
+    @metricas.span("llm", lambda efecto: efecto.nombre)
+    async def aejecutar(self):
+        return await self.llm.ainvoke(self.mensajes)
+
+
+class _Tool:
+    """Efecto: consulta a tools.py (bloqueante → pool de hilos en modo async)."""
+
+    def __init__(self, fn, *args, **kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    @metricas.span("tool", lambda efecto: efecto.fn.__name__)
+    def ejecutar(self):
+        return self.fn(*self.args, **self.kwargs)
+
+    @metricas.span("tool", lambda efecto: efecto.fn.__name__)
+    async def aejecutar(self):
+        return await asyncio.to_thread(self.fn, *self.args, **self.kwargs)
+
+
+# Respuestas de llm_chat ya generadas, por (thread_id, prompt). Al reanudar
+# tras un interrupt() LangGraph re-ejecuta el nodo desde el inicio: así no se
+# vuelve a llamar (ni a hacer streaming) al LLM, y el texto guardado en
+# `messages` es exactamente el que vio el paciente.
+_respuestas_generadas = OrderedDict()
+_MAX_RESPUESTAS_GENERADAS = 2048
+
+
+def _respuesta_chat(mensajes: list):
+    """Genera (o reutiliza al reanudar) la respuesta de llm_chat. Generador."""
+    thread_id = get_config().get("configurable", {}).get("thread_id")
+    clave = None
+    if thread_id is not None:
+        prompt = "\n".join(m.content for m in mensajes)
+        clave = (thread_id, hashlib.sha1(prompt.encode("utf-8")).hexdigest())
+        if clave in _respuestas_generadas:
+            _respuestas_generadas.move_to_end(clave)
+            return _respuestas_generadas[clave]
+
+    response = yield _LLM(llm_chat, mensajes)
+
+    if clave is not None:
+        _respuestas_generadas[clave] = response.content
+        while len(_respuestas_generadas) > _MAX_RESPUESTAS_GENERADAS:
+            _respuestas_generadas.popitem(last=False)
+    return response.content
+
+
+def _salida(update, state):
+    """Lo que devolvió el nodo, con ids en vez de entidades si MEDIAGENT_ESTADO_COMPACTO=1."""
+    return estado_compacto.compactar(update, state) if estado_compacto.HABILITADO else update
+
+
+def _como_sync(paso):
+    """Convierte un nodo-generador en un nodo síncrono."""
+    @functools.wraps(paso)
+    def nodo(state: AgentState) -> dict:
+        if estado_compacto.HABILITADO:
+            gen = paso(estado_compacto.rehidratar(state))
+        else:
+            gen = paso(state)
+        valor, error = None, None
+        while True:
+            try:
+                efecto = gen.throw(error) if error else gen.send(valor)
+            except StopIteration as fin:
+                return _salida(fin.value, state)
+            valor, error = None, None
+            try:
+                valor = efecto.ejecutar()
+            except Exception as e:
+                error = e  # se relanza dentro del nodo, donde puede capturarse
+    return metricas.span("nodo", paso.__name__.removeprefix("_nodo_"))(nodo)
+
+
+def _como_async(paso):
+    """Convierte un nodo-generador en un nodo async (ainvoke + pool de hilos)."""
+    @functools.wraps(paso)
+    async def nodo(state: AgentState) -> dict:
+        if estado_compacto.HABILITADO:
+            gen = paso(await asyncio.to_thread(estado_compacto.rehidratar, state))
+        else:
+            gen = paso(state)
+        valor, error = None, None
+        while True:
+            try:
+                efecto = gen.throw(error) if error else gen.send(valor)
+            except StopIteration as fin:
+                return _salida(fin.value, state)
+            valor, error = None, None
+            try:
+                valor = await efecto.aejecutar()
+            except Exception as e:
+                error = e
+    return metricas.span("nodo", paso.__name__.removeprefix("_nodo_"))(nodo)
 
 
 def _agrupar_horarios_por_fecha(horarios: list) -> dict:
@@ -77,7 +215,12 @@ def _calcular_semanas() -> tuple:
     Semana = lunes a sábado.
     Returns: ((desde_actual, hasta_actual), (desde_sig, hasta_sig)) como strings ISO.
     """
-    hoy = date.today()
+    return _semanas_de(date.today())
+
+
+@functools.lru_cache(maxsize=4)
+def _semanas_de(hoy: date) -> tuple:
+    """_calcular_semanas() para `hoy`; se calcula una vez por día."""
     manana = hoy + timedelta(days=1)
     # Lunes de la semana que contiene mañana
     lunes = manana - timedelta(days=manana.weekday())
@@ -86,6 +229,7 @@ def _calcular_semanas() -> tuple:
     lunes_sig = lunes + timedelta(weeks=1)
     sabado_sig = lunes_sig + timedelta(days=5)
     semana_siguiente = (lunes_sig.isoformat(), sabado_sig.isoformat())
+    _precalentar_fechas(hoy)
     return semana_actual, semana_siguiente
 
 
@@ -99,6 +243,20 @@ def _quiere_siguiente_semana(text: str) -> bool:
     return any(k in text.lower() for k in keywords)
 
 
+def _quiere_ver_mas(text: str) -> bool:
+    """Detecta si el usuario pide más horarios del listado paginado."""
+    keywords = [
+        "ver más", "ver mas", "más horarios", "mas horarios", "otros horarios",
+        "más opciones", "mas opciones", "todos los horarios",
+    ]
+    return any(k in text.lower() for k in keywords)
+
+
+def _hay_mas(doctores_hrs: list) -> bool:
+    """True si algún doctor del listado paginado tiene horarios sin mostrar."""
+    return any(dh.get("total", 0) > len(dh["horarios"]) for dh in doctores_hrs)
+
+
 def _formatear_doctores(doctores_hrs: list) -> tuple:
     """
     Formatea el texto de doctores+horarios y construye opciones_flat.
@@ -114,6 +272,9 @@ def _formatear_doctores(doctores_hrs: list) -> tuple:
         for fecha, horas in agrupados.items():
             horas_fmt = ", ".join(horas)
             texto += f"   \U0001f4c5 {_format_fecha(fecha)}: {horas_fmt}\n"
+        resto = dh.get("total", 0) - len(dh["horarios"])
+        if resto > 0:
+            texto += f"   \u2795 y {resto} horario{'s' if resto > 1 else ''} más\n"
         for h in dh["horarios"]:
             opciones_flat.append({
                 "numero": n,
@@ -125,6 +286,81 @@ def _formatear_doctores(doctores_hrs: list) -> tuple:
     return texto, opciones_flat
 
 
+def _horario_mas_cercano(doctores_hrs: list, horario: dict, doctor_id: str) -> tuple:
+    """
+    Busca el horario disponible más cercano en el tiempo al que se pidió.
+    Prefiere al mismo doctor; si ya no tiene horarios, cualquiera de la sede.
+    Returns: (doctor, horario) o (None, None) si no queda ninguno.
+    """
+    ref = datetime.strptime(f"{horario['fecha']} {horario['hora_inicio']}", "%Y-%m-%d %H:%M")
+
+    def distancia(h: dict):
+        return abs(datetime.strptime(f"{h['fecha']} {h['hora_inicio']}", "%Y-%m-%d %H:%M") - ref)
+
+    mismo_doctor = [dh for dh in doctores_hrs if dh["doctor"]["id"] == doctor_id]
+    for grupo in (mismo_doctor, doctores_hrs):
+        candidatos = [(dh["doctor"], h) for dh in grupo for h in dh["horarios"] if h["id"] != horario["id"]]
+        if candidatos:
+            return min(candidatos, key=lambda c: distancia(c[1]))
+    return None, None
+
+
+# ── Índice de selección ───────────────────────────────────────────────────────
+# Se arma una vez por listado de doctores_horarios (caché por ids del listado:
+# sirve en cada re-pregunta, en cada vuelta de "ver más" y al reanudar el nodo)
+# para que detectar la elección sea proporcional al largo de la respuesta y no
+# a la cantidad de doctores × horarios de la sede.
+_RE_PALABRA = re.compile(r"\w+")
+_RE_HORA = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\b")
+
+_indices_seleccion = OrderedDict()
+_MAX_INDICES_SELECCION = 256
+
+
+def _indice_seleccion(doctores_hrs: list) -> dict:
+    """Índice de `doctores_hrs` (ver _armar_indice), reutilizado mientras el listado no cambie."""
+    # Mismos doctores y horarios en el mismo orden ⇒ mismas posiciones y textos
+    clave = tuple(
+        (dh["doctor"]["id"], tuple(h["id"] for h in dh["horarios"])) for dh in doctores_hrs
+    )
+    indice = _indices_seleccion.get(clave)
+    if indice is not None:
+        _indices_seleccion.move_to_end(clave)
+        return indice
+    indice = _indices_seleccion[clave] = _armar_indice(doctores_hrs)
+    while len(_indices_seleccion) > _MAX_INDICES_SELECCION:
+        _indices_seleccion.popitem(last=False)
+    return indice
+
+
+def _armar_indice(doctores_hrs: list) -> dict:
+    """
+    Índice para _detectar_seleccion. Las posiciones se refieren a `doctores_hrs`.
+      "doctores": token (primer apellido, nombres de más de 3 letras) → i del doctor
+      "fechas":   token ("lunes", "febrero"...) → fecha más temprana que lo contiene
+      "slots":    "doctor|fecha|hora" → [i del doctor, j del horario]; doctor y/o
+                  fecha vacíos = cualquiera. Gana el primero en el orden del listado.
+    """
+    doctores, fechas, slots = {}, {}, {}
+    todas_fechas = set()
+    for i, dh in enumerate(doctores_hrs):
+        doc = dh["doctor"]
+        tokens = [doc["apellidos"].split()[0].lower()]
+        tokens += [w.lower() for w in doc["nombres"].split() if len(w) > 3]
+        for t in tokens:
+            doctores.setdefault(t, i)
+        for j, h in enumerate(dh["horarios"]):
+            fecha, hora = h["fecha"], h["hora_inicio"]
+            todas_fechas.add(fecha)
+            for clave in (f"{i}|{fecha}|{hora}", f"{i}||{hora}", f"|{fecha}|{hora}", f"||{hora}"):
+                slots.setdefault(clave, [i, j])
+    for fecha in sorted(todas_fechas):
+        partes = _format_fecha(fecha).lower().split()  # "lunes 23 de febrero"
+        for t in [partes[0]] + [p for p in partes if len(p) > 3]:
+            fechas.setdefault(t, fecha)
+    return {"doctores": doctores, "fechas": fechas, "slots": slots}
+
+
 def _detectar_seleccion(user_input: str, doctores_hrs: list) -> dict:
     """
     Analiza la respuesta del usuario y determina qué információn entrego.
@@ -135,53 +371,37 @@ def _detectar_seleccion(user_input: str, doctores_hrs: list) -> dict:
       'solo_dia'      -> solo mencionó un día
       'desconocido'   -> no se detectó nada claro
     """
-    import re
+    indice = _indice_seleccion(doctores_hrs)
     txt = user_input.lower()
+    tokens = _RE_PALABRA.findall(txt)
 
-    # 1. Detectar doctor (por apellido o primer nombre)
-    doctor_dh = None
-    for dh in doctores_hrs:
-        apellido = dh["doctor"]["apellidos"].split()[0].lower()
-        nombres = [w.lower() for w in dh["doctor"]["nombres"].split() if len(w) > 3]
-        if apellido in txt or any(n in txt for n in nombres):
-            doctor_dh = dh
-            break
+    # 1. Detectar doctor (por apellido o primer nombre): el primero del listado
+    por_token = indice["doctores"]
+    docs = [por_token[t] for t in tokens if t in por_token]
+    i_doc = min(docs) if docs else None
 
-    # 2. Detectar fecha (por nombre del día o número del día)
-    todas_fechas = sorted({h["fecha"] for dh in doctores_hrs for h in dh["horarios"]})
-    fecha_detectada = None
-    for fecha in todas_fechas:
-        nombre_dia = _format_fecha(fecha).lower()  # "lunes 23 de febrero"
-        partes = nombre_dia.split()
-        if any(p in txt for p in partes if len(p) > 3):
-            fecha_detectada = fecha
-            break
-        if partes[0] in txt:  # nombre corto del día: "lunes", "martes"...
-            fecha_detectada = fecha
-            break
+    # 2. Detectar fecha (por nombre del día o del mes): la más temprana
+    por_token = indice["fechas"]
+    fechas = [por_token[t] for t in tokens if t in por_token]
+    fecha_detectada = min(fechas) if fechas else None
 
     # 3. Detectar hora (patrones numéricos tipo 8, 08, 8:00, 09:00)
     horario_detectado = None
-    hora_matches = re.findall(r'\b(\d{1,2})(?::(\d{2}))?\b', txt)
-    horas_candidatas = []
-    for h, m in hora_matches:
-        hora_n = int(h)
-        if 7 <= hora_n <= 18:
-            horas_candidatas.append(f"{hora_n:02d}:{m if m else '00'}")
-
+    horas_candidatas = {
+        f"{int(h):02d}:{m if m else '00'}"
+        for h, m in _RE_HORA.findall(txt)
+        if 7 <= int(h) <= 18
+    }
     if horas_candidatas:
-        candidatos = doctor_dh["horarios"] if doctor_dh else [h for dh in doctores_hrs for h in dh["horarios"]]
-        if fecha_detectada:
-            candidatos = [h for h in candidatos if h["fecha"] == fecha_detectada]
-        for h in candidatos:
-            if h["hora_inicio"] in horas_candidatas:
-                horario_detectado = h
-                if not doctor_dh:
-                    for dh in doctores_hrs:
-                        if any(x["id"] == h["id"] for x in dh["horarios"]):
-                            doctor_dh = dh
-                            break
-                break
+        prefijo = f"{'' if i_doc is None else i_doc}|{fecha_detectada or ''}|"
+        slots = indice["slots"]
+        encontrados = [slots[prefijo + hora] for hora in horas_candidatas if prefijo + hora in slots]
+        if encontrados:
+            i, j = min(encontrados)
+            i_doc = i
+            horario_detectado = doctores_hrs[i]["horarios"][j]
+
+    doctor_dh = doctores_hrs[i_doc] if i_doc is not None else None
 
     # 4. Determinar tipo
     if doctor_dh and fecha_detectada and horario_detectado:
@@ -204,12 +424,27 @@ def _detectar_seleccion(user_input: str, doctores_hrs: list) -> dict:
     }
 
 
-def _parsear_sede(user_input: str, sedes: list) -> dict | None:
+def _llm_parse_cacheado(user_input: str, opciones: str, parse_prompt: str):
+    """
+    llm_parse con caché (generador: usar con `yield from`). La misma frase
+    normalizada ante las mismas opciones reutiliza la respuesta anterior.
+    """
+    k = clave_parse(user_input, opciones)
+    texto = cache_parse.get(k)
+    if texto is None:
+        resp = yield _LLM(llm_parse, [HumanMessage(content=parse_prompt)])
+        texto = resp.content.strip()
+        cache_parse.put(k, texto)
+    return texto
+
+
+def _parsear_sede(user_input: str, sedes: list):
     """
-    Intenta identificar la sede elegida.
+    Intenta identificar la sede elegida (generador: usar con `yield from`).
     1. Por número (más rápido, sin LLM)
     2. Por nombre/distrito en el texto (sin LLM)
-    3. Fallback al LLM parser (solo si los anteriores fallan)
+    3. Parser local de ordinales / números en palabras (sin LLM)
+    4. Fallback al LLM parser (solo si los anteriores fallan)
     """
     txt = user_input.strip()
 
@@ -228,16 +463,21 @@ def _parsear_sede(user_input: str, sedes: list) -> dict | None:
         if any(k in txt_lower for k in keywords):
             return s
 
-    # Intento 3: LLM parser con max_tokens=5
+    # Intento 3: parser local ("la segunda", "la última", "tres")
+    num, confianza = parsear_opcion(txt, len(sedes))
+    if num and confianza >= UMBRAL_CONFIANZA:
+        return sedes[num - 1]
+
+    # Intento 4: LLM parser con max_tokens=5
     opciones_txt = "\n".join([f"{i+1}. {s['nombre']} ({s['distrito']})" for i, s in enumerate(sedes)])
     parse_prompt = f"""El paciente respondió: "{user_input}"
 Las opciones eran:
 {opciones_txt}
 ¿Cuál sede eligió? Responde SOLO el número (1, 2, etc). Si no es claro responde 0."""
 
-    resp = llm_parse.invoke([HumanMessage(content=parse_prompt)])
+    resp = yield from _llm_parse_cacheado(user_input, opciones_txt, parse_prompt)
     try:
-        num = int(resp.content.strip())
+        num = int(resp)
         if 1 <= num <= len(sedes):
             return sedes[num - 1]
     except ValueError:
@@ -246,27 +486,24 @@ Las opciones eran:
     return None
 
 
-def _parsear_opcion_numero(user_input: str, max_opcion: int, opciones_texto: str) -> int | None:
+def _parsear_opcion_numero(user_input: str, max_opcion: int, opciones_texto: str, claves_orden: list = None):
     """
-    Parsea la opción elegida por número.
-    1. Directo sin LLM
-    2. Fallback LLM parser
+    Parsea la opción elegida por número (generador: usar con `yield from`).
+    1. Parser local: número, ordinal, "la última", "la más temprana" (sin LLM)
+    2. Fallback LLM parser (solo con confianza baja)
     """
-    try:
-        num = int(user_input.strip())
-        if 1 <= num <= max_opcion:
-            return num
-    except ValueError:
-        pass
+    num, confianza = parsear_opcion(user_input, max_opcion, claves_orden)
+    if num and confianza >= UMBRAL_CONFIANZA:
+        return num
 
     # Fallback LLM
     parse_prompt = f"""El paciente respondió: "{user_input}"
 Las opciones eran:
 {opciones_texto}
 ¿Cuál opción eligió? Responde SOLO el número. Si no es claro responde 1."""
-    resp = llm_parse.invoke([HumanMessage(content=parse_prompt)])
+    resp = yield from _llm_parse_cacheado(user_input, opciones_texto, parse_prompt)
     try:
-        num = int(resp.content.strip())
+        num = int(resp)
         if 1 <= num <= max_opcion:
             return num
     except ValueError:
@@ -275,11 +512,28 @@ Las opciones eran:
     return None
 
 
+def _parsear_si_no(user_input: str, pregunta: str):
+    """
+    Interpreta una confirmación sí/no (generador: usar con `yield from`).
+    Solo llama al LLM si el parser local no está seguro; si tampoco es claro, es "no".
+    """
+    valor, confianza = parsear_si_no(user_input)
+    if valor is not None and confianza >= UMBRAL_CONFIANZA:
+        return valor
+
+    parse_prompt = f"""Se le preguntó al paciente: "{pregunta}"
+El paciente respondió: "{user_input}"
+¿Respondió que sí? Responde SOLO si o no."""
+    resp = yield from _llm_parse_cacheado(user_input, pregunta, parse_prompt)
+    valor, _ = parsear_si_no(resp)
+    return bool(valor)
+
+
 # ══════════════════════════════════════════════
 # NODO 1: Clasificar intención + Sugerir sedes
 # ══════════════════════════════════════════════
 
-def nodo_clasificar_y_sedes(state: AgentState) -> dict:
+def _nodo_clasificar_y_sedes(state: AgentState):
     """
     Recibe el primer mensaje del paciente.
     Muestra SOLO las sedes con disponibilidad real (filtradas en tools.py).
@@ -287,11 +541,11 @@ def nodo_clasificar_y_sedes(state: AgentState) -> dict:
     """
     paciente = state["paciente"]
     nombre = paciente["nombres"]
-    especialidad = get_especialidad_nombre(paciente["especialidad_id"])
+    especialidad = yield _Tool(get_especialidad_nombre, paciente["especialidad_id"])
     distrito = paciente["distrito"]
 
     # Sedes cercanas CON disponibilidad real (ya filtradas en get_sedes_cercanas)
-    sedes = get_sedes_cercanas(distrito, paciente["especialidad_id"])
+    sedes = yield _Tool(get_sedes_cercanas, distrito, paciente["especialidad_id"])
 
     if not sedes:
         msg = (
@@ -319,7 +573,10 @@ def nodo_clasificar_y_sedes(state: AgentState) -> dict:
         for i, s in enumerate(sedes)
     ])
 
-    prompt = f"""El paciente {nombre} vive en {distrito} y necesita una consulta de {especialidad}.
+    if MODO_RAPIDO:
+        agent_msg = plantillas.mensaje_sedes(nombre, especialidad, distrito, opciones_texto, sede_recomendada)
+    else:
+        prompt = f"""El paciente {nombre} vive en {distrito} y necesita una consulta de {especialidad}.
 Su mensaje fue: "{state['messages'][-1].content}"
 
 Las sedes disponibles (con doctores y horarios confirmados) son:
@@ -336,11 +593,10 @@ Genera una respuesta amigable que:
 
 IMPORTANTE: Muestra las sedes exactamente como están arriba, con sus números y el ⭐."""
 
-    response = llm_chat.invoke([
-        SystemMessage(content=SYSTEM_PROMPT),
-        HumanMessage(content=prompt),
-    ])
-    agent_msg = response.content
+        agent_msg = yield from _respuesta_chat([
+            SystemMessage(content=SYSTEM_PROMPT),
+            HumanMessage(content=prompt),
+        ])
 
     # ── HITL: Pausar y esperar elección de sede ──
     user_choice = interrupt({
@@ -350,7 +606,7 @@ IMPORTANTE: Muestra las sedes exactamente como están arriba, con sus números y
     })
 
     # Parsear elección (rápido: número → keyword → LLM)
-    sede_elegida = _parsear_sede(user_choice, sedes)
+    sede_elegida = yield from _parsear_sede(user_choice, sedes)
     if not sede_elegida:
         sede_elegida = sedes[0]  # fallback: primera opción
 
@@ -369,7 +625,7 @@ IMPORTANTE: Muestra las sedes exactamente como están arriba, con sus números y
 # NODO 2: Mostrar doctores + horarios
 # ══════════════════════════════════════════════
 
-def nodo_doctores_horarios(state: AgentState) -> dict:
+def _nodo_doctores_horarios(state: AgentState):
     """
     Muestra los doctores de la sede elegida con sus horarios disponibles.
     Si no hay doctores, ofrece al paciente elegir otra sede disponible.
@@ -377,11 +633,14 @@ def nodo_doctores_horarios(state: AgentState) -> dict:
     """
     paciente = state["paciente"]
     sede = state["sede_elegida"]
-    especialidad = get_especialidad_nombre(paciente["especialidad_id"])
+    especialidad = yield _Tool(get_especialidad_nombre, paciente["especialidad_id"])
     sedes_disponibles = state.get("sedes_disponibles", [])
 
     # Buscar doctores con horarios
-    doctores_hrs = get_doctores_con_horarios(sede["id"], paciente["especialidad_id"])
+    doctores_hrs = yield _Tool(
+        get_doctores_con_horarios, sede["id"], paciente["especialidad_id"],
+        max_por_doctor=HORARIOS_POR_DOCTOR,
+    )
 
     # ── Caso: no hay doctores en la sede elegida ──
     if not doctores_hrs:
@@ -421,13 +680,16 @@ def nodo_doctores_horarios(state: AgentState) -> dict:
             "opciones": [{"numero": i+1, "sede": s} for i, s in enumerate(otras_sedes)],
         })
 
-        nueva_sede = _parsear_sede(user_choice, otras_sedes)
+        nueva_sede = yield from _parsear_sede(user_choice, otras_sedes)
         if not nueva_sede:
             nueva_sede = otras_sedes[0]
 
         # Actualizar sede y buscar doctores en la nueva sede
         sede = nueva_sede
-        doctores_hrs = get_doctores_con_horarios(sede["id"], paciente["especialidad_id"])
+        doctores_hrs = yield _Tool(
+            get_doctores_con_horarios, sede["id"], paciente["especialidad_id"],
+            max_por_doctor=HORARIOS_POR_DOCTOR,
+        )
 
         if not doctores_hrs:
             msg = f"Parece que tampoco hay disponibilidad en {sede['nombre']} en este momento. 😔 Por favor llama al 01-422-0000."
@@ -457,14 +719,15 @@ def nodo_doctores_horarios(state: AgentState) -> dict:
     (desde_actual, hasta_actual), (desde_sig, hasta_sig) = _calcular_semanas()
 
     # Doctores disponibles ESTA SEMANA
-    doctores_semana = get_doctores_con_horarios(
-        sede["id"], paciente["especialidad_id"],
-        fecha_desde=desde_actual, fecha_hasta=hasta_actual,
+    doctores_semana = yield _Tool(
+        get_doctores_con_horarios, sede["id"], paciente["especialidad_id"],
+        fecha_desde=desde_actual, fecha_hasta=hasta_actual, max_por_doctor=HORARIOS_POR_DOCTOR,
     )
 
     messages_extra = []
     doctores_para_mostrar = doctores_semana
     label_semana = "esta semana"
+    hasta_mostrado = hasta_actual
 
     # ── Si no hay slots esta semana → preguntar por la siguiente ──
     if not doctores_semana:
@@ -479,9 +742,7 @@ def nodo_doctores_horarios(state: AgentState) -> dict:
         })
         messages_extra += [AIMessage(content=msg_sin_semana), HumanMessage(content=user_ans)]
 
-        confirmado = any(w in user_ans.lower() for w in [
-            "sí", "si", "yes", "claro", "ok", "dale", "perfecto", "sólo", "solo", "quiero", "s"
-        ])
+        confirmado = yield from _parsear_si_no(user_ans, "¿Te gustaría ver los horarios de la próxima semana?")
         if not confirmado:
             msg_fin = "Entendido. Si cambias de opinión o necesitas otra fecha, con gusto te ayudamos. \U0001f60a"
             return {
@@ -491,9 +752,9 @@ def nodo_doctores_horarios(state: AgentState) -> dict:
             }
 
         # Cargar próxima semana
-        doctores_semana_sig = get_doctores_con_horarios(
-            sede["id"], paciente["especialidad_id"],
-            fecha_desde=desde_sig, fecha_hasta=hasta_sig,
+        doctores_semana_sig = yield _Tool(
+            get_doctores_con_horarios, sede["id"], paciente["especialidad_id"],
+            fecha_desde=desde_sig, fecha_hasta=hasta_sig, max_por_doctor=HORARIOS_POR_DOCTOR,
         )
         if not doctores_semana_sig:
             msg_fin = (
@@ -508,11 +769,17 @@ def nodo_doctores_horarios(state: AgentState) -> dict:
 
         doctores_para_mostrar = doctores_semana_sig
         label_semana = "la próxima semana"
+        hasta_mostrado = hasta_sig
 
     # ── Formatear y mostrar doctores de la semana elegida ──
     texto_drs, opciones_flat = _formatear_doctores(doctores_para_mostrar)
 
-    prompt = f"""El paciente va a la sede {sede['nombre']} para {especialidad}.
+    if MODO_RAPIDO:
+        agent_msg = plantillas.mensaje_doctores(
+            sede, especialidad, texto_drs, label_semana, _hay_mas(doctores_para_mostrar),
+        )
+    else:
+        prompt = f"""El paciente va a la sede {sede['nombre']} para {especialidad}.
 Aquí están los doctores disponibles {label_semana}:
 
 {texto_drs}
@@ -522,14 +789,13 @@ Genera una respuesta que:
 2. Muestre exactamente los doctores y horarios como están arriba
 3. {'Mencione que si ningún horario de esta semana le viene bien puede pedir ver la próxima semana' if label_semana == 'esta semana' else 'Pida elegir doctor, día y hora'}
 4. Pida al paciente que elija doctor, día y hora
-
+{'5. Indique que puede escribir "ver más" (y el apellido del doctor) para ver más horarios' if _hay_mas(doctores_para_mostrar) else ''}
 IMPORTANTE: Muestra los doctores y horarios exactamente como se presentan."""
 
-    response = llm_chat.invoke([
-        SystemMessage(content=SYSTEM_PROMPT),
-        HumanMessage(content=prompt),
-    ])
-    agent_msg = response.content
+        agent_msg = yield from _respuesta_chat([
+            SystemMessage(content=SYSTEM_PROMPT),
+            HumanMessage(content=prompt),
+        ])
 
     # ── HITL: Pausar y esperar elección ──
     user_choice = interrupt({
@@ -541,9 +807,9 @@ IMPORTANTE: Muestra los doctores y horarios exactamente como se presentan."""
 
     # ── Detectar si el usuario pide la semana siguiente ──
     if label_semana == "esta semana" and _quiere_siguiente_semana(user_choice):
-        doctores_semana_sig = get_doctores_con_horarios(
-            sede["id"], paciente["especialidad_id"],
-            fecha_desde=desde_sig, fecha_hasta=hasta_sig,
+        doctores_semana_sig = yield _Tool(
+            get_doctores_con_horarios, sede["id"], paciente["especialidad_id"],
+            fecha_desde=desde_sig, fecha_hasta=hasta_sig, max_por_doctor=HORARIOS_POR_DOCTOR,
         )
         if not doctores_semana_sig:
             msg_no_sig = (
@@ -557,19 +823,24 @@ IMPORTANTE: Muestra los doctores y horarios exactamente como se presentan."""
             }
 
         texto_sig, opciones_flat = _formatear_doctores(doctores_semana_sig)
-        prompt_sig = f"""El paciente quiere ver horarios de la próxima semana en {sede['nombre']} para {especialidad}.
+        if MODO_RAPIDO:
+            agent_msg_sig = plantillas.mensaje_doctores(
+                sede, especialidad, texto_sig, "la próxima semana", _hay_mas(doctores_semana_sig),
+            )
+        else:
+            prompt_sig = f"""El paciente quiere ver horarios de la próxima semana en {sede['nombre']} para {especialidad}.
 Aquí están los doctores disponibles la próxima semana:
 
 {texto_sig}
 
 Genera una respuesta amigable mostrando estos doctores y pidiendo que elija doctor, día y hora.
+{'Indica que puede escribir "ver más" (y el apellido del doctor) para ver más horarios.' if _hay_mas(doctores_semana_sig) else ''}
 IMPORTANTE: Muestra los doctores y horarios exactamente como están arriba."""
 
-        resp_sig = llm_chat.invoke([
-            SystemMessage(content=SYSTEM_PROMPT),
-            HumanMessage(content=prompt_sig),
-        ])
-        agent_msg_sig = resp_sig.content
+            agent_msg_sig = yield from _respuesta_chat([
+                SystemMessage(content=SYSTEM_PROMPT),
+                HumanMessage(content=prompt_sig),
+            ])
 
         user_choice = interrupt({
             "message": agent_msg_sig,
@@ -578,6 +849,34 @@ IMPORTANTE: Muestra los doctores y horarios exactamente como están arriba."""
         })
         messages_extra += [AIMessage(content=agent_msg_sig), HumanMessage(content=user_choice)]
         doctores_para_mostrar = doctores_semana_sig
+        hasta_mostrado = hasta_sig
+
+    # ── "Ver más": página siguiente de horarios (listado paginado) ──────────
+    while HORARIOS_POR_DOCTOR and _quiere_ver_mas(user_choice):
+        # Solo los del doctor nombrado, o de todos si no nombró a ninguno
+        pedido = _detectar_seleccion(user_choice, doctores_para_mostrar)["doctor_dh"]
+        ampliados = []
+        for dh in doctores_para_mostrar:
+            if dh.get("total", 0) > len(dh["horarios"]) and (pedido is None or dh is pedido):
+                ultimo = dh["horarios"][-1]
+                mas = yield _Tool(
+                    get_mas_horarios, dh["doctor"]["id"], (ultimo["fecha"], ultimo["hora_inicio"]),
+                    fecha_hasta=hasta_mostrado, limite=HORARIOS_POR_DOCTOR,
+                )
+                hors = dh["horarios"] + mas
+                # Página incompleta: no quedan más (aunque "total" dijera otra cosa)
+                dh = {**dh, "horarios": hors, "total": dh["total"] if len(mas) == HORARIOS_POR_DOCTOR else len(hors)}
+            ampliados.append(dh)
+        doctores_para_mostrar = ampliados
+
+        texto_drs, opciones_flat = _formatear_doctores(doctores_para_mostrar)
+        msg_mas = plantillas.mensaje_mas_horarios(texto_drs, _hay_mas(doctores_para_mostrar))
+        user_choice = interrupt({
+            "message": msg_mas,
+            "type": "ver_mas_horarios",
+            "doctores": doctores_para_mostrar,
+        })
+        messages_extra += [AIMessage(content=msg_mas), HumanMessage(content=user_choice)]
 
     # ════════════════════════════════════════════════
     # PARSEAR SELECCIÓN: 4 casos según lo que dijo el usuario
@@ -587,8 +886,8 @@ IMPORTANTE: Muestra los doctores y horarios exactamente como están arriba."""
     doctor_elegido = None
     horario_elegido = None
 
-    def _pedir_hora(doc_dict: dict, hors: list) -> dict:
-        """Helper: interrupt para pedir hora específica."""
+    def _pedir_hora(doc_dict: dict, hors: list):
+        """Helper: interrupt para pedir hora específica (generador)."""
         nonlocal messages_extra
         horas_txt = "\n".join([
             f"  {i+1}. \U0001f550 {h['hora_inicio']} - {h['hora_fin']}"
@@ -601,7 +900,11 @@ IMPORTANTE: Muestra los doctores y horarios exactamente como están arriba."""
         )
         resp = interrupt({"message": msg, "type": "elegir_hora", "horas": hors})
         messages_extra += [AIMessage(content=msg), HumanMessage(content=resp)]
-        n = _parsear_opcion_numero(resp, len(hors), "\n".join([f"{i+1}. {h['hora_inicio']}" for i, h in enumerate(hors)]))
+        n = yield from _parsear_opcion_numero(
+            resp, len(hors),
+            "\n".join([f"{i+1}. {h['hora_inicio']}" for i, h in enumerate(hors)]),
+            [h["hora_inicio"] for h in hors],
+        )
         return hors[n - 1] if n else hors[0]
 
     # ── Caso A: Completo (doctor + día + hora) ──────────────────────────────
@@ -629,7 +932,7 @@ IMPORTANTE: Muestra los doctores y horarios exactamente como están arriba."""
         elif sel2["tipo"] in ("doctor_y_dia", "solo_dia") and sel2["fecha"]:
             hors = [h for h in doc_dh["horarios"] if h["fecha"] == sel2["fecha"]]
             doctor_elegido = doc
-            horario_elegido = _pedir_hora(doc, hors) if hors else None
+            horario_elegido = (yield from _pedir_hora(doc, hors)) if hors else None
         else:
             # Fallback: primer horario del doctor
             doctor_elegido = doc
@@ -641,7 +944,7 @@ IMPORTANTE: Muestra los doctores y horarios exactamente como están arriba."""
         fecha = sel["fecha"]
         hors = [h for h in doc_dh["horarios"] if h["fecha"] == fecha]
         doctor_elegido = sel["doctor"]
-        horario_elegido = _pedir_hora(sel["doctor"], hors) if hors else None
+        horario_elegido = (yield from _pedir_hora(sel["doctor"], hors)) if hors else None
 
     # ── Caso D: Solo día → mostrar doctores de ese día, pedir doctor+hora ──
     elif sel["tipo"] == "solo_dia":
@@ -672,7 +975,7 @@ IMPORTANTE: Muestra los doctores y horarios exactamente como están arriba."""
         elif sel3["tipo"] in ("doctor_y_dia", "solo_doctor") and sel3["doctor_dh"]:
             hors = [h for h in sel3["doctor_dh"]["horarios"] if h["fecha"] == fecha]
             doctor_elegido = sel3["doctor"]
-            horario_elegido = _pedir_hora(sel3["doctor"], hors) if hors else None
+            horario_elegido = (yield from _pedir_hora(sel3["doctor"], hors)) if hors else None
         else:
             # Fallback: parse por número en el listado del día
             opciones_dia = [
@@ -680,9 +983,10 @@ IMPORTANTE: Muestra los doctores y horarios exactamente como están arriba."""
                 for i, d in enumerate(docs_ese_dia)
                 for h in d["horarios"]
             ]
-            num_dia = _parsear_opcion_numero(
+            num_dia = yield from _parsear_opcion_numero(
                 resp3, len(opciones_dia),
-                "\n".join([f"{o['numero']}. {o['doctor']['apellidos']} {o['horario']['hora_inicio']}" for o in opciones_dia])
+                "\n".join([f"{o['numero']}. {o['doctor']['apellidos']} {o['horario']['hora_inicio']}" for o in opciones_dia]),
+                [o["horario"]["hora_inicio"] for o in opciones_dia],
             )
             if num_dia and opciones_dia:
                 doctor_elegido = opciones_dia[num_dia - 1]["doctor"]
@@ -694,7 +998,10 @@ IMPORTANTE: Muestra los doctores y horarios exactamente como están arriba."""
             f"{o['numero']}. Dr(a). {o['doctor']['apellidos']} - {o['horario']['fecha']} {o['horario']['hora_inicio']}"
             for o in opciones_flat
         ])
-        num = _parsear_opcion_numero(user_choice, len(opciones_flat), opciones_texto_num)
+        num = yield from _parsear_opcion_numero(
+            user_choice, len(opciones_flat), opciones_texto_num,
+            [(o["horario"]["fecha"], o["horario"]["hora_inicio"]) for o in opciones_flat],
+        )
         if num:
             for o in opciones_flat:
                 if o["numero"] == num:
@@ -703,7 +1010,14 @@ IMPORTANTE: Muestra los doctores y horarios exactamente como están arriba."""
                     break
 
     # ── Fallback final ───────────────────────────────────────────────────────
-    if not doctor_elegido and opciones_flat:
+    # Doctor sin horas el día pedido: su primer horario del listado
+    if doctor_elegido and not horario_elegido:
+        horario_elegido = next(
+            (dh["horarios"][0] for dh in doctores_para_mostrar
+             if dh["doctor"]["id"] == doctor_elegido["id"] and dh["horarios"]),
+            None,
+        )
+    if not horario_elegido and opciones_flat:
         doctor_elegido = opciones_flat[0]["doctor"]
         horario_elegido = opciones_flat[0]["horario"]
 
@@ -720,7 +1034,7 @@ IMPORTANTE: Muestra los doctores y horarios exactamente como están arriba."""
 # NODO 3: Confirmar cita
 # ══════════════════════════════════════════════
 
-def nodo_confirmar(state: AgentState) -> dict:
+def _nodo_confirmar(state: AgentState):
     """
     Muestra resumen de la cita y pide confirmación.
     PAUSA esperando confirmación del paciente.
@@ -729,10 +1043,18 @@ def nodo_confirmar(state: AgentState) -> dict:
     sede = state["sede_elegida"]
     doctor = state["doctor_elegido"]
     horario = state["horario_elegido"]
-    especialidad = get_especialidad_nombre(paciente["especialidad_id"])
+    especialidad = yield _Tool(get_especialidad_nombre, paciente["especialidad_id"])
     fecha_fmt = _format_fecha(horario["fecha"])
 
-    resumen = f"""📋 **Resumen de tu cita:**
+    # Si volvemos desde nodo_agendar porque el horario fue tomado, avisar
+    aviso = ""
+    if state.get("etapa") == "horario_tomado":
+        aviso = (
+            "⚠️ El horario que elegiste acaba de ser reservado por otro paciente.\n"
+            "Te proponemos el horario disponible más cercano:\n\n"
+        )
+
+    resumen = f"""{aviso}📋 **Resumen de tu cita:**
 
 🏥 **Sede:** {sede['nombre']}
 📍 **Dirección:** {sede['direccion']}
@@ -750,11 +1072,8 @@ def nodo_confirmar(state: AgentState) -> dict:
         "type": "confirmar_cita",
     })
 
-    # Parsear confirmación (sin LLM — simple keyword match)
-    respuesta = user_choice.strip().lower()
-    confirmado = any(word in respuesta for word in [
-        "sí", "si", "yes", "confirmo", "ok", "dale", "claro", "por supuesto", "s"
-    ])
+    # Parsear confirmación (parser local; LLM solo si no es claro)
+    confirmado = yield from _parsear_si_no(user_choice, "¿Confirmas esta cita?")
 
     if not confirmado:
         msg = "Entendido, la cita no fue agendada. ¿Hay algo más en lo que pueda ayudarte? 😊"
@@ -780,27 +1099,51 @@ def nodo_confirmar(state: AgentState) -> dict:
 # NODO 4: Agendar cita
 # ══════════════════════════════════════════════
 
-def nodo_agendar(state: AgentState) -> dict:
+def _nodo_agendar(state: AgentState):
     """
-    Crea la cita en la BD, actualiza el horario y envía confirmación.
+    Crea la cita en la BD, actualiza el horario y encola el correo de confirmación.
+    Si otro paciente reservó el horario primero, propone el más cercano
+    disponible y vuelve a nodo_confirmar (etapa 'horario_tomado').
     """
     paciente = state["paciente"]
     sede = state["sede_elegida"]
     doctor = state["doctor_elegido"]
     horario = state["horario_elegido"]
-    especialidad = get_especialidad_nombre(paciente["especialidad_id"])
+    especialidad = yield _Tool(get_especialidad_nombre, paciente["especialidad_id"])
     fecha_fmt = _format_fecha(horario["fecha"])
 
-    # Crear la cita
-    cita = crear_cita(
-        paciente_id=paciente["id"],
-        doctor_id=doctor["id"],
-        sede_id=sede["id"],
-        horario_id=horario["id"],
-    )
+    # Crear la cita (compare-and-set: falla si el horario ya fue tomado)
+    try:
+        cita = yield _Tool(
+            crear_cita,
+            paciente_id=paciente["id"],
+            doctor_id=doctor["id"],
+            sede_id=sede["id"],
+            horario_id=horario["id"],
+        )
+    except HorarioNoDisponible:
+        doctores_hrs = yield _Tool(get_doctores_con_horarios, sede["id"], paciente["especialidad_id"])
+        doctor_alt, horario_alt = _horario_mas_cercano(doctores_hrs, horario, doctor["id"])
+        if not horario_alt:
+            msg = (
+                f"Lo siento, el horario del {fecha_fmt} a las {horario['hora_inicio']} acaba de ser "
+                f"reservado y ya no quedan horarios disponibles en {sede['nombre']}. 😔\n"
+                f"Te recomendamos llamar al 01-422-0000 para más opciones."
+            )
+            return {
+                "messages": [AIMessage(content=msg)],
+                "etapa": "sin_doctores",
+            }
+        return {
+            "etapa": "horario_tomado",
+            "doctores_horarios": doctores_hrs,
+            "doctor_elegido": doctor_alt,
+            "horario_elegido": horario_alt,
+        }
 
-    # ── Enviar correo de confirmación ──
-    email_result = enviar_correo_confirmacion(
+    # ── Encolar correo de confirmación (lo envía el worker de agent/correo_outbox.py) ──
+    email_result = yield _Tool(
+        encolar_confirmacion,
         paciente=paciente,
         doctor=doctor,
         sede=sede,
@@ -811,10 +1154,10 @@ def nodo_agendar(state: AgentState) -> dict:
     )
 
     if email_result["success"]:
-        email_texto = f"📧 Se ha enviado un correo de confirmación a **{paciente['correo']}**."
+        email_texto = f"📧 Te enviaremos un correo de confirmación a **{paciente['correo']}**."
     else:
         email_texto = (
-            f"📧 No se pudo enviar el correo de confirmación a {paciente['correo']}.\n"
+            f"📧 No se pudo programar el correo de confirmación a {paciente['correo']}.\n"
             f"   _({email_result['message']})_"
         )
 
@@ -834,3 +1177,18 @@ Recuerda llegar 15 minutos antes de tu cita. ¿Hay algo más en lo que pueda ayu
         "etapa": "cita_agendada",
         "cita_creada": cita,
     }
+
+
+# ══════════════════════════════════════════════
+# Nodos exportados (sync para main.py, async para build_graph(asincrono=True))
+# ══════════════════════════════════════════════
+
+nodo_clasificar_y_sedes = _como_sync(_nodo_clasificar_y_sedes)
+nodo_doctores_horarios = _como_sync(_nodo_doctores_horarios)
+nodo_confirmar = _como_sync(_nodo_confirmar)
+nodo_agendar = _como_sync(_nodo_agendar)
+
+anodo_clasificar_y_sedes = _como_async(_nodo_clasificar_y_sedes)
+anodo_doctores_horarios = _como_async(_nodo_doctores_horarios)
+anodo_confirmar = _como_async(_nodo_confirmar)
+anodo_agendar = _como_async(_nodo_agendar)
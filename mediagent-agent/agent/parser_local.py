@@ -0,0 +1,204 @@
+"""
+MediAgent - Parser local de respuestas en español (sin LLM)
+
+Reconoce las formas más comunes de elegir una opción o confirmar:
+  - Números: "2", "la 3", "opción 4", "2do", "tres", "veintiuno"
+  - Ordinales: "la primera", "segunda opción", "el tercero"
+  - Relativos: "la última", "la penúltima", "la más temprana", "la más tarde"
+  - Sí / no con negación: "sí", "claro que sí", "no", "no quiero", "mejor no",
+    "no hay problema" (afirmativo). Si además hay palabras desconocidas
+    ("sí, pero a otra hora") la confianza queda bajo el umbral.
+
+Cada función retorna (valor, confianza). Los nodos solo llaman a llm_parse
+cuando la confianza es menor que UMBRAL_CONFIANZA.
+"""
+import re
+
+from agent.cache_parse import normalizar
+
+UMBRAL_CONFIANZA = 0.8
+
+# ══════════════════════════════════════════════
+# Vocabulario (compilado una vez al importar)
+# ══════════════════════════════════════════════
+
+# "un" / "una" se excluyen a propósito: "una cita", "a la una"
+_UNIDADES = {
+    "uno": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5,
+    "seis": 6, "siete": 7, "ocho": 8, "nueve": 9,
+}
+_NUMEROS = {
+    **_UNIDADES,
+    "diez": 10, "once": 11, "doce": 12, "trece": 13, "catorce": 14, "quince": 15,
+    "dieciseis": 16, "diecisiete": 17, "dieciocho": 18, "diecinueve": 19, "veinte": 20,
+    **{f"veinti{k}": 20 + v for k, v in _UNIDADES.items()},
+    "veintiun": 21, "treinta": 30,
+}
+
+_ORDINALES = {
+    "primero": 1, "primera": 1, "primer": 1,
+    "segundo": 2, "segunda": 2,
+    "tercero": 3, "tercera": 3, "tercer": 3,
+    "cuarto": 4, "cuarta": 4,
+    "quinto": 5, "quinta": 5,
+    "sexto": 6, "sexta": 6,
+    "septimo": 7, "septima": 7, "setimo": 7, "setima": 7,
+    "octavo": 8, "octava": 8,
+    "noveno": 9, "novena": 9,
+    "decimo": 10, "decima": 10,
+}
+
+# Palabras que anteceden a un número de opción: "la 3", "opción 3", "número 3"
+_PREVIAS_OPCION = {"la", "el", "opcion", "numero", "nro", "num", "n", "con"}
+
+_RE_DIGITO_ORDINAL = re.compile(r"^(\d{1,2})(?:ro|ra|do|da|er|to|ta|vo|va|no|na|mo|ma|o|a)?$")
+_RE_TREINTA_Y = re.compile(r"\btreinta y (" + "|".join(_UNIDADES) + r")\b")
+
+_RE_ULTIMA = re.compile(r"\b(?:la|el|lo)?\s*ultim[oa]s?\b")
+_RE_PENULTIMA = re.compile(r"\bpenultim[oa]\b")
+_RE_TEMPRANO = re.compile(r"\bmas (?:temprano|temprana|pronto|cerca|cercana|antes)\b|\blo antes posible\b")
+_RE_TARDE = re.compile(r"\bmas (?:tarde|tardio|tardia|lejos|lejana)\b")
+_RE_CUALQUIERA = re.compile(r"\bcualquier[a]?\b|\bla que sea\b|\bme da igual\b|\bda lo mismo\b")
+
+_AFIRMATIVAS = {
+    "si", "sip", "yes", "ok", "okay", "okey", "dale", "claro", "confirmo", "confirmar",
+    "confirmado", "correcto", "perfecto", "listo", "exacto",
+    "acepto", "adelante", "afirmativo", "obvio", "genial",
+}
+# Relleno que acompaña a un sí o a un no pero no decide por sí solo:
+# "quiero otro doctor", "bueno pero a otra hora", "va a ser difícil"
+_NEUTRAS = {
+    "quiero", "va", "bueno", "bien", "vale", "porfa", "por", "favor", "gracias",
+    "muchas", "pues", "entonces", "y", "mi", "la", "el", "lo", "esa", "ese", "eso",
+    "esta", "cita", "todo", "asi", "me", "de", "doctor", "doctora", "dr", "dra",
+}
+_NEGATIVAS = {
+    "no", "nop", "nope", "nel", "nunca", "jamas", "cancela", "cancelar", "cancelo",
+    "cancelado", "negativo", "tampoco", "ninguna", "ninguno",
+}
+# Frases que contienen "no" pero son afirmativas, y al revés
+_RE_FRASE_AFIRMATIVA = re.compile(
+    r"\b(?:no hay problema|no hay drama|por que no|porque no|como no|de acuerdo|"
+    r"esta bien|por supuesto|claro que si|si por favor|me parece bien)\b"
+)
+_RE_FRASE_NEGATIVA = re.compile(
+    r"\b(?:mejor no|ya no|claro que no|por ahora no|todavia no|aun no|no gracias|"
+    r"no me (?:sirve|conviene|interesa|cuadra|queda)|dejalo|otro dia)\b"
+)
+
+
+# ══════════════════════════════════════════════
+# Elección de opción
+# ══════════════════════════════════════════════
+
+def parsear_opcion(texto: str, max_opcion: int, claves_orden: list = None) -> tuple:
+    """
+    Interpreta la opción elegida entre 1..max_opcion.
+
+    claves_orden (opcional): una clave comparable por opción (p. ej. "fecha hora")
+    para resolver "la más temprana" / "la más tarde".
+
+    Retorna (numero | None, confianza). Si hay señales contradictorias
+    ("la primera o la tercera") la confianza es baja y decide el LLM.
+    """
+    norm = normalizar(texto)
+    if not norm or max_opcion < 1:
+        return None, 0.0
+    norm = _RE_TREINTA_Y.sub(lambda m: str(30 + _UNIDADES[m.group(1)]), norm)
+    tokens = norm.split()
+
+    # Respuesta que es solo un número: "3", "3ro", "tres"
+    if len(tokens) == 1:
+        m = _RE_DIGITO_ORDINAL.match(tokens[0])
+        num = int(m.group(1)) if m else _NUMEROS.get(tokens[0]) or _ORDINALES.get(tokens[0])
+        if num is not None:
+            return (num, 1.0) if 1 <= num <= max_opcion else (None, 0.0)
+
+    candidatos = {}  # numero -> confianza
+
+    def _agregar(num, confianza):
+        if num is not None and 1 <= num <= max_opcion:
+            candidatos[num] = max(candidatos.get(num, 0.0), confianza)
+
+    for i, tok in enumerate(tokens):
+        previa = tokens[i - 1] if i else ""
+        if ":" in tok:
+            continue  # una hora ("10:00"), no una opción
+        m = _RE_DIGITO_ORDINAL.match(tok)
+        if m:
+            # "la 3" / "opción 3" es claro; un número suelto en una frase puede ser la hora
+            _agregar(int(m.group(1)), 0.9 if previa in _PREVIAS_OPCION or m.group(0) != m.group(1) else 0.6)
+            continue
+        if tok in _ORDINALES:
+            _agregar(_ORDINALES[tok], 0.9)
+        elif tok in _NUMEROS:
+            _agregar(_NUMEROS[tok], 0.9 if previa in _PREVIAS_OPCION else 0.7)
+
+    if _RE_PENULTIMA.search(norm):
+        _agregar(max_opcion - 1, 0.9)
+    elif _RE_ULTIMA.search(norm):
+        _agregar(max_opcion, 0.9)
+
+    if claves_orden and len(claves_orden) == max_opcion:
+        if _RE_TEMPRANO.search(norm):
+            _agregar(min(range(max_opcion), key=lambda j: claves_orden[j]) + 1, 0.85)
+        if _RE_TARDE.search(norm):
+            _agregar(max(range(max_opcion), key=lambda j: claves_orden[j]) + 1, 0.85)
+
+    if not candidatos and _RE_CUALQUIERA.search(norm):
+        return 1, 0.85
+
+    if len(candidatos) != 1:
+        return None, 0.3 if candidatos else 0.0
+    num, confianza = next(iter(candidatos.items()))
+    return num, confianza
+
+
+# ══════════════════════════════════════════════
+# Sí / No
+# ══════════════════════════════════════════════
+
+def parsear_si_no(texto: str) -> tuple:
+    """
+    Interpreta una confirmación. Retorna (True | False | None, confianza).
+
+    La negación se aplica a la palabra siguiente: "no quiero", "no confirmo"
+    cuentan como negativas; "sí, no hay problema" como afirmativa.
+    """
+    norm = normalizar(texto)
+    if not norm:
+        return None, 0.0
+    if norm in ("s", "n"):
+        return norm == "s", 0.9
+
+    afirmativas = len(_RE_FRASE_AFIRMATIVA.findall(norm))
+    negativas = len(_RE_FRASE_NEGATIVA.findall(norm))
+    resto = _RE_FRASE_NEGATIVA.sub(" ", _RE_FRASE_AFIRMATIVA.sub(" ", norm))
+
+    tokens = resto.split()
+    desconocidas = 0
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i]
+        if tok in _NEGATIVAS:
+            negativas += 1
+            # "no quiero" / "no confirmo": la negación consume la afirmativa siguiente
+            if tok == "no" and i + 1 < len(tokens) and tokens[i + 1] in _AFIRMATIVAS and tokens[i + 1] != "si":
+                i += 1
+        elif tok in _AFIRMATIVAS:
+            afirmativas += 1
+        elif tok not in _NEUTRAS:
+            desconocidas += 1
+        i += 1
+
+    # Con palabras que el parser no conoce ("sí, pero a otra hora") decide el LLM
+    confianza = 1.0 if len(tokens) <= 3 else 0.9
+    if desconocidas:
+        confianza = min(confianza, UMBRAL_CONFIANZA - 0.2)
+    if afirmativas and not negativas:
+        return True, confianza
+    if negativas and not afirmativas:
+        return False, confianza
+    if afirmativas and negativas:
+        return None, 0.3
+    return None, 0.0
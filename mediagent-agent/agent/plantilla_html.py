@@ -0,0 +1,61 @@
+"""
+MediAgent - Plantillas HTML precompiladas
+
+Una plantilla se parsea una sola vez (al importar el módulo que la define) en
+una lista de partes: los tramos estáticos quedan como strings ya armados y los
+huecos {nombre} como posiciones a rellenar. Renderizar es copiar la lista,
+poner los valores en los huecos y un "".join: sin re-parsear ni re-formatear
+el HTML estático en cada correo.
+
+    p = Plantilla("<p>Hola {nombre}</p>")
+    p.render({"nombre": "Ana"})                     # '<p>Hola Ana</p>'
+    list(p.render_lote([{"nombre": "A"}, {"nombre": "B"}]))
+
+Las llaves literales se escriben dobles ({{ y }}), como en str.format.
+"""
+import re
+
+_TOKEN = re.compile(r"\{\{|\}\}|\{(\w+)\}")
+
+
+class Plantilla:
+    """Plantilla compilada: partes estáticas + índices de los huecos."""
+
+    __slots__ = ("partes", "huecos", "nombres")
+
+    def __init__(self, texto: str):
+        partes, huecos = [], []
+        literal = []
+        pos = 0
+        for m in _TOKEN.finditer(texto):
+            literal.append(texto[pos:m.start()])
+            pos = m.end()
+            if m.group(1) is None:
+                literal.append(m.group(0)[0])  # {{ → {, }} → }
+                continue
+            partes.append("".join(literal))
+            literal = []
+            huecos.append((len(partes), m.group(1)))
+            partes.append("")
+        literal.append(texto[pos:])
+        partes.append("".join(literal))
+
+        self.partes = partes
+        self.huecos = tuple(huecos)
+        self.nombres = frozenset(n for _, n in huecos)
+
+    def render(self, valores: dict) -> str:
+        partes = self.partes.copy()
+        for i, nombre in self.huecos:
+            partes[i] = valores[nombre]
+        return "".join(partes)
+
+    def render_lote(self, filas):
+        """Renderiza un iterable de dicts de valores; generador (memoria acotada)."""
+        partes_base = self.partes
+        huecos = self.huecos
+        for valores in filas:
+            partes = partes_base.copy()
+            for i, nombre in huecos:
+                partes[i] = valores[nombre]
+            yield "".join(partes)
@@ -0,0 +1,67 @@
+"""
+MediAgent - Plantillas locales para el modo rápido
+
+Con MEDIAGENT_MODO_RAPIDO=1 los listados de sedes y de doctores/horarios se
+arman con estas plantillas en vez de pedirle a llm_chat que envuelva una
+lista ya determinada en un saludo: el turno pasa de segundos a milisegundos.
+Los textos siguen el mismo formato que se le pide al LLM en nodes.py.
+El listado ampliado por "ver más" (MEDIAGENT_HORARIOS_POR_DOCTOR) usa
+siempre su plantilla: es solo la misma lista con más horarios.
+"""
+
+
+def mensaje_sedes(
+    nombre: str,
+    especialidad: str,
+    distrito: str,
+    opciones_texto: str,
+    sede_recomendada: dict,
+) -> str:
+    """Saludo + sedes numeradas con la recomendada marcada (⭐)."""
+    if sede_recomendada["distrito"] == distrito:
+        motivo = f"está en tu mismo distrito, {distrito}"
+    else:
+        motivo = f"es la más cercana a {distrito}"
+    return (
+        f"¡Hola {nombre}! 👋 Con gusto te ayudo a agendar tu consulta de **{especialidad}**.\n\n"
+        f"Estas son las sedes cercanas con doctores y horarios disponibles:\n\n"
+        f"{opciones_texto}\n\n"
+        f"Te recomiendo **{sede_recomendada['nombre']}** porque {motivo}. 🏥\n\n"
+        f"¿Cuál sede prefieres? Puedes responder con el número o el nombre."
+    )
+
+
+NOTA_VER_MAS = "Para ver más horarios escribe **ver más** (y el apellido del doctor si es uno en particular). ➕\n\n"
+
+
+def mensaje_doctores(
+    sede: dict,
+    especialidad: str,
+    texto_doctores: str,
+    label_semana: str,
+    hay_mas: bool = False,
+) -> str:
+    """Listado de doctores y horarios de la semana mostrada."""
+    cierre = (
+        "Si ningún horario de esta semana te viene bien, dime y te muestro los de la **próxima semana**. 📅\n\n"
+        if label_semana == "esta semana" else ""
+    )
+    if hay_mas:
+        cierre = NOTA_VER_MAS + cierre
+    return (
+        f"Estos son los horarios disponibles **{label_semana}** para {especialidad} "
+        f"en {sede['nombre']}:\n"
+        f"{texto_doctores}\n"
+        f"{cierre}"
+        f"¿Con qué doctor, qué día y a qué hora prefieres tu cita? 👨‍⚕️📅🕐"
+    )
+
+
+def mensaje_mas_horarios(texto_doctores: str, hay_mas: bool) -> str:
+    """Listado paginado ampliado tras un "ver más" (sin LLM en ningún modo)."""
+    return (
+        f"Aquí tienes más horarios disponibles:\n"
+        f"{texto_doctores}\n"
+        f"{NOTA_VER_MAS if hay_mas else ''}"
+        f"¿Con qué doctor, qué día y a qué hora prefieres tu cita? 👨‍⚕️📅🕐"
+    )
@@ -0,0 +1,71 @@
+"""
+MediAgent - Recordatorios del día anterior (trabajo por lotes)
+
+Para una fecha, encola en la bandeja de salida (correo_outbox) un
+recordatorio por cada cita confirmada de ese día y luego la vacía con
+varios lotes de Resend en vuelo a la vez.
+
+Todo el recorrido es en streaming, para que la memoria no crezca con la agenda:
+  1. tools.iterar_citas_del_dia une citas, horarios y entidades del backend
+     activo: con JSON lee horarios.json y citas.json en streaming (solo guarda
+     los horarios de la fecha); con MEDIAGENT_BACKEND=sqlite es un JOIN
+  2. el HTML se renderiza con las plantillas precompiladas de email_service
+     y se encola en transacciones de a 500 correos
+
+Re-ejecutarlo es seguro: la bandeja no duplica (cita_id, "recordatorio").
+"""
+import logging
+import os
+from datetime import date, timedelta
+
+from agent import correo_outbox
+from agent.email_service import armar_correo_recordatorio
+from agent.fechas import formatear_fecha
+from agent.tools import iterar_citas_del_dia
+
+TIPO = "recordatorio"
+# Lotes de Resend enviándose a la vez al vaciar la bandeja
+CONCURRENCIA = int(os.getenv("MEDIAGENT_RECORDATORIOS_CONCURRENCIA", "4"))
+
+logger = logging.getLogger(__name__)
+
+
+def citas_del_dia(fecha: str):
+    """
+    Filas (paciente, doctor, sede, horario, especialidad, fecha_fmt, cita_id)
+    de las citas confirmadas en `fecha` ('YYYY-MM-DD'), en streaming.
+    """
+    fecha_fmt = formatear_fecha(fecha)
+    for fila in iterar_citas_del_dia(fecha):
+        paciente, doctor, sede = fila["paciente"], fila["doctor"], fila["sede"]
+        if not (paciente and paciente.get("correo") and doctor and sede):
+            logger.warning("Cita %s con datos incompletos: no se envía recordatorio", fila["cita_id"])
+            continue
+        yield {
+            "paciente": paciente,
+            "doctor": doctor,
+            "sede": sede,
+            "horario": fila["horario"],
+            "especialidad": fila["especialidad"] or "Desconocida",
+            "fecha_fmt": fecha_fmt,
+            "cita_id": fila["cita_id"],
+        }
+
+
+def encolar_recordatorios(fecha: str = None) -> tuple:
+    """
+    Encola los recordatorios de `fecha` (default: mañana).
+    Retorna (citas encontradas, correos encolados ahora).
+    """
+    fecha = fecha or (date.today() + timedelta(days=1)).isoformat()
+    encontradas = 0
+
+    def _correos():
+        nonlocal encontradas
+        for fila in citas_del_dia(fecha):
+            encontradas += 1
+            yield fila["cita_id"], TIPO, armar_correo_recordatorio(**fila)
+
+    encolados = correo_outbox.encolar_lote(_correos())
+    return encontradas, encolados
+
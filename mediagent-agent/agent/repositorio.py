@@ -0,0 +1,539 @@
+"""
+MediAgent - Repositorio en memoria sobre los archivos JSON de data/
+
+Cada archivo se parsea UNA sola vez por proceso y se guarda junto con sus
+índices (dicts) para que las consultas de tools.py sean búsquedas directas
+en lugar de recorridos completos. Antes de usar un archivo se compara su
+mtime/tamaño en disco: si cambió (otro proceso, un script de regeneración),
+se vuelve a cargar e indexar.
+
+Las escrituras se hacen bajo bloqueo_escritura(): un lock de hilo más un
+flock sobre data/.escritura.lock, para que varios procesos no se pisen al
+reservar el mismo horario. Los archivos se reemplazan de forma atómica
+(tmp + os.replace), así un lector nunca ve un JSON a medio escribir.
+
+citas.json y horarios.json NO se reescriben en cada reserva: los cambios se
+agregan como eventos JSON-lines a data/journal.jsonl (costo constante) y al
+leer se reaplican sobre el snapshot. Un hilo en segundo plano compacta el
+journal dentro del snapshot cuando crece más de MEDIAGENT_JOURNAL_COMPACTAR_BYTES.
+Los eventos son idempotentes, así que reaplicarlos nunca duplica datos.
+
+Eventos: reserva (cita + horario ocupado), horario_estado, y horarios_alta /
+horarios_baja con los que scripts/mantener_horarios.py mueve la ventana de
+horarios día a día sin reescribir el snapshot.
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+from agent.disponibilidad import MapaDisponibilidad
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo queda el lock entre hilos
+    fcntl = None
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+
+JOURNAL = "journal.jsonl"
+# Próximo hor-N de ventana_horarios (los ids no se reutilizan)
+SECUENCIA_HORARIOS = "horarios_secuencia.json"
+# Snapshots cuyo estado final = archivo + eventos del journal
+_TABLAS_JOURNAL = ("citas.json", "horarios.json")
+# "bin": horarios se leen de data/horarios.bin (columnar + mmap, ver agent/horarios_columnar.py)
+FORMATO_HORARIOS = os.getenv("MEDIAGENT_HORARIOS_FORMATO", "json").lower()
+COMPACTAR_BYTES = int(os.getenv("MEDIAGENT_JOURNAL_COMPACTAR_BYTES", str(512 * 1024)))
+JOURNAL_FSYNC = os.getenv("MEDIAGENT_JOURNAL_FSYNC", "1") == "1"
+
+logger = logging.getLogger(__name__)
+
+_SEPARADOR = re.compile(r"[\s,]*")
+
+
+def iterar_arreglo_json(ruta: str, bloque: int = 1 << 20):
+    """
+    Recorre un archivo con un arreglo JSON de objetos leyéndolo de a `bloque`
+    caracteres: la memoria usada es la de un bloque, no la del archivo.
+    """
+    decoder = json.JSONDecoder()
+    with open(ruta, "r", encoding="utf-8") as f:
+        buf = f.read(bloque).lstrip()
+        if not buf.startswith("["):
+            raise ValueError(f"{ruta} no contiene un arreglo JSON")
+        pos = 1
+        fin_archivo = False
+        while True:
+            pos = _SEPARADOR.match(buf, pos).end()
+            if buf.startswith("]", pos):
+                return
+            try:
+                fila, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Objeto cortado por el borde del bloque: leer más y reintentar
+                if fin_archivo:
+                    raise
+                mas = f.read(bloque)
+                fin_archivo = not mas
+                buf, pos = buf[pos:] + mas, 0
+                continue
+            yield fila
+
+
+# ══════════════════════════════════════════════
+# Índices por archivo
+# ══════════════════════════════════════════════
+
+
+def _indexar_por_id(filas: list) -> dict:
+    return {"filas": filas, "por_id": {f["id"]: f for f in filas}}
+
+
+def _indexar_pacientes(filas: list) -> dict:
+    indices = _indexar_por_id(filas)
+    indices["por_correo"] = {p["correo"]: p for p in filas}
+    return indices
+
+
+def _indexar_sede_especialidades(filas: list) -> dict:
+    sedes_por_esp = {}
+    for se in filas:
+        sedes_por_esp.setdefault(se["especialidad_id"], set()).add(se["sede_id"])
+    return {"filas": filas, "sedes_por_especialidad": sedes_por_esp}
+
+
+def _indexar_doctores(filas: list) -> dict:
+    indices = _indexar_por_id(filas)
+    por_sede_esp = {}
+    for d in filas:
+        por_sede_esp.setdefault((d["sede_id"], d["especialidad_id"]), []).append(d)
+    indices["por_sede_especialidad"] = por_sede_esp
+    return indices
+
+
+def _indexar_horarios(filas: list) -> dict:
+    indices = _indexar_por_id(filas)
+    por_doctor = {}
+    por_doctor_fecha = {}
+    for h in filas:
+        por_doctor.setdefault(h["doctor_id"], []).append(h)
+        por_doctor_fecha.setdefault((h["doctor_id"], h["fecha"]), []).append(h)
+    # Ordenados una sola vez: las consultas ya no necesitan sort()
+    for hors in por_doctor.values():
+        hors.sort(key=lambda x: (x["fecha"], x["hora_inicio"]))
+    for hors in por_doctor_fecha.values():
+        hors.sort(key=lambda x: x["hora_inicio"])
+    indices["por_doctor"] = por_doctor
+    indices["por_doctor_fecha"] = por_doctor_fecha
+    return indices
+
+
+_INDEXADORES = {
+    "pacientes.json": _indexar_pacientes,
+    "especialidades.json": _indexar_por_id,
+    "sedes.json": _indexar_por_id,
+    "sede_especialidades.json": _indexar_sede_especialidades,
+    "doctores.json": _indexar_doctores,
+    "horarios.json": _indexar_horarios,
+    "citas.json": _indexar_por_id,
+}
+
+
+# ══════════════════════════════════════════════
+# Repositorio
+# ══════════════════════════════════════════════
+
+
+class RepositorioJSON:
+    """
+    Caché de proceso de los archivos JSON con invalidación por mtime.
+
+    tabla("horarios.json") retorna un dict con "filas" (la lista original) y
+    los índices definidos en _INDEXADORES. Los índices comparten los mismos
+    dicts que "filas", así que modificar una fila la actualiza en todos.
+    Para citas.json y horarios.json el resultado ya incluye el journal.
+    """
+
+    def __init__(self, data_dir: str = DATA_DIR):
+        self.data_dir = data_dir
+        self._tablas = {}  # filename -> (firma, indices)
+        self._journal_ino = None
+        self._journal_offset = 0  # bytes del journal ya aplicados en memoria
+        self._compactador = None
+        self._mapa = None
+        self._hay_compactacion = threading.Event()
+        self.lock = threading.RLock()
+
+    def _ruta(self, filename: str) -> str:
+        if filename == "horarios.json" and FORMATO_HORARIOS == "bin":
+            filename = "horarios.bin"
+        return os.path.join(self.data_dir, filename)
+
+    def _firma(self, filename: str) -> tuple:
+        st = os.stat(self._ruta(filename))
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _firma_journal(self) -> tuple:
+        try:
+            st = os.stat(self._ruta(JOURNAL))
+        except FileNotFoundError:
+            return (None, 0)
+        return (st.st_ino, st.st_size)
+
+    def _cargar(self, filename: str, firma: tuple) -> dict:
+        if filename == "horarios.json" and FORMATO_HORARIOS == "bin":
+            from agent import horarios_columnar
+            indices = horarios_columnar.abrir(self._ruta(filename))
+            self._tablas[filename] = (firma, indices)
+            return indices
+        with open(self._ruta(filename), "r", encoding="utf-8") as f:
+            filas = json.load(f)
+        indices = _INDEXADORES.get(filename, _indexar_por_id)(filas)
+        self._tablas[filename] = (firma, indices)
+        return indices
+
+    def tabla(self, filename: str) -> dict:
+        """Retorna los índices del archivo, recargándolo solo si cambió en disco."""
+        if filename in _TABLAS_JOURNAL:
+            self._sincronizar_journal()
+            return self._tablas[filename][1]
+
+        firma = self._firma(filename)
+        actual = self._tablas.get(filename)
+        if actual and actual[0] == firma:
+            return actual[1]
+
+        with self.lock:
+            firma = self._firma(filename)
+            actual = self._tablas.get(filename)
+            if actual and actual[0] == firma:
+                return actual[1]
+            return self._cargar(filename, firma)
+
+    def iterar(self, filename: str, bloque: int = 1 << 20):
+        """
+        Recorre las filas del archivo en streaming, sin cargarlo ni indexarlo
+        (trabajos por lotes sobre agendas grandes; no usa ni llena la caché).
+        Para citas.json y horarios.json aplica también el journal.
+        """
+        if filename not in _TABLAS_JOURNAL:
+            yield from iterar_arreglo_json(self._ruta(filename), bloque)
+            return
+
+        # El journal se lee primero: está acotado por la compactación
+        citas_nuevas, estados, horarios_nuevos, bajas = {}, {}, {}, set()
+        try:
+            with open(self._ruta(JOURNAL), "rb") as f:
+                datos = f.read()
+        except FileNotFoundError:
+            datos = b""
+        for linea in datos[:datos.rfind(b"\n") + 1].splitlines():
+            if not linea.strip():
+                continue
+            evento = json.loads(linea)
+            if evento["op"] == "reserva":
+                citas_nuevas[evento["cita"]["id"]] = evento["cita"]
+                estados[evento["cita"]["horario_id"]] = "ocupado"
+            elif evento["op"] == "horario_estado":
+                estados[evento["id"]] = evento["estado"]
+            elif evento["op"] == "horarios_alta":
+                horarios_nuevos.update((h["id"], dict(h)) for h in evento["horarios"])
+            elif evento["op"] == "horarios_baja":
+                bajas.update(evento["ids"])
+
+        es_citas = filename == "citas.json"
+        if not es_citas and FORMATO_HORARIOS == "bin":
+            from agent import horarios_columnar
+            filas = (dict(h) for h in horarios_columnar.abrir(self._ruta(filename))["filas"])
+        else:
+            filas = iterar_arreglo_json(self._ruta(filename), bloque)
+        for fila in filas:
+            # pop: si se compactó entre la lectura del journal y la del snapshot
+            if es_citas:
+                citas_nuevas.pop(fila["id"], None)
+            else:
+                horarios_nuevos.pop(fila["id"], None)
+                if fila["id"] in bajas:
+                    continue
+                if fila["id"] in estados:
+                    fila["estado"] = estados[fila["id"]]
+            yield fila
+        if es_citas:
+            yield from citas_nuevas.values()
+            return
+        for fila in horarios_nuevos.values():
+            if fila["id"] not in bajas:
+                fila["estado"] = estados.get(fila["id"], fila["estado"])
+                yield fila
+
+    def guardar(self, filename: str):
+        """
+        Escribe las filas en memoria del archivo y registra la nueva firma,
+        de modo que la escritura propia no provoque un re-parseo.
+        """
+        with self.lock:
+            indices = self._tablas[filename][1] if filename in self._tablas else self.tabla(filename)
+            ruta = self._ruta(filename)
+            if "columnar" in indices:
+                indices["columnar"].guardar(ruta)
+            else:
+                tmp = f"{ruta}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(indices["filas"], f, ensure_ascii=False, indent=2)
+                os.replace(tmp, ruta)
+            self._tablas[filename] = (self._firma(filename), indices)
+
+    @contextmanager
+    def bloqueo_escritura(self):
+        """
+        Sección crítica de escritura entre hilos y procesos. Dentro del
+        bloque, tabla() ve siempre la última versión escrita por cualquiera.
+        """
+        with self.lock:
+            with open(self._ruta(".escritura.lock"), "a") as f:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+
+    def invalidar(self, filename: str = None):
+        """Descarta la caché de un archivo (o de todos)."""
+        with self.lock:
+            if filename is None or filename in _TABLAS_JOURNAL:
+                self._journal_ino, self._journal_offset = None, 0
+            if filename is None:
+                self._tablas.clear()
+            else:
+                self._tablas.pop(filename, None)
+
+    # ── Journal de eventos ──────────────────────────────────────────────────
+
+    def _sincronizar_journal(self):
+        """
+        Deja citas/horarios en memoria = snapshot + journal. Si un snapshot
+        cambió o el journal fue compactado (otro inodo / más corto), recarga
+        todo y reaplica desde cero; si solo creció, aplica los bytes nuevos.
+        """
+        firmas = [self._firma(f) for f in _TABLAS_JOURNAL]
+        ino, tamano = self._firma_journal()
+        if (
+            all(self._tablas.get(f, (None,))[0] == fi for f, fi in zip(_TABLAS_JOURNAL, firmas))
+            and ino == self._journal_ino
+            and tamano == self._journal_offset
+        ):
+            return
+
+        with self.lock:
+            firmas = [self._firma(f) for f in _TABLAS_JOURNAL]
+            ino, tamano = self._firma_journal()
+            snapshot_cambio = any(
+                self._tablas.get(f, (None,))[0] != fi for f, fi in zip(_TABLAS_JOURNAL, firmas)
+            )
+            if snapshot_cambio or ino != self._journal_ino or tamano < self._journal_offset:
+                for f, fi in zip(_TABLAS_JOURNAL, firmas):
+                    self._cargar(f, fi)
+                self._journal_ino, self._journal_offset = ino, 0
+            if tamano > self._journal_offset:
+                self._reaplicar_journal()
+
+    def _reaplicar_journal(self):
+        with open(self._ruta(JOURNAL), "rb") as f:
+            f.seek(self._journal_offset)
+            datos = f.read()
+        # Solo líneas completas: una escritura a medias se aplicará después
+        fin = datos.rfind(b"\n") + 1
+        for linea in datos[:fin].splitlines():
+            if linea.strip():
+                self._aplicar(json.loads(linea))
+        self._journal_offset += fin
+
+    def _aplicar(self, evento: dict):
+        """Aplica un evento en memoria. Idempotente."""
+        horarios = self._tablas["horarios.json"][1]["por_id"]
+        if evento["op"] == "reserva":
+            cita = evento["cita"]
+            citas = self._tablas["citas.json"][1]
+            if cita["id"] not in citas["por_id"]:
+                cita = dict(cita)
+                citas["filas"].append(cita)
+                citas["por_id"][cita["id"]] = cita
+            h = horarios.get(cita["horario_id"])
+            if h:
+                self._cambiar_estado(h, "ocupado")
+        elif evento["op"] == "horario_estado":
+            h = horarios.get(evento["id"])
+            if h:
+                self._cambiar_estado(h, evento["estado"])
+        elif evento["op"] in ("horarios_alta", "horarios_baja"):
+            altas = evento.get("horarios", [])
+            bajas = evento.get("ids", [])
+            tabla = self._tablas["horarios.json"]
+            if "columnar" in tabla[1]:
+                # Las columnas no crecen en su lugar: se arma la tabla nueva
+                # (vectorizado) y el mapa de disponibilidad se recalcula
+                from agent import horarios_columnar
+                self._tablas["horarios.json"] = (
+                    tabla[0], horarios_columnar.con_cambios(tabla[1]["columnar"], altas, bajas)
+                )
+            else:
+                self._alta_baja_horarios(tabla[1], altas, bajas)
+
+    def _alta_baja_horarios(self, indices: dict, altas: list, bajas: list):
+        """horarios_alta / horarios_baja sobre los índices en memoria (dicts)."""
+        mapa = self._mapa if self._mapa is not None and self._mapa.horarios is indices else None
+        por_id = indices["por_id"]
+
+        quitados = [por_id.pop(i) for i in bajas if i in por_id]
+        if quitados:
+            ids = {id(h) for h in quitados}
+            indices["filas"][:] = [h for h in indices["filas"] if id(h) not in ids]
+            for doctor_id in {h["doctor_id"] for h in quitados}:
+                lista = indices["por_doctor"].get(doctor_id, [])
+                lista[:] = [x for x in lista if id(x) not in ids]
+            for clave in {(h["doctor_id"], h["fecha"]) for h in quitados}:
+                del_dia = [x for x in indices["por_doctor_fecha"].get(clave, []) if id(x) not in ids]
+                if del_dia:
+                    indices["por_doctor_fecha"][clave] = del_dia
+                else:
+                    indices["por_doctor_fecha"].pop(clave, None)
+            if mapa:
+                for h in quitados:
+                    if h["estado"] == "disponible":
+                        mapa.actualizar(h, False)
+
+        for h in altas:
+            if h["id"] in por_id:
+                continue
+            h = dict(h)
+            indices["filas"].append(h)
+            por_id[h["id"]] = h
+            lista = indices["por_doctor"].setdefault(h["doctor_id"], [])
+            lista.append(h)
+            if len(lista) > 1 and (lista[-2]["fecha"], lista[-2]["hora_inicio"]) > (h["fecha"], h["hora_inicio"]):
+                lista.sort(key=lambda x: (x["fecha"], x["hora_inicio"]))
+            del_dia = indices["por_doctor_fecha"].setdefault((h["doctor_id"], h["fecha"]), [])
+            del_dia.append(h)
+            del_dia.sort(key=lambda x: x["hora_inicio"])
+            if mapa and h["estado"] == "disponible":
+                mapa.actualizar(h, True)
+
+    def _cambiar_estado(self, h: dict, estado: str):
+        if h["estado"] == estado:
+            return
+        h["estado"] = estado
+        # Actualización incremental del mapa si se construyó sobre esta tabla
+        if self._mapa is not None and self._mapa.horarios is self._tablas["horarios.json"][1]:
+            self._mapa.actualizar(h, estado == "disponible")
+
+    # ── Disponibilidad precalculada ─────────────────────────────────────────
+
+    def disponibilidad(self) -> MapaDisponibilidad:
+        """
+        Mapa de disponibilidad de los horarios actuales. Se construye una vez
+        por versión de horarios/doctores y luego se actualiza en cada evento.
+        """
+        horarios = self.tabla("horarios.json")
+        doctores = self.tabla("doctores.json")
+        mapa = self._mapa
+        if mapa is None or mapa.horarios is not horarios or mapa.doctores is not doctores:
+            with self.lock:
+                mapa = self._mapa
+                if mapa is None or mapa.horarios is not horarios or mapa.doctores is not doctores:
+                    mapa = self._mapa = MapaDisponibilidad(horarios, doctores)
+        return mapa
+
+    def registrar(self, eventos: list):
+        """
+        Agrega eventos al journal (un solo write, costo independiente del
+        tamaño de la agenda) y los aplica en memoria. Debe llamarse dentro
+        de bloqueo_escritura().
+        """
+        self._sincronizar_journal()
+        datos = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in eventos).encode("utf-8")
+        with open(self._ruta(JOURNAL), "ab") as f:
+            f.write(datos)
+            f.flush()
+            if JOURNAL_FSYNC:
+                os.fsync(f.fileno())
+        for e in eventos:
+            self._aplicar(e)
+        self._journal_ino, self._journal_offset = self._firma_journal()[0], self._journal_offset + len(datos)
+
+        if self._journal_offset > COMPACTAR_BYTES:
+            self._solicitar_compactacion()
+
+    def compactar(self) -> bool:
+        """
+        Vuelca el estado en memoria a los snapshots y vacía el journal.
+        Retorna False si no había nada que compactar.
+        """
+        with self.bloqueo_escritura():
+            self._sincronizar_journal()
+            if self._journal_offset == 0:
+                return False
+            for f in _TABLAS_JOURNAL:
+                self.guardar(f)
+            self._vaciar_journal()
+            return True
+
+    def _vaciar_journal(self):
+        # Journal vacío con inodo nuevo: los demás procesos detectan la
+        # compactación y recargan los snapshots
+        ruta = self._ruta(JOURNAL)
+        tmp = f"{ruta}.{os.getpid()}.tmp"
+        open(tmp, "wb").close()
+        os.replace(tmp, ruta)
+        self._journal_ino, self._journal_offset = self._firma_journal()[0], 0
+
+    def reemplazar_horarios(self, escribir):
+        """
+        Reemplaza la agenda entera (regenerar_horarios.py, agregar_doctores.py):
+        `escribir()` genera el archivo nuevo con ids hor-N desde 1. Antes se
+        vuelcan las citas del journal a citas.json; después el journal queda
+        vacío y la marca de ids se borra, para que ningún evento viejo
+        (reserva, horarios_baja...) se aplique a los ids nuevos.
+        """
+        with self.bloqueo_escritura():
+            if self._firma_journal()[1]:
+                self._sincronizar_journal()
+                self.guardar("citas.json")
+            escribir()
+            self._vaciar_journal()
+            try:
+                os.remove(self._ruta(SECUENCIA_HORARIOS))
+            except FileNotFoundError:
+                pass
+            self.invalidar()
+
+    def _solicitar_compactacion(self):
+        if self._compactador is None or not self._compactador.is_alive():
+            self._compactador = threading.Thread(
+                target=self._bucle_compactacion, name="mediagent-compactador", daemon=True
+            )
+            self._compactador.start()
+            # Al salir, esperar a que termine una compactación en curso
+            atexit.register(self._esperar_compactacion)
+        self._hay_compactacion.set()
+
+    def _esperar_compactacion(self):
+        with self.lock:
+            pass
+
+    def _bucle_compactacion(self):
+        while True:
+            self._hay_compactacion.wait()
+            self._hay_compactacion.clear()
+            try:
+                self.compactar()
+            except Exception:
+                logger.exception("No se pudo compactar el journal")
+
+
+# Singleton de proceso
+repositorio = RepositorioJSON()
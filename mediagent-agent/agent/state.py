@@ -1,14 +1,24 @@
 """
 MediAgent - State definition for LangGraph
+
+Con MEDIAGENT_ESTADO_COMPACTO=1 las entidades (paciente, sedes, doctores,
+horarios) se guardan como ids; los nodos las reciben ya rehidratadas.
+Ver agent/estado_compacto.py.
 """
 from typing import TypedDict, Optional, Annotated
-from langgraph.graph.message import add_messages
+
+from agent.historial import agregar_mensajes
+
+# Etapas con las que el grafo termina (los routers de graph.py van a END);
+# agent/checkpointer.py poda por TTL las conversaciones en estas etapas.
+ETAPAS_FINALES = ("cita_agendada", "cancelado", "sin_sedes", "sin_doctores")
 
 
 class AgentState(TypedDict):
     """Estado del agente de citas médicas."""
-    # Historial de mensajes (LangChain messages)
-    messages: Annotated[list, add_messages]
+    # Historial de mensajes (LangChain messages); add_messages + ventana
+    # opcional con resumen (MEDIAGENT_HISTORIAL_VENTANA, ver agent/historial.py)
+    messages: Annotated[list, agregar_mensajes]
     
     # Datos del paciente logueado
     paciente: Optional[dict]
@@ -0,0 +1,57 @@
+"""
+MediAgent - Streaming de turnos del grafo para front ends
+
+Ejecuta un turno (primer mensaje o Command(resume=...)) con los stream modes
+de LangGraph y lo traduce a eventos simples:
+
+    ("token", texto)        fragmento de llm_chat según se genera
+    ("interrupt", payload)  el grafo se pausó esperando al paciente
+    ("fin", valores)        el grafo terminó; valores = estado final
+
+Solo se emiten tokens de llm_chat (tag TAG_RESPUESTA), no los de llm_parse.
+El texto completo se sigue guardando en `messages` como antes.
+"""
+from agent.nodes import TAG_RESPUESTA
+
+
+def texto_de(chunk) -> str:
+    """Texto de un AIMessageChunk (content puede ser str o lista de bloques)."""
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        b.get("text", "") if isinstance(b, dict) else str(b)
+        for b in content
+        if not isinstance(b, dict) or b.get("type") == "text"
+    )
+
+
+def _token_respuesta(datos) -> str:
+    chunk, metadata = datos
+    if TAG_RESPUESTA not in (metadata.get("tags") or []):
+        return ""
+    return texto_de(chunk)
+
+
+def _evento_final(state) -> tuple:
+    if state.next and state.tasks and state.tasks[0].interrupts:
+        return ("interrupt", state.tasks[0].interrupts[0].value)
+    return ("fin", state.values)
+
+
+def stream_turno(graph, entrada, config: dict):
+    """Versión síncrona (grafo de build_graph())."""
+    for datos in graph.stream(entrada, config, stream_mode="messages"):
+        texto = _token_respuesta(datos)
+        if texto:
+            yield ("token", texto)
+    yield _evento_final(graph.get_state(config))
+
+
+async def astream_turno(graph, entrada, config: dict):
+    """Versión async (grafo de build_graph(asincrono=True))."""
+    async for datos in graph.astream(entrada, config, stream_mode="messages"):
+        texto = _token_respuesta(datos)
+        if texto:
+            yield ("token", texto)
+    yield _evento_final(await graph.aget_state(config))
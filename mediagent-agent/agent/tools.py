@@ -3,26 +3,21 @@ MediAgent - Data access layer (reads from JSON files)
 
 Para migrar a Supabase, solo se reemplazan las funciones de este archivo.
 La interfaz (inputs/outputs) se mantiene igual.
+
+Los JSON se leen a través de agent.repositorio: cada archivo se parsea una
+sola vez por proceso (se recarga si cambia su mtime) y las consultas usan
+índices en memoria en vez de recorrer las listas completas. Las reservas
+se registran en un journal append-only (ver agent/repositorio.py).
+
+Con MEDIAGENT_BACKEND=sqlite las funciones se reemplazan por las de
+agent/tools_sqlite.py (misma interfaz, queries SQL con índices reales).
 """
-import json
 import os
 from typing import Optional
 from datetime import date
 
-# ── Cargar datos desde JSON ──
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
-
-
-def _load(filename: str) -> list:
-    filepath = os.path.join(DATA_DIR, filename)
-    with open(filepath, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def _save(filename: str, data: list):
-    filepath = os.path.join(DATA_DIR, filename)
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+from agent.errores import HorarioNoDisponible
+from agent.repositorio import repositorio
 
 
 # ══════════════════════════════════════════════
@@ -32,29 +27,20 @@ def _save(filename: str, data: list):
 
 def get_paciente_by_id(paciente_id: str) -> Optional[dict]:
     """Obtiene un paciente por su ID."""
-    pacientes = _load("pacientes.json")
-    for p in pacientes:
-        if p["id"] == paciente_id:
-            return p
-    return None
+    p = repositorio.tabla("pacientes.json")["por_id"].get(paciente_id)
+    return dict(p) if p else None
 
 
 def get_paciente_by_correo(correo: str) -> Optional[dict]:
     """Obtiene un paciente por su correo."""
-    pacientes = _load("pacientes.json")
-    for p in pacientes:
-        if p["correo"] == correo:
-            return p
-    return None
+    p = repositorio.tabla("pacientes.json")["por_correo"].get(correo)
+    return dict(p) if p else None
 
 
 def get_especialidad_nombre(especialidad_id: str) -> str:
     """Obtiene el nombre de una especialidad por su ID."""
-    especialidades = _load("especialidades.json")
-    for e in especialidades:
-        if e["id"] == especialidad_id:
-            return e["nombre"]
-    return "Desconocida"
+    e = repositorio.tabla("especialidades.json")["por_id"].get(especialidad_id)
+    return e["nombre"] if e else "Desconocida"
 
 
 def get_sedes_cercanas(distrito_paciente: str, especialidad_id: str) -> list:
@@ -66,33 +52,13 @@ def get_sedes_cercanas(distrito_paciente: str, especialidad_id: str) -> list:
     Solo muestra sedes con disponibilidad real para evitar mostrar opciones
     que luego terminen en 'no hay doctores disponibles'.
     """
-    sedes = _load("sedes.json")
-    sede_esp = _load("sede_especialidades.json")
-    doctores = _load("doctores.json")
-    horarios = _load("horarios.json")
+    sedes = repositorio.tabla("sedes.json")["filas"]
+    sedes_con_esp = repositorio.tabla("sede_especialidades.json")["sedes_por_especialidad"].get(especialidad_id, set())
+    # Acumulados por sede+especialidad: sin recorrer doctores ni horarios
+    mapa = repositorio.disponibilidad()
 
     hoy = date.today().isoformat()
 
-    # IDs de sedes que tienen la especialidad
-    sedes_con_esp = {
-        se["sede_id"] for se in sede_esp
-        if se["especialidad_id"] == especialidad_id
-    }
-
-    # Doctor IDs con horarios disponibles futuros (precalcular una vez)
-    docs_con_horario_disponible = {
-        h["doctor_id"] for h in horarios
-        if h["estado"] == "disponible" and h["fecha"] >= hoy
-    }
-
-    # Doctores de cada sede+especialidad con disponibilidad real
-    def sede_tiene_disponibilidad(sede_id: str) -> bool:
-        docs_en_sede = [
-            d for d in doctores
-            if d["sede_id"] == sede_id and d["especialidad_id"] == especialidad_id
-        ]
-        return any(d["id"] in docs_con_horario_disponible for d in docs_en_sede)
-
     # Filtrar por distrito cercano Y disponibilidad real
     resultado = []
     for s in sedes:
@@ -100,21 +66,46 @@ def get_sedes_cercanas(distrito_paciente: str, especialidad_id: str) -> list:
             continue
         if s["distrito"] != distrito_paciente and distrito_paciente not in s.get("distritos_cercanos", []):
             continue
-        if sede_tiene_disponibilidad(s["id"]):
-            resultado.append(s)
+        if mapa.hay_disponibilidad(s["id"], especialidad_id, hoy):
+            resultado.append(dict(s))
 
     return resultado
 
 
+def _disponibles_doctor(horarios: dict, doctor_id: str, desde: str, hasta: str = None) -> list:
+    """Horarios disponibles de un doctor en [desde, hasta], ordenados por fecha y hora."""
+    # Formato columnar (MEDIAGENT_HORARIOS_FORMATO=bin): filtro vectorizado
+    columnar = horarios.get("columnar")
+    if columnar is not None:
+        return columnar.disponibles(doctor_id, desde, hasta)
+    # El índice ya viene ordenado por fecha y hora
+    return [
+        h for h in horarios["por_doctor"].get(doctor_id, [])
+        if h["estado"] == "disponible"
+        and h["fecha"] >= desde
+        and (hasta is None or h["fecha"] <= hasta)
+    ]
+
+
+def _horario_publico(h) -> dict:
+    return {
+        "id": h["id"],
+        "fecha": h["fecha"],
+        "hora_inicio": h["hora_inicio"],
+        "hora_fin": h["hora_fin"]
+    }
+
+
 def get_doctores_con_horarios(
     sede_id: str,
     especialidad_id: str,
     fecha_desde: str = None,
     fecha_hasta: str = None,
+    max_por_doctor: int = None,
 ) -> list:
     """
     Busca doctores de una sede+especialidad con sus horarios disponibles.
-    
+
     Retorna lista de dicts:
     [
       {
@@ -122,7 +113,11 @@ def get_doctores_con_horarios(
         "horarios": [{id, fecha, hora_inicio, hora_fin}, ...]
       }
     ]
-    
+
+    Con max_por_doctor (listado paginado) cada doctor trae solo sus N
+    horarios más próximos y además "total": cuántos tiene disponibles en el
+    rango. Los siguientes se piden con get_mas_horarios.
+
     Equivale a:
     SELECT d.*, h.* FROM doctores d
     JOIN horarios h ON d.id = h.doctor_id
@@ -130,91 +125,91 @@ def get_doctores_con_horarios(
       AND h.estado = 'disponible' AND h.fecha >= CURRENT_DATE
     ORDER BY d.apellidos, h.fecha, h.hora_inicio
     """
-    doctores = _load("doctores.json")
-    horarios = _load("horarios.json")
-    
-    # Filtrar doctores de esa sede y especialidad
-    docs_filtrados = [
-        d for d in doctores 
-        if d["sede_id"] == sede_id and d["especialidad_id"] == especialidad_id
-    ]
-    
+    docs_filtrados = repositorio.tabla("doctores.json")["por_sede_especialidad"].get((sede_id, especialidad_id), [])
+    horarios = repositorio.tabla("horarios.json")
+
     desde = fecha_desde if fecha_desde else date.today().isoformat()
 
     resultado = []
     for doc in docs_filtrados:
         # Horarios disponibles dentro del rango solicitado
-        hors = [
-            h for h in horarios
-            if h["doctor_id"] == doc["id"]
-            and h["estado"] == "disponible"
-            and h["fecha"] >= desde
-            and (fecha_hasta is None or h["fecha"] <= fecha_hasta)
-        ]
-        # Ordenar por fecha y hora
-        hors.sort(key=lambda x: (x["fecha"], x["hora_inicio"]))
-        
+        hors = _disponibles_doctor(horarios, doc["id"], desde, fecha_hasta)
+
         if hors:  # Solo incluir doctores con horarios disponibles
-            resultado.append({
+            entrada = {
                 "doctor": {
                     "id": doc["id"],
                     "nombres": doc["nombres"],
                     "apellidos": doc["apellidos"],
                     "numero_colegiatura": doc["numero_colegiatura"]
                 },
-                "horarios": [
-                    {
-                        "id": h["id"],
-                        "fecha": h["fecha"],
-                        "hora_inicio": h["hora_inicio"],
-                        "hora_fin": h["hora_fin"]
-                    }
-                    for h in hors
-                ]
-            })
-    
+                "horarios": [_horario_publico(h) for h in hors[:max_por_doctor]],
+            }
+            if max_por_doctor:
+                entrada["total"] = len(hors)
+            resultado.append(entrada)
+
     return resultado
 
 
+def get_mas_horarios(
+    doctor_id: str,
+    despues_de: tuple,
+    fecha_hasta: str = None,
+    limite: int = 10,
+) -> list:
+    """
+    Página siguiente de horarios disponibles de un doctor ("ver más").
+
+    despues_de = (fecha, hora_inicio) del último horario ya mostrado; retorna
+    hasta `limite` horarios posteriores, mismo formato que los de
+    get_doctores_con_horarios.
+
+    Equivale a:
+    SELECT * FROM horarios
+    WHERE doctor_id = :doc AND estado = 'disponible'
+      AND (fecha, hora_inicio) > (:fecha, :hora) AND fecha <= :hasta
+    ORDER BY fecha, hora_inicio LIMIT :limite
+    """
+    fecha, hora = despues_de
+    hors = _disponibles_doctor(repositorio.tabla("horarios.json"), doctor_id, fecha, fecha_hasta)
+    siguientes = (h for h in hors if (h["fecha"], h["hora_inicio"]) > (fecha, hora))
+    return [_horario_publico(h) for h, _ in zip(siguientes, range(limite))]
+
+
 def get_horario_by_id(horario_id: str) -> Optional[dict]:
     """Obtiene un horario por su ID."""
-    horarios = _load("horarios.json")
-    for h in horarios:
-        if h["id"] == horario_id:
-            return h
-    return None
+    h = repositorio.tabla("horarios.json")["por_id"].get(horario_id)
+    return dict(h) if h else None
 
 
 def get_doctor_by_id(doctor_id: str) -> Optional[dict]:
     """Obtiene un doctor por su ID."""
-    doctores = _load("doctores.json")
-    for d in doctores:
-        if d["id"] == doctor_id:
-            return d
-    return None
+    d = repositorio.tabla("doctores.json")["por_id"].get(doctor_id)
+    return dict(d) if d else None
 
 
 def get_sede_by_id(sede_id: str) -> Optional[dict]:
     """Obtiene una sede por su ID."""
-    sedes = _load("sedes.json")
-    for s in sedes:
-        if s["id"] == sede_id:
-            return s
-    return None
+    s = repositorio.tabla("sedes.json")["por_id"].get(sede_id)
+    return dict(s) if s else None
 
 
 def crear_cita(paciente_id: str, doctor_id: str, sede_id: str, horario_id: str) -> dict:
     """
-    Crea una cita y marca el horario como ocupado.
-    
+    Crea una cita y marca el horario como ocupado, solo si sigue disponible.
+
     Equivale a:
     BEGIN;
+      UPDATE horarios SET estado = 'ocupado'
+        WHERE id = :horario_id AND estado = 'disponible';   -- compare-and-set
       INSERT INTO citas (...) VALUES (...);
-      UPDATE horarios SET estado = 'ocupado' WHERE id = :horario_id;
     COMMIT;
+
+    Lanza HorarioNoDisponible si otro paciente tomó el horario primero.
     """
     import uuid
-    
+
     # Crear la cita
     cita = {
         "id": f"cita-{str(uuid.uuid4())[:8]}",
@@ -224,18 +219,74 @@ def crear_cita(paciente_id: str, doctor_id: str, sede_id: str, horario_id: str)
         "horario_id": horario_id,
         "estado": "confirmada"
     }
-    
-    # Guardar cita
-    citas = _load("citas.json")
-    citas.append(cita)
-    _save("citas.json", citas)
-    
-    # Actualizar horario a ocupado
-    horarios = _load("horarios.json")
-    for h in horarios:
-        if h["id"] == horario_id:
-            h["estado"] = "ocupado"
-            break
-    _save("horarios.json", horarios)
-    
-    return cita
+
+    with repositorio.bloqueo_escritura():
+        # Compare-and-set sobre la versión más reciente en disco
+        h = repositorio.tabla("horarios.json")["por_id"].get(horario_id)
+        if not h or h["estado"] != "disponible":
+            raise HorarioNoDisponible(horario_id)
+
+        # Una sola línea en el journal: inserta la cita y ocupa el horario
+        repositorio.registrar([{"op": "reserva", "cita": cita}])
+
+    return dict(cita)
+
+
+def iterar_citas_del_dia(fecha: str):
+    """
+    Citas confirmadas de `fecha` ('YYYY-MM-DD') con sus entidades, en
+    streaming (trabajos por lotes: agent/recordatorios.py). Genera dicts
+    {cita_id, paciente, doctor, sede, horario, especialidad}; una entidad
+    que no existe viene como None y especialidad es el nombre.
+
+    Equivale a:
+    SELECT c.id, p.*, d.*, s.*, h.*, e.nombre FROM horarios h
+    JOIN citas c ON c.horario_id = h.id
+    LEFT JOIN pacientes p ... LEFT JOIN doctores d ... LEFT JOIN sedes s ...
+    LEFT JOIN especialidades e ON e.id = d.especialidad_id
+    WHERE h.fecha = :fecha AND c.estado = 'confirmada'
+    """
+    # horarios.json y citas.json se recorren en streaming; solo se guardan
+    # los horarios de la fecha. El resto son tablas chicas ya indexadas.
+    horarios = {h["id"]: h for h in repositorio.iterar("horarios.json") if h["fecha"] == fecha}
+    if not horarios:
+        return
+
+    pacientes = repositorio.tabla("pacientes.json")["por_id"]
+    doctores = repositorio.tabla("doctores.json")["por_id"]
+    sedes = repositorio.tabla("sedes.json")["por_id"]
+    especialidades = repositorio.tabla("especialidades.json")["por_id"]
+
+    for cita in repositorio.iterar("citas.json"):
+        if cita.get("estado") != "confirmada":
+            continue
+        horario = horarios.get(cita["horario_id"])
+        if horario is None:
+            continue
+        doctor = doctores.get(cita["doctor_id"])
+        especialidad = especialidades.get(doctor["especialidad_id"]) if doctor else None
+        yield {
+            "cita_id": cita["id"],
+            "paciente": pacientes.get(cita["paciente_id"]),
+            "doctor": doctor,
+            "sede": sedes.get(cita["sede_id"]),
+            "horario": horario,
+            "especialidad": especialidad["nombre"] if especialidad else None,
+        }
+
+
+# ── Backend alternativo: SQLite (misma interfaz) ──
+if os.getenv("MEDIAGENT_BACKEND", "json").lower() == "sqlite":
+    from agent.tools_sqlite import (  # noqa: E402,F811
+        get_paciente_by_id,
+        get_paciente_by_correo,
+        get_especialidad_nombre,
+        get_sedes_cercanas,
+        get_doctores_con_horarios,
+        get_mas_horarios,
+        get_horario_by_id,
+        get_doctor_by_id,
+        get_sede_by_id,
+        crear_cita,
+        iterar_citas_del_dia,
+    )
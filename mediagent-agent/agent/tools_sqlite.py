@@ -0,0 +1,394 @@
+"""
+MediAgent - Data access layer sobre SQLite
+
+Implementa las mismas funciones (inputs/outputs) que agent/tools.py pero con
+las queries SQL que allí se describen, sobre una base SQLite con índices
+reales. Se activa con MEDIAGENT_BACKEND=sqlite; la base se crea a partir de
+data/*.json (con el journal aplicado) con: python scripts/importar_sqlite.py
+"""
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Optional
+from datetime import date
+
+from agent.errores import HorarioNoDisponible
+from agent.repositorio import DATA_DIR, RepositorioJSON, repositorio
+
+DB_PATH = os.getenv("MEDIAGENT_SQLITE_PATH", os.path.join(DATA_DIR, "mediagent.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pacientes (
+    id TEXT PRIMARY KEY,
+    nombres TEXT NOT NULL,
+    apellidos TEXT NOT NULL,
+    correo TEXT,
+    distrito TEXT,
+    especialidad_id TEXT,
+    enfermedad TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_pacientes_correo ON pacientes(correo);
+
+CREATE TABLE IF NOT EXISTS especialidades (
+    id TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sedes (
+    id TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    distrito TEXT NOT NULL,
+    distritos_cercanos TEXT NOT NULL DEFAULT '[]',  -- lista JSON
+    direccion TEXT,
+    telefono TEXT
+);
+
+CREATE TABLE IF NOT EXISTS sede_especialidades (
+    id TEXT PRIMARY KEY,
+    sede_id TEXT NOT NULL REFERENCES sedes(id),
+    especialidad_id TEXT NOT NULL REFERENCES especialidades(id)
+);
+CREATE INDEX IF NOT EXISTS idx_sede_esp ON sede_especialidades(especialidad_id, sede_id);
+
+CREATE TABLE IF NOT EXISTS doctores (
+    id TEXT PRIMARY KEY,
+    nombres TEXT NOT NULL,
+    apellidos TEXT NOT NULL,
+    especialidad_id TEXT NOT NULL REFERENCES especialidades(id),
+    sede_id TEXT NOT NULL REFERENCES sedes(id),
+    numero_colegiatura TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_doctores_sede_esp ON doctores(sede_id, especialidad_id);
+
+CREATE TABLE IF NOT EXISTS horarios (
+    id TEXT PRIMARY KEY,
+    doctor_id TEXT NOT NULL REFERENCES doctores(id),
+    fecha TEXT NOT NULL,
+    hora_inicio TEXT NOT NULL,
+    hora_fin TEXT NOT NULL,
+    estado TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_horarios_doctor_estado_fecha ON horarios(doctor_id, estado, fecha);
+CREATE INDEX IF NOT EXISTS idx_horarios_fecha ON horarios(fecha);
+
+CREATE TABLE IF NOT EXISTS citas (
+    id TEXT PRIMARY KEY,
+    paciente_id TEXT NOT NULL REFERENCES pacientes(id),
+    doctor_id TEXT NOT NULL REFERENCES doctores(id),
+    sede_id TEXT NOT NULL REFERENCES sedes(id),
+    horario_id TEXT NOT NULL REFERENCES horarios(id),
+    estado TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_citas_horario ON citas(horario_id);
+
+-- Próximo id por secuencia (ventana_horarios: los hor-N no se reutilizan)
+CREATE TABLE IF NOT EXISTS secuencias (
+    nombre TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+"""
+
+# Columnas por tabla, en el orden del esquema (las usa el importador)
+_COLUMNAS = {
+    "pacientes": ["id", "nombres", "apellidos", "correo", "distrito", "especialidad_id", "enfermedad"],
+    "especialidades": ["id", "nombre"],
+    "sedes": ["id", "nombre", "distrito", "distritos_cercanos", "direccion", "telefono"],
+    "sede_especialidades": ["id", "sede_id", "especialidad_id"],
+    "doctores": ["id", "nombres", "apellidos", "especialidad_id", "sede_id", "numero_colegiatura"],
+    "horarios": ["id", "doctor_id", "fecha", "hora_inicio", "hora_fin", "estado"],
+    "citas": ["id", "paciente_id", "doctor_id", "sede_id", "horario_id", "estado"],
+}
+
+
+# ── Conexiones: una por hilo (sqlite3 no comparte conexiones entre hilos) ──
+_local = threading.local()
+
+
+def conectar(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """Abre una conexión en modo autocommit (las transacciones son explícitas)."""
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = conectar()
+    return conn
+
+
+def _sede(row: sqlite3.Row) -> dict:
+    sede = dict(row)
+    sede["distritos_cercanos"] = json.loads(sede["distritos_cercanos"])
+    return sede
+
+
+# ══════════════════════════════════════════════
+# Importador (one-shot desde data/*.json)
+# ══════════════════════════════════════════════
+
+
+def importar_json(conn: sqlite3.Connection, data_dir: str = DATA_DIR) -> dict:
+    """
+    Crea el esquema y copia todos los data/*.json en una sola transacción.
+    Reemplaza las filas existentes con el mismo id. Retorna {tabla: filas}.
+
+    citas y horarios se leen con el journal aplicado (reservas y altas/bajas
+    aún no compactadas), bajo el bloqueo de escritura para que ninguna
+    reserva quede a medias entre el snapshot y el journal.
+    """
+    mismo_dir = os.path.abspath(data_dir) == os.path.abspath(repositorio.data_dir)
+    repo = repositorio if mismo_dir else RepositorioJSON(data_dir)
+    conn.executescript(SCHEMA)
+    conteo = {}
+    with repo.bloqueo_escritura():
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for tabla, columnas in _COLUMNAS.items():
+                placeholders = ", ".join("?" for _ in columnas)
+                cursor = conn.executemany(
+                    f"INSERT OR REPLACE INTO {tabla} ({', '.join(columnas)}) VALUES ({placeholders})",
+                    (
+                        tuple(
+                            json.dumps(fila.get(c, []), ensure_ascii=False) if c == "distritos_cercanos" else fila.get(c)
+                            for c in columnas
+                        )
+                        for fila in repo.iterar(f"{tabla}.json")
+                    ),
+                )
+                conteo[tabla] = cursor.rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    conn.execute("ANALYZE")
+    return conteo
+
+
+# ══════════════════════════════════════════════
+# Funciones de consulta (misma interfaz que tools.py)
+# ══════════════════════════════════════════════
+
+
+def get_paciente_by_id(paciente_id: str) -> Optional[dict]:
+    """Obtiene un paciente por su ID."""
+    row = _conn().execute("SELECT * FROM pacientes WHERE id = ?", (paciente_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def get_paciente_by_correo(correo: str) -> Optional[dict]:
+    """Obtiene un paciente por su correo."""
+    row = _conn().execute("SELECT * FROM pacientes WHERE correo = ?", (correo,)).fetchone()
+    return dict(row) if row else None
+
+
+def get_especialidad_nombre(especialidad_id: str) -> str:
+    """Obtiene el nombre de una especialidad por su ID."""
+    row = _conn().execute("SELECT nombre FROM especialidades WHERE id = ?", (especialidad_id,)).fetchone()
+    return row["nombre"] if row else "Desconocida"
+
+
+def get_sedes_cercanas(distrito_paciente: str, especialidad_id: str) -> list:
+    """
+    Sedes con la especialidad, cercanas al distrito del paciente y con al
+    menos un doctor con horarios disponibles a partir de hoy.
+    """
+    rows = _conn().execute(
+        """
+        SELECT s.* FROM sedes s
+        JOIN sede_especialidades se
+          ON se.sede_id = s.id AND se.especialidad_id = :esp
+        WHERE (s.distrito = :distrito
+               OR EXISTS (SELECT 1 FROM json_each(s.distritos_cercanos) WHERE value = :distrito))
+          AND EXISTS (
+            SELECT 1 FROM doctores d
+            JOIN horarios h ON h.doctor_id = d.id
+            WHERE d.sede_id = s.id AND d.especialidad_id = :esp
+              AND h.estado = 'disponible' AND h.fecha >= :hoy
+          )
+        ORDER BY s.rowid
+        """,
+        {"esp": especialidad_id, "distrito": distrito_paciente, "hoy": date.today().isoformat()},
+    ).fetchall()
+    return [_sede(r) for r in rows]
+
+
+def get_doctores_con_horarios(
+    sede_id: str,
+    especialidad_id: str,
+    fecha_desde: str = None,
+    fecha_hasta: str = None,
+    max_por_doctor: int = None,
+) -> list:
+    """
+    Busca doctores de una sede+especialidad con sus horarios disponibles.
+    Mismo formato de retorno que tools.get_doctores_con_horarios (incluido
+    "total" con max_por_doctor: la ventana corta en SQL, no en Python).
+    """
+    desde = fecha_desde if fecha_desde else date.today().isoformat()
+    rows = _conn().execute(
+        """
+        SELECT * FROM (
+            SELECT d.id AS doctor_id, d.nombres, d.apellidos, d.numero_colegiatura,
+                   h.id AS horario_id, h.fecha, h.hora_inicio, h.hora_fin,
+                   ROW_NUMBER() OVER (PARTITION BY d.id ORDER BY h.fecha, h.hora_inicio) AS n,
+                   COUNT(*) OVER (PARTITION BY d.id) AS total,
+                   d.rowid AS orden
+            FROM doctores d
+            JOIN horarios h ON h.doctor_id = d.id
+            WHERE d.sede_id = :sede AND d.especialidad_id = :esp
+              AND h.estado = 'disponible' AND h.fecha >= :desde
+              AND (:hasta IS NULL OR h.fecha <= :hasta)
+        )
+        WHERE :max IS NULL OR n <= :max
+        ORDER BY orden, n
+        """,
+        {"sede": sede_id, "esp": especialidad_id, "desde": desde, "hasta": fecha_hasta,
+         "max": max_por_doctor or None},
+    ).fetchall()
+
+    resultado = []
+    for r in rows:
+        if not resultado or resultado[-1]["doctor"]["id"] != r["doctor_id"]:
+            resultado.append({
+                "doctor": {
+                    "id": r["doctor_id"],
+                    "nombres": r["nombres"],
+                    "apellidos": r["apellidos"],
+                    "numero_colegiatura": r["numero_colegiatura"],
+                },
+                "horarios": [],
+            })
+            if max_por_doctor:
+                resultado[-1]["total"] = r["total"]
+        resultado[-1]["horarios"].append({
+            "id": r["horario_id"],
+            "fecha": r["fecha"],
+            "hora_inicio": r["hora_inicio"],
+            "hora_fin": r["hora_fin"],
+        })
+    return resultado
+
+
+def get_mas_horarios(
+    doctor_id: str,
+    despues_de: tuple,
+    fecha_hasta: str = None,
+    limite: int = 10,
+) -> list:
+    """Página siguiente de horarios de un doctor. Ver tools.get_mas_horarios."""
+    fecha, hora = despues_de
+    rows = _conn().execute(
+        """
+        SELECT id, fecha, hora_inicio, hora_fin FROM horarios
+        WHERE doctor_id = :doc AND estado = 'disponible'
+          AND fecha >= :fecha AND (fecha, hora_inicio) > (:fecha, :hora)
+          AND (:hasta IS NULL OR fecha <= :hasta)
+        ORDER BY fecha, hora_inicio
+        LIMIT :limite
+        """,
+        {"doc": doctor_id, "fecha": fecha, "hora": hora, "hasta": fecha_hasta, "limite": limite},
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def get_horario_by_id(horario_id: str) -> Optional[dict]:
+    """Obtiene un horario por su ID."""
+    row = _conn().execute("SELECT * FROM horarios WHERE id = ?", (horario_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def get_doctor_by_id(doctor_id: str) -> Optional[dict]:
+    """Obtiene un doctor por su ID."""
+    row = _conn().execute("SELECT * FROM doctores WHERE id = ?", (doctor_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def get_sede_by_id(sede_id: str) -> Optional[dict]:
+    """Obtiene una sede por su ID."""
+    row = _conn().execute("SELECT * FROM sedes WHERE id = ?", (sede_id,)).fetchone()
+    return _sede(row) if row else None
+
+
+def crear_cita(paciente_id: str, doctor_id: str, sede_id: str, horario_id: str) -> dict:
+    """
+    Crea una cita y marca el horario como ocupado en una sola transacción:
+    BEGIN IMMEDIATE; UPDATE horarios ... AND estado = 'disponible'; INSERT INTO citas ...; COMMIT;
+
+    Lanza HorarioNoDisponible si el UPDATE no encuentra el horario libre.
+    """
+    cita = {
+        "id": f"cita-{str(uuid.uuid4())[:8]}",
+        "paciente_id": paciente_id,
+        "doctor_id": doctor_id,
+        "sede_id": sede_id,
+        "horario_id": horario_id,
+        "estado": "confirmada"
+    }
+
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cur = conn.execute(
+            "UPDATE horarios SET estado = 'ocupado' WHERE id = ? AND estado = 'disponible'",
+            (horario_id,),
+        )
+        if cur.rowcount == 0:
+            raise HorarioNoDisponible(horario_id)
+        conn.execute(
+            "INSERT INTO citas (id, paciente_id, doctor_id, sede_id, horario_id, estado) "
+            "VALUES (:id, :paciente_id, :doctor_id, :sede_id, :horario_id, :estado)",
+            cita,
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    return cita
+
+
+# (alias, tabla, clave en el resultado) de las entidades de cada cita del día
+_ENTIDADES_CITA = (
+    ("p", "pacientes", "paciente"),
+    ("d", "doctores", "doctor"),
+    ("s", "sedes", "sede"),
+    ("h", "horarios", "horario"),
+)
+
+
+def iterar_citas_del_dia(fecha: str):
+    """
+    Citas confirmadas de `fecha` con sus entidades, en streaming (un solo
+    JOIN, recorrido con el cursor). Ver tools.iterar_citas_del_dia.
+    """
+    columnas = ", ".join(
+        f"{alias}.{c} AS {alias}_{c}" for alias, tabla, _ in _ENTIDADES_CITA for c in _COLUMNAS[tabla]
+    )
+    cursor = _conn().execute(
+        f"""
+        SELECT c.id AS cita_id, e.nombre AS especialidad, {columnas}
+        FROM horarios h
+        JOIN citas c ON c.horario_id = h.id
+        LEFT JOIN pacientes p ON p.id = c.paciente_id
+        LEFT JOIN doctores d ON d.id = c.doctor_id
+        LEFT JOIN sedes s ON s.id = c.sede_id
+        LEFT JOIN especialidades e ON e.id = d.especialidad_id
+        WHERE h.fecha = :fecha AND c.estado = 'confirmada'
+        """,
+        {"fecha": fecha},
+    )
+    for r in cursor:
+        fila = {"cita_id": r["cita_id"], "especialidad": r["especialidad"]}
+        for alias, tabla, clave in _ENTIDADES_CITA:
+            entidad = {c: r[f"{alias}_{c}"] for c in _COLUMNAS[tabla]}
+            fila[clave] = entidad if entidad["id"] is not None else None
+        if fila["sede"]:
+            fila["sede"]["distritos_cercanos"] = json.loads(fila["sede"]["distritos_cercanos"])
+        yield fila
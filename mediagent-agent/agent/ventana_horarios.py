@@ -0,0 +1,195 @@
+"""
+MediAgent - Ventana móvil de horarios (mantenimiento diario)
+
+regenerar_horarios.py descarta todos los horarios (y sus estados ocupado) y
+reescribe el archivo entero. mantener() en cambio solo mueve la ventana:
+
+  - baja de los horarios de días pasados, salvo los que tienen una cita
+    (las citas siguen apuntando a su horario)
+  - alta, para cada doctor, de los días entre su último horario y el nuevo
+    horizonte, con el generador vectorizado e ids hor-N que continúan la
+    numeración existente
+
+Los horarios vigentes no se tocan. Los cambios van al journal como un evento
+horarios_baja y otro horarios_alta, así que lo escrito en disco es
+proporcional a los días agregados/vencidos, no al total de la agenda; la
+compactación en segundo plano los vuelca después al snapshot.
+
+Con MEDIAGENT_BACKEND=sqlite la misma operación se hace en la base (DELETE +
+INSERT en una transacción), que es lo que lee el agente en ese modo.
+
+Los ids hor-N nunca se reutilizan: el último N asignado se guarda como marca
+(data/horarios_secuencia.json, o la tabla secuencias en SQLite), porque las
+bajas pueden borrar justo los ids más altos.
+"""
+import json
+import os
+from datetime import date, timedelta
+
+from agent import generador_horarios
+from agent.repositorio import SECUENCIA_HORARIOS as SECUENCIA, repositorio
+
+BACKEND_SQLITE = os.getenv("MEDIAGENT_BACKEND", "json").lower() == "sqlite"
+
+
+def _marca_json() -> int:
+    """Próximo N según la marca guardada (1 si nunca se asignó ninguno)."""
+    try:
+        with open(os.path.join(repositorio.data_dir, SECUENCIA), encoding="utf-8") as f:
+            return json.load(f)["siguiente"]
+    except FileNotFoundError:
+        return 1
+
+
+def _guardar_marca_json(siguiente: int):
+    ruta = os.path.join(repositorio.data_dir, SECUENCIA)
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"siguiente": siguiente}, f)
+    os.replace(tmp, ruta)
+
+
+def _siguiente_num(horarios: dict) -> int:
+    """Próximo N libre para hor-N: después del mayor presente y de la marca."""
+    if "columnar" in horarios:
+        presente = max(len(horarios["columnar"].fila_por_num), 1)
+    else:
+        presente = max((int(i[4:]) for i in horarios["por_id"] if i.startswith("hor-")), default=0) + 1
+    return max(presente, _marca_json())
+
+
+def _altas(doctores: list, ultima_fecha: dict, hoy: date, hasta: date, semilla: int, num: int) -> list:
+    """
+    Filas nuevas hasta `hasta` (exclusivo): cada doctor desde el día siguiente
+    a su último horario (`ultima_fecha`, ISO) o desde mañana, ids desde hor-`num`.
+    """
+    manana = hoy + timedelta(days=1)
+    grupos = {}  # primer día a generar -> doctores
+    for doc in doctores:
+        inicio = manana
+        if doc["id"] in ultima_fecha:
+            inicio = max(inicio, date.fromisoformat(ultima_fecha[doc["id"]]) + timedelta(days=1))
+        if inicio < hasta:
+            grupos.setdefault(inicio, []).append(doc)
+
+    altas = []
+    for inicio, docs in sorted(grupos.items()):
+        # Semilla por día de inicio: correr el mantenimiento dos veces da lo mismo
+        grilla = generador_horarios.generar(
+            docs, inicio, hasta, semilla=semilla + inicio.toordinal(), id_inicial=num
+        )
+        altas += generador_horarios.a_filas(grilla)
+        num += len(grilla["num"])
+    return altas
+
+
+def planificar(
+    horarios: dict,
+    doctores: list,
+    reservados: set,
+    hoy: date,
+    hasta: date,
+    semilla: int = generador_horarios.SEMILLA,
+) -> tuple:
+    """
+    (altas, bajas): filas nuevas hasta `hasta` (exclusivo) e ids vencidos
+    antes de `hoy` que no están en `reservados`.
+    """
+    por_doctor = horarios["por_doctor"]
+    hoy_iso = hoy.isoformat()
+    bajas = []
+    ultima_fecha = {}
+
+    for doc in doctores:
+        lista = por_doctor.get(doc["id"]) or []
+        # Ordenados por fecha: los vencidos son un prefijo de la lista
+        for h in lista:
+            if h["fecha"] >= hoy_iso:
+                break
+            if h["id"] not in reservados:
+                bajas.append(h["id"])
+        if len(lista):
+            ultima_fecha[doc["id"]] = lista[-1]["fecha"]
+
+    altas = _altas(doctores, ultima_fecha, hoy, hasta, semilla, _siguiente_num(horarios))
+    return altas, bajas
+
+
+def mantener(
+    hoy: date = None,
+    dias: int = 14,
+    meses: int = None,
+    semilla: int = generador_horarios.SEMILLA,
+) -> dict:
+    """
+    Lleva la agenda a la ventana [mañana, horizonte): `dias` días hábiles
+    o `meses` meses. Retorna un resumen con las altas y bajas registradas.
+    """
+    hoy = hoy or date.today()
+    manana = hoy + timedelta(days=1)
+    hasta = generador_horarios.sumar_meses(manana, meses) if meses else generador_horarios.dias_habiles(manana, dias)
+
+    if BACKEND_SQLITE:
+        altas, bajas = _mantener_sqlite(hoy, hasta, semilla)
+        return {"altas": altas, "bajas": bajas, "hasta": hasta - timedelta(days=1)}
+
+    with repositorio.bloqueo_escritura():
+        horarios = repositorio.tabla("horarios.json")
+        doctores = repositorio.tabla("doctores.json")["filas"]
+        reservados = {c["horario_id"] for c in repositorio.tabla("citas.json")["filas"]}
+        altas, bajas = planificar(horarios, doctores, reservados, hoy, hasta, semilla)
+
+        if altas:
+            # La marca primero: si se corta antes del journal solo queda un hueco
+            _guardar_marca_json(int(altas[-1]["id"][4:]) + 1)
+        eventos = []
+        if bajas:
+            eventos.append({"op": "horarios_baja", "ids": bajas})
+        if altas:
+            eventos.append({"op": "horarios_alta", "horarios": altas})
+        if eventos:
+            repositorio.registrar(eventos)
+
+    return {"altas": len(altas), "bajas": len(bajas), "hasta": hasta - timedelta(days=1)}
+
+
+def _mantener_sqlite(hoy: date, hasta: date, semilla: int) -> tuple:
+    """mantener() sobre la base de tools_sqlite. Retorna (altas, bajas)."""
+    from agent.tools_sqlite import _COLUMNAS, SCHEMA, conectar
+
+    conn = conectar()
+    conn.executescript(SCHEMA)  # bases importadas antes de la tabla secuencias
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        bajas = [r[0] for r in conn.execute(
+            "SELECT id FROM horarios h WHERE fecha < ? "
+            "AND NOT EXISTS (SELECT 1 FROM citas c WHERE c.horario_id = h.id)",
+            (hoy.isoformat(),),
+        )]
+        ultima_fecha = dict(conn.execute("SELECT doctor_id, MAX(fecha) FROM horarios GROUP BY doctor_id"))
+        doctores = [dict(r) for r in conn.execute("SELECT * FROM doctores ORDER BY rowid")]
+        presente = conn.execute(
+            "SELECT COALESCE(MAX(CAST(SUBSTR(id, 5) AS INTEGER)), 0) + 1 FROM horarios WHERE id LIKE 'hor-%'"
+        ).fetchone()[0]
+        marca = conn.execute("SELECT valor FROM secuencias WHERE nombre = 'horarios'").fetchone()
+        num = max(presente, marca[0] if marca else 1)
+
+        altas = _altas(doctores, ultima_fecha, hoy, hasta, semilla, num)
+        conn.executemany("DELETE FROM horarios WHERE id = ?", [(i,) for i in bajas])
+        columnas = _COLUMNAS["horarios"]
+        conn.executemany(
+            f"INSERT INTO horarios ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+            [tuple(h[c] for c in columnas) for h in altas],
+        )
+        if altas:
+            conn.execute(
+                "INSERT OR REPLACE INTO secuencias (nombre, valor) VALUES ('horarios', ?)",
+                (int(altas[-1]["id"][4:]) + 1,),
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return len(altas), len(bajas)
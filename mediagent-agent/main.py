@@ -7,6 +7,7 @@ del Human-in-the-Loop de LangGraph.
 Uso:
     python main.py
     python main.py --paciente pac-002
+    python main.py --sin-streaming   # espera la respuesta completa del LLM
 """
 import os
 import sys
@@ -19,6 +20,7 @@ from langchain_core.messages import HumanMessage
 from langgraph.types import Command
 
 from agent.graph import graph
+from agent.streaming import stream_turno
 from agent.tools import get_paciente_by_id, get_especialidad_nombre
 
 
@@ -49,7 +51,38 @@ def get_user_input() -> str:
     return input(f"\n{Colors.BLUE}{Colors.BOLD}👤 Tú: {Colors.RESET}").strip()
 
 
-def run_chat(paciente_id: str = "pac-001"):
+def ejecutar_turno(entrada, config: dict, streaming: bool = True) -> tuple:
+    """
+    Ejecuta un turno del grafo (estado inicial o Command(resume=...)).
+    Con streaming, imprime los tokens de la respuesta según llegan.
+
+    Returns: (tipo, valor, texto_mostrado) con tipo 'interrupt' o 'fin'.
+    """
+    if not streaming:
+        try:
+            graph.invoke(entrada, config)
+        except Exception as e:
+            if "GraphInterrupt" not in str(type(e).__name__):
+                raise
+        state = graph.get_state(config)
+        if state.next and state.tasks and state.tasks[0].interrupts:
+            return "interrupt", state.tasks[0].interrupts[0].value, ""
+        return "fin", state.values, ""
+
+    texto_mostrado = ""
+    for tipo, valor in stream_turno(graph, entrada, config):
+        if tipo == "token":
+            if not texto_mostrado:
+                print(f"\n{Colors.GREEN}{Colors.BOLD}🤖 MediAgent:{Colors.RESET}")
+            print(f"{Colors.GREEN}{valor}{Colors.RESET}", end="", flush=True)
+            texto_mostrado += valor
+        else:
+            if texto_mostrado:
+                print()
+            return tipo, valor, texto_mostrado
+
+
+def run_chat(paciente_id: str = "pac-001", streaming: bool = True):
     """
     Ejecuta el chat loop completo.
     
@@ -96,51 +129,40 @@ def run_chat(paciente_id: str = "pac-001"):
     }
     
     # Ejecutar el grafo (se detendrá en el primer interrupt)
-    try:
-        result = graph.invoke(initial_state, config)
-    except Exception as e:
-        if "GraphInterrupt" not in str(type(e).__name__):
-            raise
-    
+    tipo, valor, mostrado = ejecutar_turno(initial_state, config, streaming)
+
     # ── Loop principal: manejar interrupts ──
     while True:
-        state = graph.get_state(config)
-        
         # Si no hay nodos pendientes, el grafo terminó
-        if not state.next:
+        if tipo == "fin":
             # Mostrar último mensaje del agente
-            if state.values.get("messages"):
+            if valor.get("messages"):
                 last_ai_msgs = [
-                    m for m in state.values["messages"] 
+                    m for m in valor["messages"]
                     if hasattr(m, "type") and m.type == "ai"
                 ]
-                if last_ai_msgs:
+                if last_ai_msgs and last_ai_msgs[-1].content.strip() != mostrado.strip():
                     print_agent(last_ai_msgs[-1].content)
             print_system("\n[Flujo completado] ✅")
             break
-        
-        # Hay un interrupt — extraer el mensaje para el usuario
-        if state.tasks and state.tasks[0].interrupts:
-            interrupt_value = state.tasks[0].interrupts[0].value
-            
-            if isinstance(interrupt_value, dict) and "message" in interrupt_value:
-                print_agent(interrupt_value["message"])
-            else:
-                print_agent(str(interrupt_value))
-        
+
+        # Hay un interrupt — mostrar el mensaje si no llegó ya por streaming
+        if isinstance(valor, dict) and "message" in valor:
+            mensaje = valor["message"]
+        else:
+            mensaje = str(valor)
+        if mensaje.strip() != mostrado.strip():
+            print_agent(mensaje)
+
         # Esperar input del usuario
         user_input = get_user_input()
         if user_input.lower() in ["salir", "exit", "quit"]:
             print_system("¡Hasta luego! 👋")
             break
-        
+
         # Resumir el grafo con la respuesta del usuario
-        try:
-            result = graph.invoke(Command(resume=user_input), config)
-        except Exception as e:
-            if "GraphInterrupt" not in str(type(e).__name__):
-                raise
-    
+        tipo, valor, mostrado = ejecutar_turno(Command(resume=user_input), config, streaming)
+
     print(f"\n{'='*60}")
     print_system("  Sesión terminada. ¡Gracias por usar MediAgent!")
     print(f"{'='*60}\n")
@@ -153,6 +175,11 @@ def main():
         default="pac-001",
         help="ID del paciente (default: pac-001). Opciones: pac-001 a pac-005"
     )
+    parser.add_argument(
+        "--sin-streaming",
+        action="store_true",
+        help="Mostrar cada respuesta recién cuando el LLM termina de generarla"
+    )
     args = parser.parse_args()
     
     # Verificar API key
@@ -161,7 +188,7 @@ def main():
         print("Crea un archivo .env con: ANTHROPIC_API_KEY=sk-ant-api03-xxx")
         sys.exit(1)
     
-    run_chat(args.paciente)
+    run_chat(args.paciente, streaming=not args.sin_streaming)
 
 
 if __name__ == "__main__":
@@ -2,8 +2,12 @@
 Asegura que cada combinación sede+especialidad tenga al menos 2 doctores.
 Agrega los doctores faltantes a doctores.json y regenera horarios.json.
 """
-import json, os, random
+import json, os, random, sys
 from datetime import date, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import generador_horarios
+from agent.repositorio import repositorio
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 
@@ -60,43 +64,20 @@ def main():
     _save("doctores.json", todos_doctores)
     print(f"✅ Doctores: {len(doctores)} originales + {len(nuevos)} nuevos = {len(todos_doctores)} total")
 
-    # Regenerar horarios para TODOS los doctores con fechas 2026
-    franjas = [
-        ("08:00","09:00"), ("09:00","10:00"), ("10:00","11:00"),
-        ("11:00","12:00"), ("12:00","13:00"),
-        ("14:00","15:00"), ("15:00","16:00"), ("16:00","17:00"), ("17:00","18:00"),
-    ]
-
-    hoy = date.today()
-    dias_habiles = []
-    d = hoy + timedelta(days=1)
-    while len(dias_habiles) < 14:
-        if d.weekday() < 6:
-            dias_habiles.append(d)
-        d += timedelta(days=1)
-
-    random.seed(42)
-    horarios = []
-    hor_num  = 1
-
-    for doc in todos_doctores:
-        for dia in dias_habiles:
-            for inicio, fin in franjas:
-                estado = "disponible" if random.random() > 0.4 else "ocupado"
-                horarios.append({
-                    "id": f"hor-{hor_num:05d}",
-                    "doctor_id": doc["id"],
-                    "fecha": dia.isoformat(),
-                    "hora_inicio": inicio,
-                    "hora_fin": fin,
-                    "estado": estado,
-                })
-                hor_num += 1
-
-    _save("horarios.json", horarios)
-    disponibles = sum(1 for h in horarios if h["estado"] == "disponible")
+    # Regenerar horarios para TODOS los doctores: próximos 14 días hábiles
+    desde = date.today() + timedelta(days=1)
+    hasta = generador_horarios.dias_habiles(desde, 14)
+    grilla = generador_horarios.generar(todos_doctores, desde, hasta)
+    horarios = generador_horarios.a_filas(grilla)
+    # Bajo el bloqueo de escritura, con el journal vaciado (ver repositorio.reemplazar_horarios)
+    repositorio.reemplazar_horarios(
+        lambda: generador_horarios.escribir_json(os.path.join(DATA_DIR, "horarios.json"), horarios)
+    )
+
+    disponibles = int(grilla["disponible"].sum())
     print(f"✅ Horarios: {len(horarios)} generados ({disponibles} disponibles)")
-    print(f"📅 Rango: {dias_habiles[0]} → {dias_habiles[-1]}")
+    if horarios:
+        print(f"📅 Rango: {date.fromordinal(int(grilla['fecha'].min()))} → {date.fromordinal(int(grilla['fecha'].max()))}")
 
     # Verificar resultado: mínimo 2 por sede+esp
     conteo_final = {}
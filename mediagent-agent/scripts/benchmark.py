@@ -0,0 +1,308 @@
+"""
+Benchmark de throughput: reproduce conversaciones guionizadas contra el grafo
+(saludo → sede → doctor/día/hora → "sí") en muchos thread_id a la vez, con un
+modelo de chat falso y determinista en lugar de ChatAnthropic.
+
+Trabaja sobre una copia de data/ en una carpeta temporal, con las fechas de
+horarios.json desplazadas para que empiecen mañana; los datos reales no se tocan.
+
+Reporta p50/p95/p99 por nodo, citas/segundo y citas duplicadas (dos citas sobre
+el mismo horario). Sale con código 1 si hay duplicadas o se supera --max-p95-ms.
+
+Ejecutar desde la carpeta mediagent-agent/:
+    python scripts/benchmark.py
+    python scripts/benchmark.py --conversaciones 500 --concurrencia 50 --latencia-llm 200
+    python scripts/benchmark.py --backend sqlite --modo sync --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+TABLAS = ["pacientes", "especialidades", "sedes", "sede_especialidades", "doctores", "horarios", "citas"]
+
+
+# ══════════════════════════════════════════════
+# Datos de prueba
+# ══════════════════════════════════════════════
+
+def preparar_datos(destino: str) -> int:
+    """
+    Copia data/*.json a destino, sin citas previas, con los horarios desplazados
+    semanas enteras (se conservan los días de la semana) para que empiecen mañana.
+    Retorna los días desplazados.
+    """
+    for tabla in TABLAS:
+        shutil.copy(os.path.join(DATA_DIR, f"{tabla}.json"), os.path.join(destino, f"{tabla}.json"))
+
+    ruta_horarios = os.path.join(destino, "horarios.json")
+    with open(ruta_horarios, encoding="utf-8") as f:
+        horarios = json.load(f)
+    manana = date.today() + timedelta(days=1)
+    primera = min(date.fromisoformat(h["fecha"]) for h in horarios)
+    semanas = max(0, -(-(manana - primera).days // 7))
+    for h in horarios:
+        h["fecha"] = (date.fromisoformat(h["fecha"]) + timedelta(weeks=semanas)).isoformat()
+        h["estado"] = "disponible"
+    with open(ruta_horarios, "w", encoding="utf-8") as f:
+        json.dump(horarios, f, ensure_ascii=False)
+    with open(os.path.join(destino, "citas.json"), "w", encoding="utf-8") as f:
+        json.dump([], f)
+    return semanas * 7
+
+
+# ══════════════════════════════════════════════
+# Métricas por nodo
+# ══════════════════════════════════════════════
+
+_tiempos = defaultdict(list)  # nodo -> [segundos]
+
+
+def _medir_sync(nombre: str, fn):
+    def nodo(state):
+        t0 = time.perf_counter()
+        try:
+            return fn(state)
+        finally:
+            _tiempos[nombre].append(time.perf_counter() - t0)
+    return nodo
+
+
+def _medir_async(nombre: str, fn):
+    async def nodo(state):
+        t0 = time.perf_counter()
+        try:
+            return await fn(state)
+        finally:
+            _tiempos[nombre].append(time.perf_counter() - t0)
+    return nodo
+
+
+def _percentil(valores: list, p: float) -> float:
+    if len(valores) == 1:
+        return valores[0]
+    return statistics.quantiles(valores, n=100, method="inclusive")[int(p) - 1]
+
+
+# ══════════════════════════════════════════════
+# Conversación guionizada
+# ══════════════════════════════════════════════
+
+def _respuesta(interrupt: dict, rng: random.Random, dispersion: int, format_fecha) -> str:
+    """Lo que respondería el paciente a cada pregunta del agente."""
+    tipo = interrupt.get("type", "")
+    if tipo.startswith("elegir_doctor_horario"):
+        # Elige entre los primeros `dispersion` horarios listados: menos dispersión = más choques
+        slots = [(dh["doctor"], h) for dh in interrupt["doctores"] for h in dh["horarios"]]
+        doctor, h = slots[rng.randrange(min(dispersion, len(slots)))]
+        dia = format_fecha(h["fecha"]).split()[0]
+        return f"Con el Dr. {doctor['apellidos'].split()[0]} el {dia} a las {h['hora_inicio']}"
+    if tipo in ("confirmar_cita", "preguntar_siguiente_semana"):
+        return "sí"
+    return "1"
+
+
+def _entrada_inicial(paciente: dict) -> dict:
+    from langchain_core.messages import HumanMessage
+    return {"messages": [HumanMessage(content="Hola, necesito una cita")], "paciente": paciente, "etapa": "inicio"}
+
+
+def conversacion_sync(graph, thread_id, paciente, rng, dispersion, format_fecha, max_turnos=10) -> dict:
+    from langgraph.types import Command
+    config = {"configurable": {"thread_id": thread_id}}
+    graph.invoke(_entrada_inicial(paciente), config)
+    for _ in range(max_turnos):
+        state = graph.get_state(config)
+        if not state.next:
+            break
+        resp = _respuesta(state.tasks[0].interrupts[0].value, rng, dispersion, format_fecha)
+        graph.invoke(Command(resume=resp), config)
+    return graph.get_state(config).values
+
+
+async def conversacion_async(graph, thread_id, paciente, rng, dispersion, format_fecha, max_turnos=10) -> dict:
+    from langgraph.types import Command
+    config = {"configurable": {"thread_id": thread_id}}
+    await graph.ainvoke(_entrada_inicial(paciente), config)
+    for _ in range(max_turnos):
+        state = await graph.aget_state(config)
+        if not state.next:
+            break
+        resp = _respuesta(state.tasks[0].interrupts[0].value, rng, dispersion, format_fecha)
+        await graph.ainvoke(Command(resume=resp), config)
+    return (await graph.aget_state(config)).values
+
+
+# ══════════════════════════════════════════════
+# Main
+# ══════════════════════════════════════════════
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de throughput del grafo")
+    parser.add_argument("--conversaciones", type=int, default=200)
+    parser.add_argument("--concurrencia", type=int, default=20)
+    parser.add_argument("--modo", choices=["async", "sync"], default="async",
+                        help="async: build_graph(asincrono=True) + asyncio | sync: grafo síncrono en hilos")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--latencia-llm", type=float, default=0.0, help="ms simulados por llamada al LLM")
+    parser.add_argument("--dispersion", type=int, default=5,
+                        help="Horarios distintos entre los que eligen los pacientes (menos = más contención)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="Falla si algún nodo supera este p95")
+    parser.add_argument("--json", action="store_true", help="Imprime el resultado como JSON")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="mediagent-bench-")
+    desplazamiento = preparar_datos(tmp)
+
+    # El backend y las rutas se leen al importar agent.*: configurar antes
+    os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+    os.environ["MEDIAGENT_BACKEND"] = args.backend
+    os.environ["MEDIAGENT_SQLITE_PATH"] = os.path.join(tmp, "mediagent.db")
+    os.environ["MEDIAGENT_CHECKPOINTER"] = "memory"
+    os.environ["MEDIAGENT_OUTBOX_PATH"] = os.path.join(tmp, "outbox.db")
+    os.environ.pop("MEDIAGENT_PARSE_CACHE_PATH", None)
+
+    from agent.repositorio import repositorio
+    repositorio.data_dir = tmp
+    repositorio.invalidar()
+    if args.backend == "sqlite":
+        from agent.tools_sqlite import conectar, importar_json
+        conn = conectar(os.environ["MEDIAGENT_SQLITE_PATH"])
+        importar_json(conn, tmp)
+        conn.close()
+
+    import agent.graph as graph_mod
+    import agent.nodes as nodes
+    from agent import tools
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+
+    class ChatFalso(GenericFakeChatModel):
+        """Respuesta fija, con latencia opcional (dormir simula la espera de la API)."""
+
+        latencia: float = 0.0
+
+        def _generate(self, *a, **kw):
+            if self.latencia:
+                time.sleep(self.latencia)
+            return super()._generate(*a, **kw)
+
+        async def _agenerate(self, *a, **kw):
+            if self.latencia:
+                await asyncio.sleep(self.latencia)
+            return super()._generate(*a, **kw)
+
+    def _repetir(texto):
+        while True:
+            yield AIMessage(content=texto)
+
+    latencia = args.latencia_llm / 1000
+    nodes.llm_chat = ChatFalso(
+        messages=_repetir("Estas son las opciones disponibles para ti."),
+        latencia=latencia, tags=[nodes.TAG_RESPUESTA],
+    )
+    nodes.llm_parse = ChatFalso(messages=_repetir("1"), latencia=latencia)
+    nodes.encolar_confirmacion = lambda *a, **kw: {"success": True, "message": "benchmark"}
+
+    # Nodos medidos: build_graph toma los nombres del módulo al construir
+    asincrono = args.modo == "async"
+    for nombre in ("clasificar_y_sedes", "doctores_horarios", "confirmar", "agendar"):
+        attr = f"anodo_{nombre}" if asincrono else f"nodo_{nombre}"
+        medir = _medir_async if asincrono else _medir_sync
+        setattr(graph_mod, attr, medir(nombre, getattr(graph_mod, attr)))
+    graph = graph_mod.build_graph(asincrono=asincrono)
+
+    pacientes = [p for p in (tools.get_paciente_by_id(f"pac-{i:03d}") for i in range(1, 100)) if p]
+    trabajos = [
+        (f"bench-{i}", pacientes[i % len(pacientes)], random.Random(args.seed + i))
+        for i in range(args.conversaciones)
+    ]
+
+    t0 = time.perf_counter()
+    if asincrono:
+        async def _todas():
+            sem = asyncio.Semaphore(args.concurrencia)
+
+            async def _una(tid, pac, rng):
+                async with sem:
+                    return await conversacion_async(graph, tid, pac, rng, args.dispersion, nodes._format_fecha)
+            return await asyncio.gather(*[_una(*t) for t in trabajos])
+        finales = asyncio.run(_todas())
+    else:
+        with ThreadPoolExecutor(max_workers=args.concurrencia) as pool:
+            finales = list(pool.map(
+                lambda t: conversacion_sync(graph, *t, args.dispersion, nodes._format_fecha), trabajos
+            ))
+    duracion = time.perf_counter() - t0
+
+    # ── Resultados ──
+    if args.backend == "sqlite":
+        from agent.tools_sqlite import _conn
+        citas = [dict(r) for r in _conn().execute("SELECT horario_id FROM citas")]
+    else:
+        citas = repositorio.tabla("citas.json")["filas"]
+    por_horario = Counter(c["horario_id"] for c in citas)
+    duplicadas = sum(n - 1 for n in por_horario.values() if n > 1)
+    agendadas = sum(1 for v in finales if v.get("cita_creada"))
+
+    resultado = {
+        "conversaciones": args.conversaciones,
+        "concurrencia": args.concurrencia,
+        "modo": args.modo,
+        "backend": args.backend,
+        "duracion_s": round(duracion, 3),
+        "citas": agendadas,
+        "citas_por_segundo": round(agendadas / duracion, 2) if duracion else 0.0,
+        "citas_duplicadas": duplicadas,
+        "etapas": dict(Counter(v.get("etapa") for v in finales)),
+        "nodos": {
+            nombre: {
+                "n": len(ts),
+                "p50_ms": round(_percentil(ts, 50) * 1000, 2),
+                "p95_ms": round(_percentil(ts, 95) * 1000, 2),
+                "p99_ms": round(_percentil(ts, 99) * 1000, 2),
+            }
+            for nombre, ts in _tiempos.items() if ts
+        },
+    }
+
+    if args.json:
+        print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    else:
+        print(f"\n{'='*64}")
+        print(f"  Benchmark: {args.conversaciones} conversaciones, concurrencia {args.concurrencia}, "
+              f"{args.modo}/{args.backend}")
+        print(f"  (horarios desplazados {desplazamiento} días; datos en {tmp})")
+        print(f"{'='*64}")
+        print(f"  {'nodo':<22}{'n':>7}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}")
+        for nombre, m in resultado["nodos"].items():
+            print(f"  {nombre:<22}{m['n']:>7}{m['p50_ms']:>11.2f}{m['p95_ms']:>11.2f}{m['p99_ms']:>11.2f}")
+        print(f"{'-'*64}")
+        print(f"  Duración:          {resultado['duracion_s']} s")
+        print(f"  Citas agendadas:   {agendadas} ({resultado['citas_por_segundo']}/s)")
+        print(f"  Etapas finales:    {resultado['etapas']}")
+        print(f"  Citas duplicadas:  {duplicadas} {'✅' if not duplicadas else '❌'}")
+
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    lento = args.max_p95_ms is not None and any(
+        m["p95_ms"] > args.max_p95_ms for m in resultado["nodos"].values()
+    )
+    sys.exit(1 if duplicadas or lento else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""
+Vuelca data/journal.jsonl dentro de citas.json y horarios.json y lo vacía.
+El agente ya lo hace en segundo plano; útil antes de un backup o un deploy.
+Ejecutar desde la carpeta mediagent-agent/: python scripts/compactar_journal.py
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.repositorio import repositorio
+
+if __name__ == "__main__":
+    if repositorio.compactar():
+        print("✅ Journal compactado en citas.json y horarios.json")
+    else:
+        print("ℹ️ El journal ya estaba vacío")
@@ -0,0 +1,47 @@
+"""
+Convierte data/horarios.json al formato columnar binario (data/horarios.bin)
+que se usa con MEDIAGENT_HORARIOS_FORMATO=bin, o de vuelta a JSON.
+Compactar el journal antes (python scripts/compactar_journal.py) para que
+el archivo de origen tenga los últimos estados.
+
+Ejecutar desde la carpeta mediagent-agent/:
+    python scripts/convertir_horarios.py              # horarios.json → horarios.bin
+    python scripts/convertir_horarios.py --a-json     # horarios.bin → horarios.json
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import generador_horarios, horarios_columnar
+from agent.repositorio import DATA_DIR, iterar_arreglo_json
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte horarios entre JSON y formato columnar")
+    parser.add_argument("--a-json", action="store_true", help="De horarios.bin a horarios.json")
+    parser.add_argument("--data", default=DATA_DIR, help="Carpeta con los horarios")
+    args = parser.parse_args()
+
+    ruta_json = os.path.join(args.data, "horarios.json")
+    ruta_bin = os.path.join(args.data, "horarios.bin")
+    t0 = time.perf_counter()
+
+    if args.a_json:
+        filas = [dict(h) for h in horarios_columnar.abrir(ruta_bin)["filas"]]
+        generador_horarios.escribir_json(ruta_json, filas)
+        origen, destino = ruta_bin, ruta_json
+    else:
+        columnas = horarios_columnar.desde_filas(iterar_arreglo_json(ruta_json))
+        horarios_columnar.escribir(ruta_bin, columnas)
+        origen, destino = ruta_json, ruta_bin
+        filas = columnas["num"]
+
+    print(f"✅ {len(filas)} horarios: {os.path.basename(origen)} → {os.path.basename(destino)} "
+          f"({time.perf_counter() - t0:.2f}s)")
+    print(f"📦 {os.path.getsize(origen) / 1e6:.2f} MB → {os.path.getsize(destino) / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Envía los correos pendientes de la bandeja de salida (data/outbox.db).
+El agente ya lo hace en un hilo; este script sirve para correr el envío en
+un proceso aparte (con MEDIAGENT_OUTBOX_WORKER=0 en el agente) o para
+consultar el estado de un correo.
+
+Ejecutar desde la carpeta mediagent-agent/:
+    python scripts/enviar_outbox.py              # vacía la bandeja y termina
+    python scripts/enviar_outbox.py --continuo   # queda enviando
+    python scripts/enviar_outbox.py --cita cita-1a2b3c4d
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from agent import correo_outbox
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Envía la bandeja de salida de correos")
+    parser.add_argument("--continuo", action="store_true", help="No terminar: revisar la bandeja cada segundo")
+    parser.add_argument("--cita", help="Solo mostrar el estado del correo de esta cita")
+    args = parser.parse_args()
+
+    if args.cita:
+        estado = correo_outbox.estado_correo(args.cita)
+        print(estado if estado else f"ℹ️ No hay correo encolado para {args.cita}")
+        return
+
+    while True:
+        n = correo_outbox.vaciar()
+        if n:
+            print(f"📧 {n} correos procesados")
+        if not args.continuo:
+            break
+        time.sleep(correo_outbox.INTERVALO)
+
+
+if __name__ == "__main__":
+    main()
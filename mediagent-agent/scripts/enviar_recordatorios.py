@@ -0,0 +1,54 @@
+"""
+Envía el recordatorio del día anterior a cada paciente con cita confirmada.
+Pensado para correr una vez al día (cron); re-ejecutarlo no duplica correos.
+
+Ejecutar desde la carpeta mediagent-agent/:
+    python scripts/enviar_recordatorios.py                     # citas de mañana
+    python scripts/enviar_recordatorios.py --fecha 2026-02-24
+    python scripts/enviar_recordatorios.py --concurrencia 8
+    python scripts/enviar_recordatorios.py --solo-encolar      # el worker del agente los envía
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Este proceso vacía la bandeja por su cuenta, sin el hilo de fondo
+os.environ.setdefault("MEDIAGENT_OUTBOX_WORKER", "0")
+
+import resend
+
+from agent import correo_outbox, recordatorios
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recordatorios de citas del día siguiente")
+    parser.add_argument("--fecha", help="Fecha de las citas (YYYY-MM-DD). Default: mañana")
+    parser.add_argument(
+        "--concurrencia",
+        type=int,
+        default=recordatorios.CONCURRENCIA,
+        help="Lotes de Resend enviándose a la vez",
+    )
+    parser.add_argument("--solo-encolar", action="store_true", help="Encolar sin enviar")
+    args = parser.parse_args()
+
+    if not resend.api_key and not args.solo_encolar:
+        sys.exit("❌ RESEND_API_KEY no configurada en .env")
+
+    t0 = time.perf_counter()
+    encontradas, encolados = recordatorios.encolar_recordatorios(args.fecha)
+    print(f"📋 {encontradas} citas confirmadas, {encolados} recordatorios nuevos en la bandeja")
+    if not args.solo_encolar:
+        intentados = correo_outbox.vaciar(concurrencia=args.concurrencia)
+        print(f"📧 {intentados} correos procesados")
+    print(f"⏱️ {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Importa data/*.json a la base SQLite usada por MEDIAGENT_BACKEND=sqlite.
+Ejecutar desde la carpeta mediagent-agent/: python scripts/importar_sqlite.py [--db ruta]
+"""
+import argparse
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.tools_sqlite import DB_PATH, DATA_DIR, conectar, importar_json
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa data/*.json a SQLite")
+    parser.add_argument("--db", default=DB_PATH, help=f"Ruta de la base (default: {DB_PATH})")
+    parser.add_argument("--data", default=DATA_DIR, help="Carpeta con los JSON de origen")
+    args = parser.parse_args()
+
+    conn = conectar(args.db)
+    conteo = importar_json(conn, args.data)
+    conn.close()
+
+    print(f"✅ Base SQLite creada en {args.db}")
+    for tabla, n in conteo.items():
+        print(f"   {tabla}: {n} filas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Mantenimiento diario de horarios (cron): vence los días pasados y agrega los
+días nuevos del horizonte, conservando los horarios vigentes, sus estados
+y sus ids. Reemplaza a regenerar_horarios.py una vez que la agenda existe.
+
+Ejecutar desde la carpeta mediagent-agent/:
+    python scripts/mantener_horarios.py               # ventana de 14 días hábiles
+    python scripts/mantener_horarios.py --meses 6
+    python scripts/mantener_horarios.py --hoy 2026-02-23
+
+Con MEDIAGENT_BACKEND=sqlite actualiza la base SQLite (MEDIAGENT_SQLITE_PATH) en vez
+de los JSON.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import generador_horarios, ventana_horarios
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mueve la ventana de horarios al día de hoy")
+    horizonte = parser.add_mutually_exclusive_group()
+    horizonte.add_argument("--dias", type=int, default=14, help="Días hábiles (lun-sáb) de horizonte")
+    horizonte.add_argument("--meses", type=int, help="Horizonte en meses (en lugar de --dias)")
+    parser.add_argument("--semilla", type=int, default=generador_horarios.SEMILLA)
+    parser.add_argument("--hoy", type=date.fromisoformat, help="Fecha de referencia (default: hoy)")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    resumen = ventana_horarios.mantener(args.hoy, args.dias, args.meses, args.semilla)
+    print(f"✅ {resumen['altas']} horarios nuevos, {resumen['bajas']} vencidos dados de baja")
+    print(f"📅 Horizonte hasta {resumen['hasta']} ({time.perf_counter() - t0:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
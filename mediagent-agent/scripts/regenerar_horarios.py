@@ -1,69 +1,70 @@
 """
 Regenera horarios.json con fechas desde hoy hacia adelante.
-Ejecutar desde la carpeta mediagent-agent/: python scripts/regenerar_horarios.py
+Ejecutar desde la carpeta mediagent-agent/:
+    python scripts/regenerar_horarios.py               # próximos 14 días hábiles (lun-sáb)
+    python scripts/regenerar_horarios.py --meses 6     # horizonte de 6 meses
+    python scripts/regenerar_horarios.py --semilla 7 --turno-default semana
+    python scripts/regenerar_horarios.py --formato bin # data/horarios.bin (MEDIAGENT_HORARIOS_FORMATO=bin)
+
+Cada doctor usa el turno de su campo "turno" en doctores.json (ver
+agent/generador_horarios.TURNOS) o --turno-default si no lo tiene.
+Descarta todos los horarios existentes: para el día a día, conservando
+reservas e ids, usar scripts/mantener_horarios.py.
 """
+import argparse
 import json
 import os
-import random
+import sys
 from datetime import date, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import generador_horarios, horarios_columnar
+from agent.repositorio import repositorio
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 
-def generar_horarios():
+
+def generar_horarios(dias: int = 14, meses: int = None, semilla: int = generador_horarios.SEMILLA,
+                     turno_default: str = generador_horarios.TURNO_DEFAULT, formato: str = "json"):
     # Cargar doctores
     with open(os.path.join(DATA_DIR, "doctores.json"), encoding="utf-8") as f:
         doctores = json.load(f)
 
-    hoy = date.today()
-    horarios = []
-    horario_id = 1
-
-    # Generar para los próximos 14 días hábiles (lun-sab)
-    dias_habiles = []
-    d = hoy + timedelta(days=1)  # empezar desde mañana
-    while len(dias_habiles) < 14:
-        if d.weekday() < 6:  # lunes(0) a sábado(5), excluir domingo(6)
-            dias_habiles.append(d)
-        d += timedelta(days=1)
+    desde = date.today() + timedelta(days=1)  # empezar desde mañana
+    if meses:
+        hasta = generador_horarios.sumar_meses(desde, meses)
+    else:
+        hasta = generador_horarios.dias_habiles(desde, dias)
 
-    # Franjas horarias estándar (8am - 6pm)
-    franjas = [
-        ("08:00", "09:00"),
-        ("09:00", "10:00"),
-        ("10:00", "11:00"),
-        ("11:00", "12:00"),
-        ("12:00", "13:00"),
-        ("14:00", "15:00"),
-        ("15:00", "16:00"),
-        ("16:00", "17:00"),
-        ("17:00", "18:00"),
-    ]
+    grilla = generador_horarios.generar(doctores, desde, hasta, semilla=semilla, turno_default=turno_default)
+    n = len(grilla["num"])
 
-    random.seed(42)  # reproducible
+    def escribir():
+        if formato == "bin":
+            # Las columnas del generador se escriben tal cual, sin pasar por dicts
+            horarios_columnar.escribir(os.path.join(DATA_DIR, "horarios.bin"), grilla)
+        else:
+            generador_horarios.escribir_json(os.path.join(DATA_DIR, "horarios.json"), generador_horarios.a_filas(grilla))
 
-    for doc in doctores:
-        for dia in dias_habiles:
-            for (inicio, fin) in franjas:
-                # ~60% disponible, 40% ocupado — para hacerlo realista
-                estado = "disponible" if random.random() > 0.4 else "ocupado"
-                horarios.append({
-                    "id": f"hor-{horario_id:05d}",
-                    "doctor_id": doc["id"],
-                    "fecha": dia.isoformat(),
-                    "hora_inicio": inicio,
-                    "hora_fin": fin,
-                    "estado": estado,
-                })
-                horario_id += 1
+    # Bajo el bloqueo de escritura, con el journal vaciado (ver repositorio.reemplazar_horarios)
+    repositorio.reemplazar_horarios(escribir)
 
-    out_path = os.path.join(DATA_DIR, "horarios.json")
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(horarios, f, ensure_ascii=False, indent=2)
+    print(f"✅ Generados {n} horarios para {len(doctores)} doctores")
+    if n:
+        print(f"📅 Rango: {date.fromordinal(int(grilla['fecha'].min()))} → {date.fromordinal(int(grilla['fecha'].max()))}")
+    disponibles = int(grilla["disponible"].sum())
+    print(f"📊 Disponibles: {disponibles} | Ocupados: {n - disponibles}")
 
-    print(f"✅ Generados {len(horarios)} horarios para {len(doctores)} doctores")
-    print(f"📅 Rango: {dias_habiles[0]} → {dias_habiles[-1]}")
-    disponibles = sum(1 for h in horarios if h["estado"] == "disponible")
-    print(f"📊 Disponibles: {disponibles} | Ocupados: {len(horarios) - disponibles}")
 
 if __name__ == "__main__":
-    generar_horarios()
+    parser = argparse.ArgumentParser(description="Regenera data/horarios.json")
+    horizonte = parser.add_mutually_exclusive_group()
+    horizonte.add_argument("--dias", type=int, default=14, help="Días hábiles (lun-sáb) a generar")
+    horizonte.add_argument("--meses", type=int, help="Horizonte en meses (en lugar de --dias)")
+    parser.add_argument("--semilla", type=int, default=generador_horarios.SEMILLA)
+    parser.add_argument("--turno-default", default=generador_horarios.TURNO_DEFAULT,
+                        choices=sorted(generador_horarios.TURNOS))
+    parser.add_argument("--formato", choices=("json", "bin"), default="json",
+                        help="bin: data/horarios.bin columnar (ver agent/horarios_columnar.py)")
+    args = parser.parse_args()
+    generar_horarios(args.dias, args.meses, args.semilla, args.turno_default, args.formato)
@@ -0,0 +1,244 @@
+"""
+MediAgent - Servidor ASGI (Starlette + uvicorn)
+
+Expone el mismo ciclo interrupt/resume de main.py por HTTP y WebSocket,
+una conversación por thread_id, sobre el grafo async (build_graph(asincrono=True)).
+
+    POST /conversaciones/{thread_id}            {"paciente_id": "pac-001", "mensaje": "hola"}
+    POST /conversaciones/{thread_id}/respuesta  {"mensaje": "1"}
+    GET  /conversaciones/{thread_id}            estado actual (etapa, pregunta pendiente)
+    GET  /metricas                              formato Prometheus (MEDIAGENT_METRICAS=1)
+    WS   /conversaciones/{thread_id}/ws         mismos mensajes de entrada; emite
+         {"tipo": "token", "texto": ...} y al final {"tipo": "interrupt" | "fin", ...}
+
+Uso:
+    python server.py
+    python server.py --port 8080
+
+Un solo proceso uvicorn: el lock que serializa los turnos de cada thread_id
+vive en memoria, así que con varios workers dos respuestas a la misma
+conversación podrían retomar el mismo interrupt. La concurrencia viene del
+grafo async (MEDIAGENT_SERVER_CONCURRENCIA turnos a la vez).
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import weakref
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import uvicorn
+from langchain_core.messages import HumanMessage
+from langgraph.types import Command
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from agent import metricas
+from agent.graph import build_graph
+from agent.streaming import astream_turno
+from agent.tools import get_paciente_by_id
+
+# Turnos ejecutándose a la vez en este proceso (cada uno espera al LLM la mayor parte del tiempo)
+CONCURRENCIA = int(os.getenv("MEDIAGENT_SERVER_CONCURRENCIA", "64"))
+# Segundos que uvicorn mantiene abierta una conexión HTTP ociosa (keep-alive)
+KEEPALIVE = int(os.getenv("MEDIAGENT_SERVER_KEEPALIVE", "30"))
+# Intervalo de ping de los WebSocket, para que proxies no corten conversaciones en pausa
+WS_PING = float(os.getenv("MEDIAGENT_SERVER_WS_PING", "20"))
+
+_graph = None
+_semaforo = None
+# Un turno a la vez por conversación: dos resume simultáneos sobre el mismo
+# thread_id retomarían el mismo interrupt. Débil: el lock vive mientras haya un turno.
+_locks_hilo = weakref.WeakValueDictionary()
+
+
+class ErrorTurno(Exception):
+    """Petición inválida para el estado de la conversación (se responde con status)."""
+
+    def __init__(self, status: int, mensaje: str):
+        super().__init__(mensaje)
+        self.status = status
+        self.mensaje = mensaje
+
+
+# ══════════════════════════════════════════════
+# Ejecución de turnos
+# ══════════════════════════════════════════════
+
+def _config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def _evento_json(tipo: str, valor) -> dict:
+    """Traduce ("interrupt", payload) / ("fin", valores) a un dict serializable."""
+    if tipo == "interrupt":
+        return {"tipo": "interrupt", "mensaje": valor.get("message", ""), "interrupt": valor}
+    ai_msgs = [m for m in valor.get("messages", []) if getattr(m, "type", "") == "ai"]
+    return {
+        "tipo": "fin",
+        "mensaje": ai_msgs[-1].content if ai_msgs else "",
+        "etapa": valor.get("etapa"),
+        "cita": valor.get("cita_creada"),
+    }
+
+
+async def _entrada_turno(thread_id: str, datos: dict, inicio: bool):
+    """Estado inicial o Command(resume=...) según el tipo de turno; valida el hilo."""
+    if not isinstance(datos, dict):
+        raise ErrorTurno(400, "El cuerpo debe ser un objeto JSON")
+    mensaje = (datos.get("mensaje") or "").strip()
+    if not mensaje:
+        raise ErrorTurno(400, "Falta 'mensaje'")
+    state = await _graph.aget_state(_config(thread_id))
+    pendiente = bool(state.next)
+
+    if inicio:
+        if pendiente:
+            raise ErrorTurno(409, f"La conversación '{thread_id}' ya está en curso")
+        paciente = await asyncio.to_thread(get_paciente_by_id, datos.get("paciente_id", ""))
+        if not paciente:
+            raise ErrorTurno(404, f"Paciente '{datos.get('paciente_id')}' no encontrado")
+        return {"messages": [HumanMessage(content=mensaje)], "paciente": paciente, "etapa": "inicio"}
+
+    if not pendiente:
+        raise ErrorTurno(409, f"La conversación '{thread_id}' no espera respuesta")
+    return Command(resume=mensaje)
+
+
+async def _turno(thread_id: str, datos: dict, inicio: bool):
+    """Ejecuta un turno; produce los eventos de agent/streaming.astream_turno."""
+    lock = _locks_hilo.get(thread_id)
+    if lock is None:
+        lock = _locks_hilo[thread_id] = asyncio.Lock()
+    async with lock, _semaforo:
+        entrada = await _entrada_turno(thread_id, datos, inicio)
+        async for evento in astream_turno(_graph, entrada, _config(thread_id)):
+            yield evento
+
+
+# ══════════════════════════════════════════════
+# Endpoints HTTP
+# ══════════════════════════════════════════════
+
+async def _turno_http(request, inicio: bool):
+    thread_id = request.path_params["thread_id"]
+    try:
+        datos = await request.json()
+    except ValueError:
+        return JSONResponse({"error": "JSON inválido"}, status_code=400)
+    try:
+        # Sin streaming: se consume el turno completo y se responde el evento final
+        async for tipo, valor in _turno(thread_id, datos, inicio):
+            pass
+    except ErrorTurno as e:
+        return JSONResponse({"error": e.mensaje}, status_code=e.status)
+    return JSONResponse(_evento_json(tipo, valor))
+
+
+async def iniciar(request):
+    return await _turno_http(request, inicio=True)
+
+
+async def responder(request):
+    return await _turno_http(request, inicio=False)
+
+
+async def estado(request):
+    thread_id = request.path_params["thread_id"]
+    state = await _graph.aget_state(_config(thread_id))
+    if not state.values:
+        return JSONResponse({"error": f"Conversación '{thread_id}' no encontrada"}, status_code=404)
+    if state.next and state.tasks and state.tasks[0].interrupts:
+        cuerpo = _evento_json("interrupt", state.tasks[0].interrupts[0].value)
+    else:
+        cuerpo = _evento_json("fin", state.values)
+    cuerpo["etapa"] = state.values.get("etapa")
+    return JSONResponse(cuerpo)
+
+
+async def exportar_metricas(request):
+    """Métricas en formato Prometheus (requiere MEDIAGENT_METRICAS=1)."""
+    if not metricas.HABILITADO:
+        return JSONResponse({"error": "Métricas deshabilitadas (MEDIAGENT_METRICAS=1)"}, status_code=404)
+    return PlainTextResponse(metricas.exportar_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+# ══════════════════════════════════════════════
+# WebSocket: tokens en vivo
+# ══════════════════════════════════════════════
+
+async def conversacion_ws(websocket: WebSocket):
+    """
+    Cada mensaje del cliente es un turno: {"paciente_id", "mensaje"} inicia
+    la conversación y {"mensaje"} responde a la pregunta pendiente.
+    """
+    thread_id = websocket.path_params["thread_id"]
+    await websocket.accept()
+    try:
+        while True:
+            datos = await websocket.receive_json()
+            inicio = isinstance(datos, dict) and "paciente_id" in datos
+            try:
+                # aclosing: si el cliente se desconecta a mitad del turno, el lock se libera ya
+                async with contextlib.aclosing(_turno(thread_id, datos, inicio)) as eventos:
+                    async for tipo, valor in eventos:
+                        if tipo == "token":
+                            await websocket.send_json({"tipo": "token", "texto": valor})
+                        else:
+                            await websocket.send_json(_evento_json(tipo, valor))
+            except ErrorTurno as e:
+                await websocket.send_json({"tipo": "error", "status": e.status, "error": e.mensaje})
+    except WebSocketDisconnect:
+        pass
+
+
+# ══════════════════════════════════════════════
+# App
+# ══════════════════════════════════════════════
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global _graph, _semaforo
+    _graph = build_graph(asincrono=True)
+    _semaforo = asyncio.Semaphore(CONCURRENCIA)
+    yield
+    cerrar = getattr(_graph.checkpointer, "acerrar", None)
+    if cerrar:
+        await cerrar()
+
+
+app = Starlette(
+    routes=[
+        Route("/conversaciones/{thread_id}", iniciar, methods=["POST"]),
+        Route("/conversaciones/{thread_id}", estado, methods=["GET"]),
+        Route("/conversaciones/{thread_id}/respuesta", responder, methods=["POST"]),
+        WebSocketRoute("/conversaciones/{thread_id}/ws", conversacion_ws),
+        Route("/metricas", exportar_metricas, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MediAgent - Servidor ASGI")
+    parser.add_argument("--host", default=os.getenv("MEDIAGENT_SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MEDIAGENT_SERVER_PORT", "8000")))
+    args = parser.parse_args()
+
+    # Un solo worker: los locks por thread_id son de este proceso (ver docstring)
+    uvicorn.run(
+        app,
+        host=args.host,
+        port=args.port,
+        timeout_keep_alive=KEEPALIVE,
+        ws_ping_interval=WS_PING,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+"""
+Pruebas de MediAgent. Ejecutar desde la carpeta mediagent-agent/:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,50 @@
+"""Bandeja de salida: un lote que falla no arrastra a los correos válidos."""
+import pytest
+
+from agent import correo_outbox
+
+
+@pytest.fixture
+def bandeja(tmp_path, monkeypatch):
+    monkeypatch.setattr(correo_outbox, "RUTA", str(tmp_path / "outbox.db"))
+    monkeypatch.setattr(correo_outbox, "WORKER_EN_PROCESO", False)
+    monkeypatch.setattr(correo_outbox._local, "conn", None, raising=False)
+    for i in range(3):
+        correo_outbox.encolar(f"cita-{i}", "confirmacion", {
+            "from": "MediAgent <citas@mediagent.pe>",
+            "to": ["malo@x" if i == 1 else f"p{i}@mediagent.pe"],
+            "subject": "Cita",
+            "html": "<p>hola</p>",
+        })
+    yield
+    correo_outbox._local.conn.close()
+
+
+def _estados():
+    return {f"cita-{i}": correo_outbox.estado_correo(f"cita-{i}")["estado"] for i in range(3)}
+
+
+def test_lote_fallido_se_envia_uno_por_uno(bandeja, monkeypatch):
+    def enviar_lote(lote):
+        if len(lote) > 1 or lote[0]["to"] == ["malo@x"]:
+            raise ValueError("destinatario inválido")
+        return ["re-" + lote[0]["to"][0]]
+
+    monkeypatch.setattr(correo_outbox, "enviar_lote", enviar_lote)
+    assert correo_outbox.procesar_lote() == 3
+    assert _estados() == {"cita-0": "enviado", "cita-1": "pendiente", "cita-2": "enviado"}
+    assert correo_outbox.estado_correo("cita-1")["intentos"] == 1
+
+
+def test_menos_ids_que_correos_no_reenvia_el_lote(bandeja, monkeypatch):
+    llamadas = []
+
+    def enviar_lote(lote):
+        llamadas.append(len(lote))
+        return ["re-1"]
+
+    monkeypatch.setattr(correo_outbox, "enviar_lote", enviar_lote)
+    correo_outbox.procesar_lote()
+    assert llamadas == [3]
+    assert set(_estados().values()) == {"enviado"}
+    assert correo_outbox.estado_correo("cita-0")["proveedor_id"] is None
@@ -0,0 +1,55 @@
+"""Nodo de doctores: índice de selección y elección de doctor + día."""
+import os
+
+import pytest
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "sin-clave")
+
+from agent import nodes  # noqa: E402
+
+_LISTADO = [
+    {
+        "doctor": {"id": "doc-001", "nombres": "Fernando", "apellidos": "Gutiérrez Lozano", "numero_colegiatura": "CMP-1"},
+        "horarios": [{"id": "hor-00001", "fecha": "2026-02-23", "hora_inicio": "08:00", "hora_fin": "09:00"}],
+    },
+    {
+        "doctor": {"id": "doc-002", "nombres": "César", "apellidos": "Llanos Ruiz", "numero_colegiatura": "CMP-2"},
+        "horarios": [{"id": "hor-00002", "fecha": "2026-02-24", "hora_inicio": "10:00", "hora_fin": "11:00"}],
+    },
+]
+
+
+@pytest.fixture
+def nodo(monkeypatch):
+    monkeypatch.setattr(nodes, "MODO_RAPIDO", True)
+    monkeypatch.setattr(nodes, "get_especialidad_nombre", lambda esp_id: "Cardiología")
+    monkeypatch.setattr(nodes, "get_doctores_con_horarios", lambda *a, **k: [dict(dh) for dh in _LISTADO])
+
+    def responder(respuesta):
+        monkeypatch.setattr(nodes, "interrupt", lambda valor: respuesta)
+        return nodes.nodo_doctores_horarios({
+            "paciente": {"id": "pac-001", "especialidad_id": "esp-001"},
+            "sede_elegida": {"id": "sede-001", "nombre": "MediAgent San Isidro"},
+            "sedes_disponibles": [],
+        })
+    return responder
+
+
+def test_doctor_y_dia_sin_horas_ese_dia(nodo):
+    # "lunes" es el 23, pero Llanos solo atiende el 24
+    salida = nodo("con Llanos el lunes")
+    assert salida["doctor_elegido"]["id"] == "doc-002"
+    assert salida["horario_elegido"]["id"] == "hor-00002"
+
+
+def test_doctor_y_dia_pide_la_hora(nodo):
+    salida = nodo("con Gutiérrez el lunes")
+    assert salida["doctor_elegido"]["id"] == "doc-001"
+    assert salida["horario_elegido"]["id"] == "hor-00001"
+
+
+def test_indice_de_seleccion_se_arma_una_vez_por_listado():
+    indice = nodes._indice_seleccion(_LISTADO)
+    # Otra copia del mismo listado (p. ej. al reanudar el nodo): mismo índice
+    assert nodes._indice_seleccion([dict(dh) for dh in _LISTADO]) is indice
+    assert nodes._indice_seleccion(_LISTADO[:1]) is not indice
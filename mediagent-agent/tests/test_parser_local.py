@@ -0,0 +1,43 @@
+"""Parser local de sí/no: cuándo decide solo y cuándo le deja la respuesta al LLM."""
+import pytest
+
+from agent.parser_local import UMBRAL_CONFIANZA, parsear_si_no
+
+
+@pytest.mark.parametrize("texto", [
+    "sí", "si", "Sí, confirmo", "claro que sí", "dale", "ok, perfecto",
+    "sí, no hay problema", "de acuerdo", "está bien", "sí por favor", "bueno, sí",
+])
+def test_afirmativas_claras(texto):
+    valor, confianza = parsear_si_no(texto)
+    assert valor is True and confianza >= UMBRAL_CONFIANZA
+
+
+@pytest.mark.parametrize("texto", [
+    "no", "no quiero", "mejor no", "no, gracias", "no confirmo", "cancela", "ya no",
+])
+def test_negativas_claras(texto):
+    valor, confianza = parsear_si_no(texto)
+    assert valor is False and confianza >= UMBRAL_CONFIANZA
+
+
+@pytest.mark.parametrize("texto", [
+    # Relleno sin un sí explícito: no debe reservar sin pasar por el LLM
+    "quiero otro doctor",
+    "quiero cambiar la hora",
+    "bueno pero a otra hora",
+    "va a ser difícil",
+    "bueno",
+    "vale",
+    "porfa",
+    # Sí con condiciones que el parser no entiende
+    "sí, pero a otra hora",
+    "claro, aunque prefiero el martes",
+])
+def test_ambiguas_van_al_llm(texto):
+    valor, confianza = parsear_si_no(texto)
+    assert valor is None or confianza < UMBRAL_CONFIANZA
+
+
+def test_contradiccion_baja_confianza():
+    assert parsear_si_no("sí... no, mejor no") == (None, 0.3)
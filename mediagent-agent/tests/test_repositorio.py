@@ -0,0 +1,33 @@
+"""Repositorio JSON: reemplazar la agenda no reaplica eventos viejos del journal."""
+import json
+import shutil
+
+from agent import generador_horarios
+from agent.repositorio import DATA_DIR, JOURNAL, SECUENCIA_HORARIOS, RepositorioJSON
+
+
+def test_reemplazar_horarios_vacia_el_journal(tmp_path):
+    data = tmp_path / "data"
+    shutil.copytree(DATA_DIR, data, ignore=shutil.ignore_patterns("*.db*", JOURNAL, "*.lock", SECUENCIA_HORARIOS))
+    repo = RepositorioJSON(str(data))
+    horarios = [dict(h) for h in repo.tabla("horarios.json")["filas"]]
+    horario = next(h for h in horarios if h["estado"] == "disponible")
+    cita = {
+        "id": "cita-prueba", "paciente_id": "pac-001", "doctor_id": horario["doctor_id"],
+        "sede_id": "sede-001", "horario_id": horario["id"], "estado": "confirmada",
+    }
+    with repo.bloqueo_escritura():
+        repo.registrar([{"op": "reserva", "cita": cita}, {"op": "horarios_baja", "ids": [horarios[-1]["id"]]}])
+    (data / SECUENCIA_HORARIOS).write_text(json.dumps({"siguiente": 99999}))
+
+    # Agenda nueva con los mismos ids, todos disponibles
+    nuevos = [dict(h, estado="disponible") for h in horarios]
+    repo.reemplazar_horarios(lambda: generador_horarios.escribir_json(str(data / "horarios.json"), nuevos))
+
+    por_id = repo.tabla("horarios.json")["por_id"]
+    assert por_id[horario["id"]]["estado"] == "disponible"
+    assert horarios[-1]["id"] in por_id
+    assert (data / JOURNAL).stat().st_size == 0
+    assert not (data / SECUENCIA_HORARIOS).exists()
+    # La cita que solo estaba en el journal quedó en citas.json
+    assert "cita-prueba" in {c["id"] for c in json.loads((data / "citas.json").read_text())}
@@ -0,0 +1,27 @@
+"""Importador SQLite: las reservas que solo están en el journal no se pierden."""
+import os
+import shutil
+
+from agent.repositorio import DATA_DIR, RepositorioJSON
+from agent.tools_sqlite import conectar, importar_json
+
+
+def test_importar_aplica_el_journal(tmp_path):
+    data = tmp_path / "data"
+    shutil.copytree(DATA_DIR, data, ignore=shutil.ignore_patterns("*.db*", "journal.jsonl", "*.lock"))
+    repo = RepositorioJSON(str(data))
+    horario = next(h for h in repo.tabla("horarios.json")["filas"] if h["estado"] == "disponible")
+    cita = {
+        "id": "cita-prueba", "paciente_id": "pac-001", "doctor_id": horario["doctor_id"],
+        "sede_id": "sede-001", "horario_id": horario["id"], "estado": "confirmada",
+    }
+    with repo.bloqueo_escritura():
+        repo.registrar([{"op": "reserva", "cita": cita}])
+    assert os.path.getsize(data / "journal.jsonl") > 0
+
+    conn = conectar(str(tmp_path / "mediagent.db"))
+    importar_json(conn, str(data))
+    estado = conn.execute("SELECT estado FROM horarios WHERE id = ?", (horario["id"],)).fetchone()[0]
+    citas = conn.execute("SELECT COUNT(*) FROM citas WHERE id = 'cita-prueba'").fetchone()[0]
+    conn.close()
+    assert (estado, citas) == ("ocupado", 1)